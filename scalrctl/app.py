@@ -6,7 +6,7 @@ import sys
 
 import yaml
 
-from scalrctl import click, defaults, settings
+from scalrctl import click, context, defaults, metrics, profiler, settings, trace
 from scalrctl.commands import Action
 from scalrctl.commands.internal import configure, update
 
@@ -20,8 +20,9 @@ if not os.path.exists(defaults.CONFIG_DIRECTORY):
     os.makedirs(defaults.CONFIG_DIRECTORY)
 
 if os.path.exists(defaults.CONFIG_PATH):
-    config_data = yaml.safe_load(open(defaults.CONFIG_PATH, 'r'))
-    configure.apply_settings(config_data)
+    with profiler.phase('config load'):
+        config_data = yaml.safe_load(open(defaults.CONFIG_PATH, 'r'))
+        configure.apply_settings(config_data)
 
 if update.is_update_required():
     update.update()  # [ST-53]
@@ -119,8 +120,11 @@ class ScalrCLI(click.Group):
                                      short_help=dummy_help, hidden=hidden)
 
             msg = subscheme.get('cmd_descr') or action.get_description()
-            options = action.modify_options(action.get_options())
-            cmd = click.Command(name, params=options, callback=action.run,
+            with profiler.phase('options'):
+                options = action.modify_options(action.get_options())
+            command_path = ' '.join(ctx.command_path.split()[1:] + [name])
+            cmd = click.Command(name, params=options,
+                                callback=trace.wrap(command_path, context.scoped(action.run)),
                                 short_help=msg, help=msg, hidden=hidden)
             if 'epilog' in subscheme:
                 cmd.epilog = subscheme['epilog']
@@ -138,9 +142,22 @@ class ScalrCLI(click.Group):
 @click.option('--key_id', help="API key ID")
 @click.option('--secret_key', help="API secret key")
 @click.option('--config', help="Path to a custom scalr-ctl configuration file")
-def cli(ctx, key_id, secret_key, config, *args, **kvargs):
+@click.option('--trace', 'trace_path', metavar='FILE',
+              help="Record timings of API calls to FILE as JSON lines, "
+                   "or as HAR if FILE ends with .har")
+@click.option('--profile', 'profile_path', metavar='FILE',
+              help="Profile the invocation, write pstats to FILE or sampled "
+                   "stacks for flame graphs if FILE ends with .collapsed")
+@click.option('--metrics', 'metrics_path', metavar='FILE',
+              help="Write API call metrics to FILE in the Prometheus text "
+                   "format at exit, '-' prints them on stderr")
+def cli(ctx, key_id, secret_key, config, trace_path, profile_path, metrics_path,
+        *args, **kvargs):
     """Scalr-ctl is a command-line interface to your Scalr account"""
 
+    if profile_path:
+        profiler.start(profile_path)
+
     service_cmd = any(arg in ('configure', 'update') for arg in sys.argv)
 
     if key_id:
@@ -155,12 +172,19 @@ def cli(ctx, key_id, secret_key, config, *args, **kvargs):
                                                    hide_input=True))
     if config:
         if os.path.exists(config):
-            config_data = yaml.safe_load(open(config, 'r'))
-            configure.apply_settings(config_data)
+            with profiler.phase('config load'):
+                config_data = yaml.safe_load(open(config, 'r'))
+                configure.apply_settings(config_data)
         else:
             msg = 'Configuration file not found: {}'.format(config)
             raise click.ClickException(msg)
 
+    if trace_path:
+        trace.start(trace_path)
+
+    if metrics_path or settings.METRICS_FILE:
+        metrics.start(metrics_path or settings.METRICS_FILE)
+
 
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Python client for Scalr API.
+
+Endpoints are generated from the command scheme, groups and
+commands use the CLI names with dashes replaced by underscores::
+
+    client = Client.from_config()
+    for server in client.servers.list(envId=1, all=True):
+        print(server['id'])
+
+    client.global_variables.update(globalVariableName='A', body={'value': '1'})
+    client.account.roles.list()
+    client.global_.os.list()
+
+List endpoints return generators of objects, other endpoints return
+the `data` block of the response. The client shares request signing,
+HTTP connections and the spec cache with the CLI.
+"""
+import json
+import keyword
+
+from scalrctl import click, plans, request, settings as _settings, utils
+from scalrctl.context import Context, settings
+
+
+class APIError(click.ClickException):
+    """
+    Error returned by Scalr API, `errors` keeps the original list.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        message = '\n'.join(
+            '{}: {}'.format(error['code'], error.get('message', ''))
+            if 'code' in error else error.get('message', '')
+            for error in errors)
+        super(APIError, self).__init__(message)
+
+
+class Endpoint(object):
+    """
+    Single API method, e.g. `client.servers.list`.
+    """
+
+    def __init__(self, client, name, api_level, route, http_method):
+        self._client = client
+        self.name = name
+        self.api_level = api_level
+        self.route = route
+        self.http_method = http_method
+
+    def __call__(self, **kwargs):
+        return self._client.call(self.api_level, self.route,
+                                 self.http_method, **kwargs)
+
+    def __repr__(self):
+        return '<Endpoint {} {} {}>'.format(self.name, self.http_method.upper(),
+                                            self.route)
+
+
+class Group(object):
+    """
+    Group of commands, e.g. `client.servers` or `client.account`.
+    """
+
+    def __init__(self, client, scheme):
+        self._client = client
+        self._scheme = scheme
+        self._children = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name.rstrip('_').replace('_', '-')]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, name):
+        child = self._children.get(name)
+        if child is None:
+            entry = self._scheme.get(name)
+            if not isinstance(entry, dict):
+                raise KeyError(name)
+            if 'route' not in entry:
+                child = Group(self._client, entry)
+            elif entry['route']:
+                child = Endpoint(self._client, name, entry['api_level'],
+                                 entry['route'], entry['http-method'])
+            else:
+                # service commands like `configure` have no API route
+                raise KeyError(name)
+            self._children[name] = child
+        return child
+
+    def __dir__(self):
+        names = [name.replace('-', '_') for name, entry in self._scheme.items()
+                 if isinstance(entry, dict) and entry.get('route', True)]
+        return sorted(name + '_' if keyword.iskeyword(name) else name
+                      for name in names)
+
+
+class Client(Group):
+    """
+    Scalr API client, settings not passed explicitly are taken
+    from scalr-ctl settings active at the moment of creation.
+    """
+
+    def __init__(self, key_id=None, secret_key=None, env_id=None,
+                 account_id=None, api_host=None, api_scheme=None,
+                 ssl_verify_peer=None, debug=False):
+        self.context = Context()
+        self._configure(key_id=key_id, secret_key=secret_key, env_id=env_id,
+                        account_id=account_id, api_host=api_host, api_scheme=api_scheme,
+                        ssl_verify_peer=ssl_verify_peer, debug=debug)
+        super(Client, self).__init__(self, utils.read_scheme())
+
+    def _configure(self, key_id=None, secret_key=None, env_id=None,
+                   account_id=None, api_host=None, api_scheme=None,
+                   ssl_verify_peer=None, debug=False):
+        overrides = {
+            'API_KEY_ID': key_id,
+            'API_SECRET_KEY': secret_key,
+            'envId': env_id,
+            'accountId': account_id,
+            'API_HOST': api_host,
+            'API_SCHEME': api_scheme,
+            'SSL_VERIFY_PEER': ssl_verify_peer,
+        }
+        for key, value in overrides.items():
+            if value is not None:
+                setattr(self.context, key, value)
+        self.context.debug_mode = debug
+        self.context.colored_output = False
+
+    @classmethod
+    def from_config(cls, profile=None, **kwargs):
+        """
+        Creates client from scalr-ctl configuration file,
+        explicit arguments take precedence over the file.
+        """
+        client = cls()
+        for key, value in (utils.read_config(profile) or {}).items():
+            if hasattr(_settings, key):
+                setattr(client.context, key, value)
+        client._configure(**kwargs)
+        return client
+
+    def call(self, api_level, route, http_method, **kwargs):
+        """
+        Makes API call, `body` is an alias for the body parameter,
+        `all` fetches all pages of a list.
+        """
+        fetch_all = kwargs.pop('all', False)
+        body = kwargs.pop('body', None)
+
+        with self.context:
+            spec = utils.read_spec(api_level, ext='json')
+            plan = plans.get_plan(spec, route, http_method)
+
+            if body is not None and plan.body_param_name:
+                kwargs[plan.body_param_name] = body
+            for name in ('envId', 'accountId'):
+                if name in plan.path_params and not kwargs.get(name):
+                    kwargs[name] = getattr(settings, name)
+
+            missing = [name for name in plan.path_params if not kwargs.get(name)]
+            if missing:
+                raise TypeError("Missing required parameters: {}".format(
+                    ', '.join(sorted(missing))))
+            plan.check_arguments(kwargs)
+            uri, payload, data = plan.build(kwargs)
+
+        if plan.returns_iterable and http_method == 'get':
+            return self._iter_list(api_level, uri, payload, fetch_all)
+        return self._request(http_method, api_level, uri, payload, data).get('data')
+
+    def _request(self, http_method, api_level, uri, payload, data):
+        with self.context:
+            raw_response = request.request(http_method, api_level, uri,
+                                           payload, json.dumps(data))
+        if not raw_response:
+            return {}
+        try:
+            response = json.loads(raw_response)
+        except ValueError:
+            raise APIError([{'message': "Invalid server response"}])
+        if response.get('errors'):
+            raise APIError(response['errors'])
+        return response
+
+    def _iter_list(self, api_level, uri, payload, fetch_all):
+        payload = dict(payload)
+        page_num = int(payload.get('pageNum') or 1)
+
+        while True:
+            if fetch_all:
+                payload['pageNum'] = page_num
+            response = self._request('get', api_level, uri, payload, {})
+            data = response.get('data') or []
+            for item in data:
+                yield item
+
+            pagination = response.get('pagination') or {}
+            if not (fetch_all and data and pagination.get('next')):
+                break
+            page_num += 1
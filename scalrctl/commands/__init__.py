@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
+import collections
 import json
 import re
-import os
-import time
 
-import dicttoxml
+import six
 
-from scalrctl import click, request, settings, utils, view, examples, defaults
+from scalrctl import (click, context, request, utils, view, examples, query, plans,
+                      validation, pool, webhooks, profiler)
+from scalrctl.context import settings
 
 __author__ = 'Dmitriy Korsakov'
 
@@ -22,6 +23,27 @@ class MultipleClickException(click.ClickException):
         click.utils.echo('%s' % self.format_message(), file=file)
 
 
+# options of the invocation that override settings of --profiles
+_INVOCATION_SETTINGS = ('debug_mode', 'colored_output', 'view')
+
+_TARGET_PARAM_RE = re.compile(r'^(\w+?)(Id|Name)$')
+
+
+def _get_row_id(row, target_param):
+    """
+    Returns value of `target_param` for a list row: `serverId` is the
+    `id` field, `globalVariableName` is `name`, `imageId` of role images
+    (`{"role": {"id": ...}, "image": {"id": ...}}`) is `image.id`.
+    """
+    match = _TARGET_PARAM_RE.match(target_param)
+    if not match:
+        return row.get(target_param)
+    nested, field = match.group(1), match.group(2).lower()
+    if isinstance(row.get(nested), dict):
+        return row[nested].get(field)
+    return row.get(field)
+
+
 class BaseAction(object):
 
     epilog = None
@@ -74,7 +96,9 @@ class Action(BaseAction):
         self.route = route
         self.http_method = http_method
         self.api_level = api_level
-        self.strip_metadata = False
+        self.unchanged_object = None
+        self._discriminators = {}
+        self._reset_arguments()
 
         self._init()
 
@@ -88,24 +112,28 @@ class Action(BaseAction):
                 name=self.name
             )
 
+    @property
+    def _plan(self):
+        return plans.get_plan(self.raw_spec, self.route, self.http_method)
+
     def _check_arguments(self, **kwargs):
-        route_data = self.raw_spec['paths'][self.route]
-        if 'parameters' not in route_data:
-            return
-
-        for param in route_data['parameters']:
-            pattern = param.get('pattern')
-            param_name = param.get('name')
-            if pattern and param_name and param_name in kwargs:
-                value = str(kwargs.get(param_name, '')).strip()
-                matches = re.match(pattern, value)
-                if not matches:
-                    matches = re.search(pattern, value, re.MULTILINE)
-                if not matches or len(matches.group()) != len(value):
-                    raise click.ClickException("Invalid value for {}"
-                                               .format(param_name))
+        self._plan.check_arguments(kwargs)
+
+    def _reset_arguments(self):
+        """
+        Restores defaults of the options applied by `_apply_arguments`,
+        class-level values are defaults, instances must not share them.
+        """
+        self.strip_metadata = False
+        self.query = None
+        self.projection = None
+        self.fetch_all = False
+        self.dry_run = type(self).dry_run
+        self._table_columns = list(type(self)._table_columns)
 
     def _apply_arguments(self, **kwargs):
+        # options of a previous invocation of the same action do not apply
+        self._reset_arguments()
         if kwargs.get('filters'):
             for pair in kwargs.pop('filters').split(','):
                 kv = pair.split('=')
@@ -115,12 +143,28 @@ class Action(BaseAction):
         if kwargs.get('columns'):
             self._table_columns = kwargs.pop('columns').split(',')
 
+        if kwargs.get('query'):
+            self.query = query.compile_query(kwargs.pop('query'))
+            pushdown = self.query.pushdown(self._get_available_filters())
+            for key, value in pushdown.items():
+                if not kwargs.get(key):
+                    kwargs[key] = value
+            utils.debug("Query params pushed down to API: {}".format(pushdown))
+
+        if kwargs.get('select'):
+            self.projection = query.parse_fields(kwargs.pop('select'))
+            if not self._table_columns:
+                self._table_columns = ['.'.join(path) for path in self.projection]
+
         if kwargs.pop('strip_metadata', False):
             self.strip_metadata = True
 
         if kwargs.pop('dryrun', False):
             self.dry_run = True
 
+        if kwargs.pop('fetch_all', False):
+            self.fetch_all = True
+
         if kwargs.pop('debug', None):
             settings.debug_mode = True
 
@@ -132,7 +176,10 @@ class Action(BaseAction):
 
         return kwargs
 
-    def _get_object(self, *args, **kwargs):
+    def _fetch_object(self, *args, **kwargs):
+        """
+        Returns the current object as the API returns it.
+        """
         try:
             obj = self.__class__(name='get', route=self.route,
                                  http_method='get', api_level=self.api_level)
@@ -140,19 +187,47 @@ class Action(BaseAction):
             utils.debug(raw_text)
             if raw_text is None:
                 return {}
-            json_text = json.loads(raw_text)
-            filtered = self._filter_json_object(json_text['data'],
-                                                filter_createonly=True)
-            return json.dumps(filtered, indent=2)
+            return json.loads(raw_text)['data']
         except Exception as e:
             utils.reraise(e)
 
+    def _get_object(self, *args, **kwargs):
+        filtered = self._filter_json_object(self._fetch_object(*args, **kwargs),
+                                            filter_createonly=True)
+        return json.dumps(filtered, indent=2)
+
     def _edit_object(self, *args, **kwargs):
-        raw_object = self._get_object(*args, **kwargs)
-        raw_object = click.edit(raw_object)
-        if raw_object is None:
+        current = self._fetch_object(*args, **kwargs)
+        raw_object = json.dumps(self._filter_json_object(current, filter_createonly=True),
+                                indent=2)
+        edited_object = click.edit(raw_object)
+        if edited_object is None:
             raise ValueError("No changes in JSON")
-        return json.loads(raw_object)
+        return self._diff_object(json.loads(raw_object),
+                                 json.loads(edited_object), original=current)
+
+    def _diff_object(self, current, changed, original=None):
+        """
+        Returns top-level properties of `changed` that differ from
+        `current`, sub-objects are sent as a whole. Saves `original`
+        (the object as fetched, with read-only keys, `current` by
+        default) to `self.unchanged_object` when there is nothing
+        to update.
+        """
+        patch = {}
+        for key, value in changed.items():
+            if key not in current or current[key] != value:
+                patch[key] = value
+
+        if not patch:
+            self.unchanged_object = current if original is None else original
+            return patch
+
+        body_filter = self._plan.body_filter
+        disc_key = body_filter.discriminator if body_filter else None
+        if disc_key and disc_key in changed:
+            patch[disc_key] = changed[disc_key]
+        return patch
 
     def _edit_example(self):
         commentary = examples.create_post_example(self.api_level, self.route)
@@ -185,55 +260,82 @@ class Action(BaseAction):
         result_errmsg = '\n'.join(messages)
         return result_errmsg
 
+    @profiler.phased('decode')
+    def _parse_response(self, response, hidden=False):
+        """
+        Decodes server response, prints warnings and raises on errors.
+        """
+        try:
+            response_json = json.loads(response)
+        except ValueError:
+            utils.debug("Server response: {}".format(str(response)))
+            utils.reraise("Invalid server response")
+
+        errors = response_json.get('errors')
+        warnings = response_json.get('warnings')  # type: list[dict]
+
+        if warnings:
+            utils.warning(*warnings)
+
+        if errors:
+            errmsg = self._format_errmsg(errors)
+            error = MultipleClickException(errmsg)
+            error.code = 1
+            raise error
+
+        if not hidden:
+            utils.debug(response_json.get('meta'))
+
+        return response_json
+
+    @profiler.phased('render')
+    def _render_response(self, response_json, response=None):
+        # SCALRCORE-10392
+        if self.strip_metadata and self.http_method.upper() == 'GET' and \
+                settings.view in ('raw', 'json', 'xml') and 'data' in response_json:
+            response_json = response_json['data']
+            response = None
+
+        if settings.view in ('raw', 'json'):
+            click.echo(response if response is not None else json.dumps(response_json))
+        elif settings.view == 'xml':
+            view.XMLWriter().write_document(response_json)
+        elif settings.view == 'tree':
+            view.write_tree(response_json.get('data'))
+            click.echo()
+        elif settings.view in view.RECORD_FORMATS:
+            self._get_record_writer().write(self._get_records(response_json))
+        elif settings.view == 'table':
+            columns = self._table_columns or self._get_column_names()
+            if self._returns_iterable():
+                rows, current_page, last_page = view.calc_vertical_table(response_json,
+                                                                         columns)
+                pre = "Page: {} of {}".format(current_page, last_page)
+                click.echo(view.build_vertical_table(columns, rows, pre=pre))  # XXX
+            else:
+                click.echo(view.build_horizontal_table(
+                    view.calc_horizontal_table(response_json, columns)))
+
+    @staticmethod
+    def _get_records(response_json):
+        data = response_json.get('data')
+        if isinstance(data, list):
+            return data
+        return [data] if data else []
+
+    def _get_record_writer(self):
+        columns = self._table_columns
+        if settings.view != 'jsonl':
+            columns = columns or self._get_column_names()
+        return view.RecordWriter(settings.view, columns=columns)
+
     def _format_response(self, response, hidden=False, **kwargs):
         text = None
 
         if response:
-            try:
-                response_json = json.loads(response)
-            except ValueError:
-                utils.debug("Server response: {}".format(str(response)))
-                utils.reraise("Invalid server response")
-
-            errors = response_json.get('errors')
-            warnings = response_json.get('warnings')  # type: list[dict]
-
-            if warnings:
-                utils.warning(*warnings)
-
-            if errors:
-                errmsg = self._format_errmsg(errors)
-                error = MultipleClickException(errmsg)
-                error.code = 1
-                raise error
-
+            response_json = self._parse_response(response, hidden=hidden)
             if not hidden:
-                utils.debug(response_json.get('meta'))
-
-            if self.strip_metadata and self.http_method.upper() == 'GET' and \
-                    settings.view in ('raw', 'json', 'xml') and 'data' in response_json:  # SCALRCORE-10392
-                response_json = response_json['data']
-                response = json.dumps(response_json)
-
-            if hidden:
-                pass
-            elif settings.view in ('raw', 'json'):
-                click.echo(response)
-            elif settings.view == 'xml':
-                click.echo(dicttoxml.dicttoxml(response_json))
-            elif settings.view == 'tree':
-                data = json.dumps(response_json.get('data'))
-                click.echo(view.build_tree(data))
-            elif settings.view == 'table':
-                columns = self._table_columns or self._get_column_names()
-                if self._returns_iterable():
-                    rows, current_page, last_page = view.calc_vertical_table(response_json,
-                                                                    columns)
-                    pre = "Page: {} of {}".format(current_page, last_page)
-                    click.echo(view.build_vertical_table(columns, rows, pre=pre))  # XXX
-                else:
-                    click.echo(view.build_horizontal_table(
-                        view.calc_horizontal_table(response_json, columns)))
+                self._render_response(response_json, response)
 
         elif self.http_method.upper() == 'DELETE':
             deleted_id = kwargs.get(self.delete_target, '') or ''
@@ -250,6 +352,26 @@ class Action(BaseAction):
             text = "Deleted {}".format(deleted_id)
         return text
 
+    def _get_bulk_target(self):
+        """
+        Returns (ID parameter, list route) if PATCH or DELETE
+        can be applied to a set of objects, e.g. ('serverId',
+        '/{envId}/servers/').
+        """
+        if self.http_method.upper() not in ('PATCH', 'DELETE'):
+            return None
+        # bulk mode builds requests without pre(), commands that
+        # prepare the request themselves apply to a single object
+        if six.get_unbound_function(type(self).pre) is not six.get_unbound_function(Action.pre):
+            return None
+        plan = self._plan
+        list_data = self.raw_spec['paths'].get(plan.list_route, {})
+        if not plan.target_param or 'get' not in list_data:
+            return None
+        if not plans.get_plan(self.raw_spec, plan.list_route, 'get').returns_iterable:
+            return None
+        return plan.target_param, plan.list_route
+
     def _get_default_options(self):
         options = []
         for param in self._get_raw_params():
@@ -280,6 +402,23 @@ class Action(BaseAction):
             options.append(interactive)
             """
 
+        bulk_target = self._get_bulk_target()
+        if bulk_target:
+            where = click.Option(('--where', 'where'), required=False,
+                                 help="Apply to all objects matching the "
+                                      "expression instead of --{}. Example: "
+                                      "--where \"name=='test'\"".format(bulk_target[0]))
+            options.append(where)
+            ids_from = click.Option(('--ids-from', 'ids_from'), required=False,
+                                    help="Apply to objects listed in the file, "
+                                         "one per line, '-' reads stdin.")
+            options.append(ids_from)
+            parallel = click.Option(('--parallel', 'parallel'), type=int,
+                                    default=pool.DEFAULT_PARALLEL, show_default=True,
+                                    help="Number of concurrent requests "
+                                         "for --where and --ids-from.")
+            options.append(parallel)
+
         if self.http_method.upper() == 'GET':
             if self._returns_iterable():
                 maxres = click.Option(('--max-results', 'maxResults'),
@@ -293,6 +432,11 @@ class Action(BaseAction):
                                        "number. Example: --page-number=3")
                 options.append(pagenum)
 
+                fetch_all = click.Option(('--all', 'fetch_all'), is_flag=True,
+                                         default=False, help="Fetch all pages. "
+                                         "Records are printed as pages arrive.")
+                options.append(fetch_all)
+
                 filters = self._get_available_filters()
                 if filters:
                     filters = sorted(filters)
@@ -303,14 +447,48 @@ class Action(BaseAction):
                                            required=False, help=filter_help)
                     options.append(filters)
 
-                columns_help = ("Filter columns in table view "
-                                "[--table required]. Example: NAME,SIZE,"
+                columns_help = ("Filter columns in table, JSON lines, CSV "
+                                "and TSV views. Example: NAME,SIZE,"
                                 "SCOPE. Available columns: {}."
                                 ).format(', '.join(self._get_column_names()))
                 columns = click.Option(('--columns', 'columns'),
                                        required=False, help=columns_help)
                 options.append(columns)
 
+                query_help = ("Filter records by expression, conditions on "
+                              "filterable fields are sent to the API. Example: "
+                              "--query \"status=='running' and farm.id==42\"")
+                query_ = click.Option(('--query', 'query'),
+                                      required=False, help=query_help)
+                options.append(query_)
+
+                select_help = ("Output only selected fields. "
+                               "Example: --select id,hostname,farm.id")
+                select = click.Option(('--select', 'select'),
+                                      required=False, help=select_help)
+                options.append(select)
+
+                profiles = click.Option(('--profiles', 'profiles'),
+                                        required=False,
+                                        help="Run with each of the configuration "
+                                             "profiles concurrently and merge all "
+                                             "pages, 'source' column shows the "
+                                             "profile. Example: --profiles prod,dev")
+                options.append(profiles)
+
+                all_envs = click.Option(('--all-envs', 'all_envs'),
+                                        is_flag=True, default=False,
+                                        help="Run in all environments of the API "
+                                             "key concurrently and merge all pages, "
+                                             "'source' column shows the environment.")
+                options.append(all_envs)
+
+                parallel = click.Option(('--parallel', 'parallel'), type=int,
+                                        default=pool.DEFAULT_PARALLEL, show_default=True,
+                                        help="Number of concurrent requests "
+                                             "for --profiles and --all-envs.")
+                options.append(parallel)
+
             raw = click.Option(('--raw', 'transformation'), is_flag=True,
                                flag_value='raw', default=False, hidden=True,
                                help="Print raw response")
@@ -325,9 +503,19 @@ class Action(BaseAction):
             tree = click.Option(('--tree', 'transformation'), is_flag=True,
                                 flag_value='tree', default=False,
                                 help="Print response as a colored tree")
+            jsonl = click.Option(('--jsonl', 'transformation'), is_flag=True,
+                                 flag_value='jsonl', default=False,
+                                 help="Print records as JSON lines")
+            csv = click.Option(('--csv', 'transformation'), is_flag=True,
+                               flag_value='csv', default=False,
+                               help="Print records as CSV")
+            tsv = click.Option(('--tsv', 'transformation'), is_flag=True,
+                               flag_value='tsv', default=False,
+                               help="Print records as tab-separated values")
             nocolor = click.Option(('--nocolor', 'nocolor'), is_flag=True,
                                    default=False, help="Use colors")
-            options += [raw, tree, nocolor, json_, xml, strip_metadata]
+            options += [raw, tree, nocolor, json_, xml, strip_metadata,
+                        jsonl, csv, tsv]
 
             if self.name not in ('get', 'retrieve'):  # [ST-54] [ST-102]
                 table = click.Option(('--table', 'transformation'),
@@ -343,33 +531,16 @@ class Action(BaseAction):
         return options
 
     def _get_body_type_params(self):
-        route_data = self.raw_spec['paths'][self.route][self.http_method]
-        return [param for param in route_data.get('parameters', '')]
+        return list(self._plan.method_params)
 
     def _get_path_type_params(self):
-        route_data = self.raw_spec['paths'][self.route]
-        return [param for param in route_data.get('parameters', '')]
+        return list(self._plan.route_params)
 
     def _get_raw_params(self):
-        result = self._get_path_type_params()
-        if self.http_method.upper() in ('GET', 'DELETE'):
-            body_params = self._get_body_type_params()
-            result.extend(body_params)
-        return result
+        return self._plan.raw_params
 
     def _returns_iterable(self):
-        responses = self.raw_spec['paths'][self.route][self.http_method]['responses']
-        if '200' in responses:
-            response_200 = responses['200']
-            if 'schema' in response_200:
-                schema = response_200['schema']
-                if '$ref' in schema:
-                    object_key = schema['$ref'].split('/')[-1]
-                    object_descr = self.raw_spec['definitions'][object_key]
-                    object_properties = object_descr['properties']
-                    data_structure = object_properties['data']
-                    return 'array' == data_structure.get('type')
-        return False
+        return self._plan.returns_iterable
 
     def _get_available_filters(self):
         if self._returns_iterable():
@@ -408,14 +579,7 @@ class Action(BaseAction):
         Returns document section
         Example: #/definitions/Image returns Image defenition section.
         """
-        if response_ref.startswith('#'):
-            paths = response_ref.split('/')[1:]
-            result = self.raw_spec
-            for path in paths:
-                if path not in result:
-                    return
-                result = result[path]
-            return result
+        return plans.lookup(self.raw_spec, response_ref)
 
     @property
     def _result_descr(self):
@@ -435,108 +599,22 @@ class Action(BaseAction):
                     response_ref = schema['$ref']
                     return self._lookup(response_ref)
 
-    def _list_concrete_types(self, schema):
-        types = []
-        if "x-concreteTypes" in schema:
-            for ref_dict in schema["x-concreteTypes"]:
-                ref_link = ref_dict['$ref']
-                types += [link.split("/")[-1] for link in self._list_concrete_types_recursive(ref_link)]
-        return types
-
-    def _list_concrete_types_recursive(self, reference):
-        references = []
-        schema = self._lookup(reference)
-        if "x-concreteTypes" not in schema:
-            references.append(reference)
-        else:
-            for ref_dict in schema["x-concreteTypes"]:
-                references += self._list_concrete_types_recursive(ref_dict['$ref'])
-        return references
-
     def _filter_json_object(self, data, filter_createonly=False,
                             schema=None, reference=None):
         """
         Removes immutable parts from JSON object
         before sending it in POST or PATCH.
         """
-        filtered = {}
-
-        # load `schema`
-        if schema is None:
-            for param in self._get_body_type_params():
-                if 'schema' in param:
-                    schema = param['schema']
-                    if '$ref' in schema:
-                        reference = schema['$ref']
-                        schema = self._lookup(schema['$ref'])
-                    break
-
-        # load child object as `schema`
-        if 'discriminator' in schema:
-
-            disc_key = schema['discriminator']
-            disc_path = '{}/{}'.format(reference, disc_key)
-            disc_value = data.get(disc_key) or self._discriminators.get(disc_path)
-
-            if not disc_value:
-                raise click.ClickException((
-                    "Provided JSON object is incorrect: missing required param '{}'."
-                ).format(disc_key))
-            elif disc_value not in self._list_concrete_types(schema):
-                raise click.ClickException((
-                    "Provided JSON object is incorrect: required "
-                    "param '{}' has invalid value '{}', must be one of: {}."
-                ).format(disc_key, disc_value, self._list_concrete_types(schema)))
-            else:
-                # save discriminator for current reference/key
-                self._discriminators[disc_path] = disc_value
-
-            reference = '#/definitions/{}'.format(disc_value)
-            schema = self._lookup(reference)
-
-        # filter input data by properties of `schema`
-        if schema and 'properties' in schema:
-            create_only_props = schema.get('x-createOnly', '')
-            for p_key, p_value in schema['properties'].items():
-
-                if reference:
-                    key_path = '.'.join([reference.split('/')[-1], p_key])
-                else:
-                    key_path = p_key
-
-                if p_key not in data:
-                    utils.debug("Ignore {}, unknown key.".format(key_path))
-                    continue
-                if p_value.get('readOnly'):
-                    utils.debug("Ignore {}, read-only key.".format(key_path))
-                    continue
-                if filter_createonly and p_key in create_only_props:
-                    utils.debug("Ignore {}, create-only key.".format(key_path))
-                    continue
-
-                if '$ref' in p_value and isinstance(data[p_key], dict):
-                    ref = p_value['$ref']
-                    utils.debug("Filter sub-object: {}.".format(ref))
-                    filtered[p_key] = self._filter_json_object(
-                        data[p_key],
-                        filter_createonly=filter_createonly,
-                        reference=ref,
-                        schema=self._lookup(ref))
-                elif '$ref' in p_value.get('items', {}) and isinstance(data[p_key], list):
-                    ref = p_value['items']['$ref']
-                    utils.debug("Filter list of sub-objects: {}.".format(ref))
-                    filtered[p_key] = [
-                        self._filter_json_object(
-                            item,
-                            filter_createonly=filter_createonly,
-                            reference=ref,
-                            schema=self._lookup(ref),
-                        ) for item in data[p_key]]
-                else:
-                    # add valid key-value
-                    filtered[p_key] = data[p_key]
-
-        return filtered
+        if schema is None and reference is None:
+            plan = self._plan.body_filter
+            if plan is None:
+                return {}
+        elif reference is not None:
+            plan = plans.get_schema_plan(self.raw_spec, reference)
+        else:
+            plan = plans.get_schema_plan(self.raw_spec, schema=schema)
+        return plan.filter(data, filter_createonly=filter_createonly,
+                           discriminators=self._discriminators)
 
     def _list_createonly_properties(self):
         """
@@ -554,15 +632,54 @@ class Action(BaseAction):
             obj = self._lookup(path)
             return obj['x-createOnly'] if 'x-createOnly' in obj else []
 
+    def _collect_discriminators(self, json_object):
+        """
+        Resolves discriminators of PATCH body without requesting
+        the current object, returns False if it is not possible.
+        """
+        plan = self._plan.body_filter
+        if plan is None or not isinstance(json_object, dict):
+            return True
+        return plan.collect_discriminators(json_object, self._discriminators)
+
+    def _get_body_errors(self, json_object, partial=False):
+        """
+        Checks request body against its spec definition,
+        returns list of errors in API format.
+        """
+        schema = self._plan.body_schema
+        if schema is None:
+            return []
+        validator = validation.get_validator(self.raw_spec, schema=schema)
+        return validator.validate(json_object, partial=partial)
+
+    def _coerce_body(self, json_object):
+        """
+        Converts numeric strings of the body to numbers where the
+        spec expects them, in place.
+        """
+        schema = self._plan.body_schema
+        if schema is not None:
+            validation.get_validator(self.raw_spec, schema=schema).coerce(json_object)
+        return json_object
+
+    def _validate_body(self, json_object, partial=False):
+        self._coerce_body(json_object)
+        errors = self._get_body_errors(json_object, partial=partial)
+        if errors:
+            error = MultipleClickException(self._format_errmsg(errors))
+            error.code = 1
+            raise error
+
     @property
     def _request_template(self):
-        basepath_uri = self.raw_spec['basePath']
-        return '{}{}'.format(basepath_uri, self.route)
+        return self._plan.template
 
     def pre(self, *args, **kwargs):
         """
         Before request is made.
         """
+        self.unchanged_object = None
         kwargs = self._apply_arguments(**kwargs)
         self._check_arguments(**kwargs)
 
@@ -578,23 +695,31 @@ class Action(BaseAction):
         for param_name in (p['name'] for p in self._get_body_type_params()):
             try:
                 if param_name in import_data:
-                    json_object = self._filter_json_object(
-                        import_data[param_name],
-                        filter_createonly=True
-                    ) if http_method == 'PATCH' else import_data[param_name]
+                    json_object = import_data[param_name]
+                    if http_method == 'PATCH':
+                        json_object = self._filter_json_object(
+                            json_object, filter_createonly=True)
+                        if not self.dry_run:
+                            get_kwargs = dict(kwargs, hide_output=True)
+                            current = self._fetch_object(*args, **get_kwargs)
+                            json_object = self._diff_object(
+                                self._filter_json_object(current, filter_createonly=True),
+                                json_object, original=current)
                 else:
                     if http_method == 'PATCH':
                         if stdin:
-                            # XXX: `_get_object` makes additional GET to load all
-                            # discriminator's into `self._discriminators` map
-                            self._get_object(*args, **kwargs)
                             json_object = self._read_object()
+                            if not self._collect_discriminators(json_object):
+                                # body is ambiguous, load current object to
+                                # fill `self._discriminators` map
+                                self._get_object(*args, **kwargs)
                         else:
                             json_object = self._edit_object(*args, **kwargs)
                     elif http_method == 'POST':
                         json_object = self._read_object() if stdin else self._edit_example()
 
                 json_object = self._filter_json_object(json_object)
+                self._validate_body(json_object, partial=http_method == 'PATCH')
                 kwargs[param_name] = json_object
             except ValueError as e:
                 utils.reraise(e)
@@ -616,29 +741,45 @@ class Action(BaseAction):
         Callback for click subcommand.
         """
         hide_output = kwargs.pop('hide_output', False)  # [ST-88]
+
+        where = kwargs.pop('where', None)
+        ids_from = kwargs.pop('ids_from', None)
+        parallel = kwargs.pop('parallel', None) or pool.DEFAULT_PARALLEL
+        bulk_target = self._get_bulk_target()
+        if bulk_target:
+            if where or ids_from:
+                return self._run_bulk(where, ids_from, parallel, *args, **kwargs)
+            if not kwargs.get(bulk_target[0]):
+                if not (self.prompt_for and bulk_target[0] in self.prompt_for):
+                    raise click.UsageError(
+                        'Missing option "--{}", "--where" or "--ids-from".'.format(
+                            bulk_target[0]))
+                kwargs[bulk_target[0]] = click.prompt(bulk_target[0])
+
+        profiles = kwargs.pop('profiles', None)
+        all_envs = kwargs.pop('all_envs', False)
+        if profiles or all_envs:
+            args, kwargs = self.pre(*args, **kwargs)
+            sources = self._get_sources(profiles, all_envs)
+            return self._run_sources(sources, parallel, *args, **kwargs)
+
         args, kwargs = self.pre(*args, **kwargs)
 
-        uri = self._request_template
-        payload = {}
-        data = {}
+        if self.unchanged_object is not None:
+            if not hide_output:
+                click.echo("No changes, update skipped.")
+            return json.dumps({'data': self.unchanged_object, 'meta': {}})
 
-        if '{envId}' in uri and not kwargs.get('envId') and settings.envId:
+        plan = self._plan
+
+        if 'envId' in plan.path_params and not kwargs.get('envId') and settings.envId:
             kwargs['envId'] = settings.envId
 
-        if '{accountId}' in uri and not kwargs.get('accountId') and settings.accountId:
+        if 'accountId' in plan.path_params and not kwargs.get('accountId') and settings.accountId:
             kwargs['accountId'] = settings.accountId
 
-        if kwargs:
-            # filtering in-body and empty params
-            uri = self._request_template.format(**kwargs)
-            for key, value in kwargs.items():
-                param = '{{{}}}'.format(key)
-                if value and (param not in self._request_template):
-                    body_params = self._get_body_type_params()
-                    if self.http_method.upper() in ('GET', 'DELETE'):
-                        payload[key] = value
-                    elif body_params and key == body_params[0]['name']:
-                        data.update(value)
+        # filtering in-body and empty params
+        uri, payload, data = plan.build(kwargs)
 
         if self.dry_run:
             click.echo('{} {} {} {}'.format(self.http_method, uri,
@@ -647,9 +788,14 @@ class Action(BaseAction):
             return json.dumps({'data': {}, 'meta': {}})
 
         data = json.dumps(data)
+        if self.fetch_all and self.http_method.upper() == 'GET':
+            return self._run_paginated(uri, payload, data, hidden=hide_output)
+
         raw_response = request.request(self.http_method, self.api_level,
                                        uri, payload, data)
         response = self.post(raw_response)
+        if self.query or self.projection:
+            response = self._apply_query(response)
 
         text = self._format_response(response, hidden=hide_output, **kwargs)
         if text is not None:
@@ -657,6 +803,352 @@ class Action(BaseAction):
 
         return response
 
+    def _get_bulk_ids(self, where, ids_from, **kwargs):
+        """
+        Returns IDs of objects selected with --where or --ids-from.
+        """
+        if where and ids_from:
+            raise click.UsageError('"--where" and "--ids-from" are mutually exclusive.')
+
+        if ids_from:
+            with click.open_file(ids_from) as fp:
+                return [line.strip() for line in fp if line.strip()]
+
+        target_param, list_route = self._get_bulk_target()
+        ids = []
+        for row in self._list_objects(list_route, where, **kwargs):
+            object_id = _get_row_id(row, target_param)
+            if object_id is None:
+                raise click.UsageError(
+                    'Cannot find "{}" of {}, use "--ids-from" instead.'.format(
+                        target_param, json.dumps(row)))
+            ids.append(object_id)
+        return ids
+
+    def _list_objects(self, list_route, where=None, **kwargs):
+        """
+        Returns all objects of the list route matching `where`,
+        equality conditions on filterable fields are sent to the API.
+        """
+        lister = Action(name='list', route=list_route, http_method='get',
+                        api_level=self.api_level)
+        list_plan = lister._plan
+        list_kwargs = dict((key, value) for key, value in kwargs.items()
+                           if key in list_plan.path_params)
+        for name in ('envId', 'accountId'):
+            if name in list_plan.path_params and not list_kwargs.get(name):
+                list_kwargs[name] = getattr(settings, name)
+
+        where_query = query.compile_query(where) if where else None
+        if where_query:
+            list_kwargs.update(where_query.pushdown(lister._get_available_filters()))
+        uri, payload, _ = list_plan.build(list_kwargs)
+
+        rows = []
+        for response_json in lister._iter_pages(uri, payload, json.dumps({}), hidden=True):
+            page = response_json.get('data') or []
+            rows += where_query.filter(page) if where_query else page
+        return rows
+
+    def _get_bulk_body(self, **kwargs):
+        """
+        Reads PATCH body once for all objects of the bulk update.
+        """
+        if not kwargs.pop('stdin', False):
+            raise click.UsageError('Bulk update reads the object from "--stdin".')
+        body = self._read_object()
+        if not self._collect_discriminators(body):
+            raise click.ClickException(
+                "Cannot detect object type, specify its discriminator in the body.")
+        body = self._filter_json_object(body)
+        self._validate_body(body, partial=True)
+        return body
+
+    def _run_bulk(self, where, ids_from, parallel, *args, **kwargs):
+        """
+        Applies PATCH or DELETE to every selected object concurrently,
+        prints failures summary at the end.
+        """
+        kwargs = self._apply_arguments(**kwargs)
+        target_param = self._get_bulk_target()[0]
+        plan = self._plan
+
+        for name in ('envId', 'accountId'):
+            if name in plan.path_params and not kwargs.get(name):
+                kwargs[name] = getattr(settings, name)
+
+        body = None
+        if self.http_method.upper() == 'PATCH':
+            body = self._get_bulk_body(**kwargs)
+        kwargs.pop('stdin', None)
+
+        ids = self._get_bulk_ids(where, ids_from, **kwargs)
+        if not ids:
+            click.echo("No objects found.")
+            return json.dumps({'data': [], 'meta': {}})
+
+        def apply(object_id):
+            object_kwargs = dict(kwargs)
+            object_kwargs[target_param] = object_id
+            if body is not None:
+                object_kwargs[plan.body_param_name] = body
+            plan.check_arguments(object_kwargs)
+            uri, payload, data = plan.build(object_kwargs)
+            if self.dry_run:
+                click.echo('{} {} {} {}'.format(self.http_method, uri, payload, data))
+                return
+            response = request.request(self.http_method, self.api_level,
+                                       uri, payload, json.dumps(data))
+            if response:
+                self._parse_response(response, hidden=True)
+
+        verb = 'Updated' if body is not None else 'Deleted'
+        progress = pool.Progress(len(ids), label=verb)
+        failures = []
+        for object_id, _, error in pool.imap(apply, ids, parallel=parallel):
+            progress.update(failed=error is not None)
+            if error is not None:
+                message = getattr(error, 'message', None) or str(error)
+                failures.append((object_id, message))
+        progress.close()
+
+        click.echo("{} {} of {} objects in {:.1f}s.".format(
+            verb, len(ids) - len(failures), len(ids), progress.elapsed))
+        if failures:
+            for object_id, message in failures:
+                click.echo("Failed {}: {}".format(object_id, message), err=True)
+            raise click.ClickException("{} of {} operations failed".format(
+                len(failures), len(ids)))
+        return json.dumps({'data': [{target_param: object_id} for object_id in ids],
+                           'meta': {}})
+
+    def _get_sources(self, profiles, all_envs):
+        """
+        Returns [(source name, Context)] for --profiles and --all-envs,
+        options of the invocation (--debug, --view, ...) apply to all.
+        """
+        from scalrctl.commands.internal import configure
+
+        options = dict((name, getattr(settings, name)) for name in _INVOCATION_SETTINGS)
+        sources = []
+        for profile in (profiles or '').split(','):
+            profile = profile.strip()
+            if not profile:
+                continue
+            config = utils.read_config(profile)
+            if config is None:
+                raise click.ClickException("Profile not found: {}".format(profile))
+            source_context = context.Context(**dict(
+                (key, value) for key, value in config.items() if hasattr(settings, key)))
+            sources.append((profile, source_context.copy(**options)))
+        if not sources:
+            sources = [(None, context.Context())]
+
+        if not all_envs:
+            for profile, source_context in sources:
+                for param in ('envId', 'accountId'):
+                    if param in self._plan.path_params and not getattr(source_context, param):
+                        raise click.UsageError('Profile "{}" has no {}.'.format(profile, param))
+            return sources
+        if 'envId' not in self._plan.path_params:
+            raise click.UsageError('"--all-envs" works with environment commands only.')
+
+        env_sources = []
+        for profile, source_context in sources:
+            with source_context:
+                session = configure.get_session_data({
+                    'API_KEY_ID': settings.API_KEY_ID,
+                    'API_SECRET_KEY': settings.API_SECRET_KEY,
+                    'API_VERSION': settings.API_VERSION,
+                })
+            environments = (session.get('data') or {}).get('environments')
+            if not environments:
+                raise click.ClickException("Cannot list environments{}.".format(
+                    " of profile " + profile if profile else ""))
+            for env in environments:
+                name = str(env['id']) if profile is None else '{}/{}'.format(profile, env['id'])
+                env_sources.append((name, source_context.copy(
+                    envId=str(env['id']),
+                    accountId=env.get('accountId') or source_context.accountId)))
+        return env_sources
+
+    def _run_sources(self, sources, parallel, *args, **kwargs):
+        """
+        Runs the list request in every source concurrently, prints
+        merged records with the 'source' column.
+        """
+        plan = self._plan
+
+        def fetch(source):
+            name, source_context = source
+            with source_context:
+                source_kwargs = dict(kwargs)
+                for param in ('envId', 'accountId'):
+                    if param in plan.path_params:
+                        source_kwargs[param] = getattr(settings, param)
+                uri, payload, data = plan.build(source_kwargs)
+                records = []
+                for response_json in self._iter_pages(uri, payload, json.dumps(data), hidden=True):
+                    records += self._get_records(self._filter_records(response_json))
+                return records
+
+        rows = []
+        failures = []
+        for (name, _), records, error in pool.imap(fetch, sources, parallel=parallel):
+            if error is not None:
+                failures.append(name)
+                message = getattr(error, 'message', None) or str(error)
+                click.echo("Failed {}: {}".format(name, message), err=True)
+                continue
+            rows += [collections.OrderedDict([('source', name)] + list(record.items()))
+                     for record in records]
+
+        # sources finish in any order
+        order = dict((name, num) for num, (name, _) in enumerate(sources))
+        rows.sort(key=lambda row: order[row['source']])
+        if settings.view in ('table', 'csv', 'tsv') or self._table_columns:
+            self._table_columns = ['source'] + [column for column in (
+                self._table_columns or self._get_column_names()) if column != 'source']
+
+        response_json = {'data': rows, 'meta': {}}
+        self._render_response(response_json)
+        if failures:
+            raise click.ClickException("{} of {} sources failed".format(
+                len(failures), len(sources)))
+        return json.dumps(response_json)
+
+    def _iter_pages(self, uri, payload, data, hidden=False):
+        """
+        Requests all pages of the list one by one,
+        yields decoded responses as they arrive.
+        """
+        payload = dict(payload)
+        page_num = int(payload.get('pageNum') or 1)
+
+        while True:
+            payload['pageNum'] = page_num
+            raw_response = request.request(self.http_method, self.api_level,
+                                           uri, payload, data)
+            response = self.post(raw_response)
+            if not response:
+                break
+            response_json = self._parse_response(response, hidden=hidden)
+            pagination = response_json.get('pagination') or {}
+            has_next = pagination.get('next') and response_json.get('data')
+            yield response_json
+
+            if not has_next:
+                break
+            page_num += 1
+
+    def _run_paginated(self, uri, payload, data, hidden=False):
+        """
+        Prints all pages of the list as they arrive as a single
+        document, only the current page is kept in memory. With
+        `hidden` nothing is printed and all records are returned.
+        """
+        table = extractor = writer = xml = None
+        response_json = None
+        records = []
+        printed = streamed = tree = False
+
+        for response_json in self._iter_pages(uri, payload, data, hidden=hidden):
+            response_json = self._filter_records(response_json)
+            if hidden:
+                records += response_json.get('data') or []
+                continue
+            if not response_json.get('data'):
+                continue
+
+            if settings.view in view.RECORD_FORMATS:
+                if writer is None:
+                    writer = self._get_record_writer()
+                writer.write(self._get_records(response_json))
+            elif settings.view == 'table':
+                columns = self._table_columns or self._get_column_names()
+                if table is None:
+                    table = view.StreamingTable(columns)
+                    extractor = view.ColumnExtractor(columns)
+                rows = view.calc_vertical_table(response_json, columns,
+                                                extractor=extractor)[0]
+                table.write(rows)
+            elif settings.view == 'xml':
+                if xml is None:
+                    xml = view.XMLWriter()
+                    xml.start()
+                    if not self.strip_metadata:
+                        xml.start_list('data')
+                xml.write_items(response_json['data'])
+            elif settings.view in ('json', 'raw'):
+                # one array for all pages, the envelope is written once
+                if not streamed:
+                    click.echo('[' if self.strip_metadata else '{"data": [', nl=False)
+                else:
+                    click.echo(', ', nl=False)
+                click.echo(', '.join(json.dumps(item) for item in response_json['data']),
+                           nl=False)
+                streamed = True
+            elif settings.view == 'tree':
+                # pages continue the same top-level sequence
+                view.write_tree(response_json['data'])
+                tree = True
+            else:
+                self._render_response(response_json)
+            printed = True
+
+        if table is not None:
+            table.close()
+        elif xml is not None:
+            if not self.strip_metadata:
+                xml.end_list('data')
+                for key, value in response_json.items():
+                    if key != 'data':
+                        xml.write_element(key, value)
+            xml.end()
+        elif streamed:
+            if self.strip_metadata:
+                click.echo(']')
+            else:
+                meta = json.dumps(dict((key, value) for key, value in response_json.items()
+                                       if key != 'data'))
+                click.echo('], ' + meta[1:] if meta != '{}' else ']}')
+        elif tree:
+            click.echo()
+        elif not printed and not hidden and response_json is not None:
+            self._render_response(response_json)
+
+        if hidden and response_json is not None:
+            response_json = dict(response_json, data=records)
+            return json.dumps(response_json)
+
+    def _filter_records(self, response_json):
+        """
+        Filters and projects records of the list response
+        before it is rendered.
+        """
+        rows = response_json.get('data')
+        if not isinstance(rows, list):
+            return response_json
+
+        if self.query:
+            rows = self.query.filter(rows)
+        if self.projection:
+            rows = [query.project(row, self.projection) for row in rows]
+
+        response_json['data'] = rows
+        return response_json
+
+    def _apply_query(self, response):
+        try:
+            response_json = json.loads(response)
+        except ValueError:
+            return response
+
+        if response_json.get('errors'):
+            return response
+
+        return json.dumps(self._filter_records(response_json))
+
     def get_description(self):
         """
         Returns action description.
@@ -669,9 +1161,15 @@ class Action(BaseAction):
         This is the place where command line options can be fixed
         after they are loaded from yaml spec.
         """
+        bulk_target = self._get_bulk_target()
         for option in options:
             if self.prompt_for and option.name in self.prompt_for:
                 option.prompt = option.name
+            if bulk_target and option.name == bulk_target[0]:
+                # may be replaced with --where or --ids-from, run()
+                # prompts for it if neither is given
+                option.required = False
+                option.prompt = None
             if (option.name == 'envId' and settings.envId) or \
                     (option.name == 'accountId' and settings.accountId):
                 option.required = False
@@ -689,9 +1187,7 @@ class Action(BaseAction):
         Validate routes for current API scope.
         """
         if self.route and self.api_level:
-            spec_path = os.path.join(defaults.CONFIG_DIRECTORY,
-                                     '{}.json'.format(self.api_level))
-            api_routes = json.load(open(spec_path, 'r'))['paths'].keys()
+            api_routes = self.raw_spec['paths'].keys()
             try:
                 assert api_routes and self.route in api_routes, self.name
             except AssertionError:  # ST-224
@@ -715,20 +1211,25 @@ class PolledAction(SimplifiedAction):
         :param poll_dict: e.g. {'serverId': b039d8d9-26c2-439d-9b2b-9d7b761b417c}
         :param action_obj: instance of class Action
         :param states_to_wait_for: list of states to wait for, e.g. ('running', 'failed')
-        :param timeout: timeout in secons between attempts
+        :param timeout: initial timeout in secons between attempts
         :param hide_output: when True prints full polling status
         :param kwargs: the same dict that run() method accepts
         :returns last status, e.g. 'running'
         '''
         status = ''
+        waiter = webhooks.Waiter(poll_dict.values(), interval=timeout)
         with utils._spinner():
-            while status not in states_to_wait_for:
+            while True:
                 run_args = {"hide_output": hide_output, "envId": kwargs.get('envId')}
                 run_args.update(poll_dict)
                 data = action_obj.run(**run_args)
                 data_json = json.loads(data)
-                status = self._get_operation_status(data_json)
-                time.sleep(timeout)
+                last_status, status = status, self._get_operation_status(data_json)
+                if status in states_to_wait_for:
+                    break
+                if status != last_status:
+                    waiter.reset()
+                waiter.wait()
         return status
 
     def _get_operation_status(self, data_json):
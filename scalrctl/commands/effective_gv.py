@@ -0,0 +1,227 @@
+__doc__ = 'Effective global variables of farm roles and servers'
+
+import collections
+import functools
+import json
+
+from scalrctl import click, commands, plans, pool, request, utils, view
+from scalrctl.context import settings
+
+
+# (layer, api level, list route, path params), from the most generic one
+LAYERS = (
+    ('global', 'global', '/global-variables/', ()),
+    ('account', 'account', '/{accountId}/global-variables/', ('accountId',)),
+    ('environment', 'user', '/{envId}/global-variables/', ('envId',)),
+    ('role', 'user', '/{envId}/roles/{roleId}/global-variables/', ('envId', 'roleId')),
+    ('farm', 'user', '/{envId}/farms/{farmId}/global-variables/', ('envId', 'farmId')),
+    ('farm-role', 'user', '/{envId}/farm-roles/{farmRoleId}/global-variables/',
+     ('envId', 'farmRoleId')),
+    ('server', 'user', '/{envId}/servers/{serverId}/global-variables/', ('envId', 'serverId')),
+)
+
+
+def resolve(layers):
+    """
+    Returns effective variables for the `layers` list of (layer name,
+    variables) ordered from the most generic one: a value set on a
+    layer overrides values of all previous layers, unless one of them
+    has locked the variable.
+    """
+    result = collections.OrderedDict()
+    for layer, variables in layers:
+        for variable in variables:
+            name = variable['name']
+            effective = result.setdefault(name, {
+                'name': name,
+                'value': None,
+                'origin': None,
+                'category': variable.get('category'),
+                'hidden': variable.get('hidden', False),
+                'locked': False,
+            })
+            if effective['locked']:
+                continue
+            effective['locked'] = bool(variable.get('locked'))
+            if variable.get('value') not in (None, ''):
+                effective['value'] = variable['value']
+                effective['origin'] = layer
+            if variable.get('category'):
+                effective['category'] = variable['category']
+            effective['hidden'] = effective['hidden'] or bool(variable.get('hidden'))
+    return list(result.values())
+
+
+class EffectiveGlobalVariables(commands.BaseAction):
+
+    epilog = "Example: scalr-ctl global-variables effective --farmRoleId <ID> --all-servers"
+
+    farm_role_route = '/{envId}/farm-roles/{farmRoleId}/'
+
+    server_route = '/{envId}/servers/{serverId}/'
+
+    servers_route = '/{envId}/servers/'
+
+    columns = ['name', 'value', 'origin', 'category']
+
+    def get_description(self):
+        return "Show effective value and origin of every Global Variable of a Farm Role or Server"
+
+    def get_options(self):
+        env_id = click.Option(('--envId', 'envId'), required=False, help="Environment ID")
+        farm_role_id = click.Option(('--farmRoleId', 'farmRoleId'), required=False,
+                                    help="Farm Role ID")
+        server_ids = click.Option(('--serverId', 'serverIds'), multiple=True,
+                                  help="Server ID, may be repeated.")
+        all_servers = click.Option(('--all-servers', 'all_servers'), is_flag=True, default=False,
+                                   help="Resolve variables for every Server of the Farm Role.")
+        parallel = click.Option(('--parallel', 'parallel'), type=int, default=pool.DEFAULT_PARALLEL,
+                                show_default=True, help="Number of concurrent requests.")
+        json_ = click.Option(('--json', 'transformation'), is_flag=True, flag_value='json',
+                             default=False, help="Print variables as JSON")
+        jsonl = click.Option(('--jsonl', 'transformation'), is_flag=True, flag_value='jsonl',
+                             default=False, help="Print variables as JSON lines")
+        csv = click.Option(('--csv', 'transformation'), is_flag=True, flag_value='csv',
+                           default=False, help="Print variables as CSV")
+        debug = click.Option(('--debug', 'debug'), is_flag=True, default=False,
+                             help="Print debug messages")
+        return [env_id, farm_role_id, server_ids, all_servers, parallel,
+                json_, jsonl, csv, debug]
+
+    def _get_object(self, route, **kwargs):
+        """
+        Returns a single object of the user scope.
+        """
+        plan = plans.get_plan(utils.read_spec('user', ext='json'), route, 'get')
+        uri, payload, _ = plan.build(kwargs)
+        response = request.request('get', 'user', uri, payload, json.dumps({}))
+        action = commands.Action(name='get', route=route, http_method='get', api_level='user')
+        return action._parse_response(response, hidden=True).get('data') or {}
+
+    def _fetch_layer(self, key):
+        """
+        Returns all variables of a single layer, `key` is (layer, params).
+        """
+        layer, params = key
+        _, api_level, route, _ = [item for item in LAYERS if item[0] == layer][0]
+        lister = commands.Action(name='list', route=route, http_method='get',
+                                 api_level=api_level)
+        return lister._list_objects(route, **dict(params))
+
+    def _get_targets(self, env_id, farm_role_id, server_ids, all_servers, parallel):
+        """
+        Returns (server ID or None, farm role) for every resolved object.
+        Farm roles are fetched once, even if shared by several servers.
+        """
+        servers = []
+        if server_ids:
+            get_server = functools.partial(self._get_object, self.server_route, envId=env_id)
+            fetched = {}
+            for server_id, data, error in pool.imap(lambda item: get_server(serverId=item),
+                                                    server_ids, parallel):
+                if error is not None:
+                    raise click.ClickException("Cannot get Server {}: {}".format(server_id, error))
+                fetched[server_id] = data
+            servers = [fetched[server_id] for server_id in server_ids]
+        elif all_servers:
+            lister = commands.Action(name='list', route=self.servers_route, http_method='get',
+                                     api_level='user')
+            servers = lister._list_objects(self.servers_route,
+                                           'farmRole.id=={}'.format(json.dumps(farm_role_id)),
+                                           envId=env_id)
+            servers = [server for server in servers if server.get('status') != 'terminated']
+            if not servers:
+                raise click.ClickException("Farm Role {} has no Servers.".format(farm_role_id))
+
+        farm_role_ids = set((server.get('farmRole') or {}).get('id', farm_role_id)
+                            for server in servers) or set([farm_role_id])
+        get_farm_role = functools.partial(self._get_object, self.farm_role_route, envId=env_id)
+        farm_roles = {}
+        for item_id, data, error in pool.imap(lambda item: get_farm_role(farmRoleId=item),
+                                              sorted(farm_role_ids), parallel):
+            if error is not None:
+                raise click.ClickException("Cannot get Farm Role {}: {}".format(item_id, error))
+            farm_roles[item_id] = data
+
+        if not servers:
+            return [(None, farm_roles[farm_role_id])]
+        return [(server['id'], farm_roles[(server.get('farmRole') or {}).get('id', farm_role_id)])
+                for server in servers]
+
+    def _get_layer_keys(self, env_id, server_id, farm_role):
+        """
+        Returns (layer, params) of every layer of the object, from the
+        most generic one.
+        """
+        values = {
+            'accountId': settings.accountId,
+            'envId': env_id,
+            'roleId': (farm_role.get('role') or {}).get('id'),
+            'farmId': (farm_role.get('farm') or {}).get('id'),
+            'farmRoleId': farm_role.get('id'),
+            'serverId': server_id,
+        }
+        keys = []
+        for layer, _, _, params in LAYERS:
+            if layer == 'global' and not settings.GLOBAL_SCOPE_API_KEY_ID:
+                continue
+            if layer == 'account' and not settings.accountId:
+                continue
+            if layer == 'server' and not server_id:
+                continue
+            keys.append((layer, tuple((name, values[name]) for name in params)))
+        return keys
+
+    def run(self, *args, **kwargs):
+        farm_role_id = kwargs.get('farmRoleId')
+        server_ids = list(kwargs.get('serverIds') or ())
+        if bool(farm_role_id) == bool(server_ids):
+            raise click.UsageError('Specify either "--farmRoleId" or "--serverId".')
+        if kwargs.get('all_servers') and not farm_role_id:
+            raise click.UsageError('"--all-servers" requires "--farmRoleId".')
+        if kwargs.get('debug'):
+            settings.debug_mode = True
+        if kwargs.get('transformation'):
+            settings.view = kwargs['transformation']
+
+        env_id = kwargs.get('envId') or settings.envId
+        parallel = kwargs.get('parallel') or pool.DEFAULT_PARALLEL
+        targets = self._get_targets(env_id, farm_role_id, server_ids,
+                                    kwargs.get('all_servers'), parallel)
+
+        # servers of the same farm role share all layers but their own
+        chains = [(server_id, self._get_layer_keys(env_id, server_id, farm_role))
+                  for server_id, farm_role in targets]
+        keys = []
+        for _, chain in chains:
+            keys += [key for key in chain if key not in keys]
+
+        layers = {}
+        for key, variables, error in pool.imap(self._fetch_layer, keys, parallel):
+            if error is not None and key[0] == 'account':
+                # the key may have no access to the account scope
+                utils.warning({'message': "Cannot get account Global Variables, "
+                                          "skipping them: {}".format(error)})
+                variables = []
+            elif error is not None:
+                raise click.ClickException("Cannot get {} Global Variables: {}".format(
+                    key[0], error))
+            layers[key] = variables
+        utils.debug("Fetched {} layers for {} objects".format(len(keys), len(chains)))
+
+        columns = (['server'] if any(server_id for server_id, _ in chains) else []) + self.columns
+        rows = []
+        for server_id, chain in chains:
+            for variable in resolve([(key[0], layers[key]) for key in chain]):
+                if server_id:
+                    variable['server'] = server_id
+                rows.append(variable)
+
+        if settings.view in ('json', 'raw'):
+            click.echo(json.dumps({'data': rows}))
+        elif settings.view in view.RECORD_FORMATS:
+            view.RecordWriter(settings.view, columns=columns).write(rows)
+        else:
+            table_rows = [[row.get(column) for column in columns] for row in rows]
+            click.echo(view.build_vertical_table(columns, table_rows))
+        return json.dumps({'data': rows})
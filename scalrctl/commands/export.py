@@ -9,7 +9,8 @@ import pydoc
 
 import yaml
 
-from scalrctl import click, commands, defaults, settings
+from scalrctl import click, commands, defaults
+from scalrctl.context import settings
 
 
 __author__ = 'Dmitriy Korsakov, Sergey Babak'
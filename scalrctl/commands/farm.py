@@ -3,14 +3,128 @@ __doc__ = 'Farm management'
 
 import json
 import copy
+import time
+from collections import Counter
 
 from scalrctl import commands
 from scalrctl import click
 
-from scalrctl import request, settings
+from scalrctl import request, webhooks
+from scalrctl.context import settings
 
 
-class FarmTerminate(commands.SimplifiedAction):
+class PolledFarmAction(commands.SimplifiedAction):
+    """
+    Farm operation that can wait for all servers of the farm
+    to reach `wait_status`.
+    """
+
+    servers_route = "/{envId}/farms/{farmId}/servers/"
+
+    farm_roles_route = "/{envId}/farms/{farmId}/farm-roles/"
+
+    wait_status = None
+
+    # servers in these statuses will not reach wait_status anymore
+    failed_statuses = ('failed', 'terminated')
+
+    # farm roles are complete when they run at least minInstances servers
+    wait_for_min_instances = False
+
+    poll_interval = 3
+
+    def get_options(self):
+        wait_hlp = "Wait until all servers of the Farm are {}.".format(self.wait_status)
+        wait = click.Option(('--wait', 'wait'), is_flag=True, default=False, help=wait_hlp)
+        wait_timeout_hlp = "Stop waiting with an error after this number of seconds."
+        wait_timeout = click.Option(('--wait-timeout', 'wait_timeout'), type=int, required=False,
+                                    help=wait_timeout_hlp)
+        options = [wait, wait_timeout]
+        options.extend(super(PolledFarmAction, self).get_options())
+        return options
+
+    def run(self, *args, **kwargs):
+        wait = kwargs.pop("wait", False)
+        wait_timeout = kwargs.pop("wait_timeout", None)
+        result = super(PolledFarmAction, self).run(*args, **kwargs)
+        if wait and not self.dry_run:
+            self._wait_for_farm(kwargs.get('envId') or settings.envId, kwargs['farmId'],
+                                wait_timeout)
+        return result
+
+    def _get_role_progress(self, farm_roles, servers, ignored=()):
+        """
+        Returns {farm role ID: (done, failed, progress line)} for the servers list,
+        servers with IDs from `ignored` are skipped.
+        """
+        statuses = dict((role_id, Counter()) for role_id in farm_roles)
+        for server in servers:
+            if server.get('id') in ignored:
+                continue
+            statuses.setdefault(server['farmRole']['id'], Counter())[server.get('status')] += 1
+
+        progress = {}
+        for role_id, counter in statuses.items():
+            role = farm_roles.get(role_id, {})
+            expected = sum(counter.values())
+            if self.wait_for_min_instances:
+                expected = max(expected, (role.get('scaling') or {}).get('minInstances') or 0)
+            reached = counter.pop(self.wait_status, 0)
+            failed = sum(counter[status] for status in self.failed_statuses)
+            line = "Farm role {} [{}]: {}/{} {}".format(
+                role.get('alias', role_id), role_id, reached, expected, self.wait_status)
+            if counter:
+                line += " ({})".format(', '.join(
+                    "{} {}".format(count, status) for status, count in sorted(counter.items())))
+            progress[role_id] = (reached + failed >= expected, failed, line)
+        return progress
+
+    def _wait_for_farm(self, env_id, farm_id, wait_timeout=None):
+        """
+        Polls servers of all farm roles with one list request per tick,
+        prints progress of a farm role whenever it changes.
+        Fails once every server is either in `wait_status` or in one of
+        `failed_statuses` and some of them failed.
+        """
+        farm_roles = self._list_objects(self.farm_roles_route, envId=env_id, farmId=farm_id)
+        farm_roles = dict((role['id'], role) for role in farm_roles)
+        started = time.time()
+        reported = {}
+        ignored = None
+        waiter = webhooks.Waiter([farm_id], interval=self.poll_interval)
+
+        click.echo("Waiting for servers of farm {} to be {}..".format(farm_id, self.wait_status))
+        while True:
+            servers = self._list_objects(self.servers_route, envId=env_id, farmId=farm_id)
+            if ignored is None:
+                # servers terminated before the wait are left from previous launches
+                ignored = set() if self.wait_status == 'terminated' else set(
+                    server.get('id') for server in servers if server.get('status') == 'terminated')
+            progress = self._get_role_progress(farm_roles, servers, ignored)
+            changed = False
+            for role_id, (_, _, line) in sorted(progress.items()):
+                if reported.get(role_id) != line:
+                    click.echo(line)
+                    reported[role_id] = line
+                    changed = True
+            if all(done for done, _, _ in progress.values()):
+                break
+            if wait_timeout and time.time() - started > wait_timeout:
+                raise click.ClickException(
+                    "Timed out waiting for servers of farm {} to be {}.".format(
+                        farm_id, self.wait_status))
+            if changed:
+                waiter.reset()
+            waiter.wait()
+        failed = sum(failed for _, failed, _ in progress.values())
+        if failed:
+            raise click.ClickException("{} servers of farm {} failed to be {} [{:.0f}s].".format(
+                failed, farm_id, self.wait_status, time.time() - started))
+        click.echo("All servers of farm {} are {} [{:.0f}s].".format(
+            farm_id, self.wait_status, time.time() - started))
+
+
+class FarmTerminate(PolledFarmAction):
 
     epilog = "Example: scalr-ctl farms terminate --farmId <ID> --force"
 
@@ -18,6 +132,8 @@ class FarmTerminate(commands.SimplifiedAction):
         "terminateFarmRequest": {"force": True}
     }
 
+    wait_status = 'terminated'
+
     def get_options(self):
         hlp = "It is used to terminate the Server immediately ignoring scalr.system.server_terminate_timeout."
         force_terminate = click.Option(('--force', 'force'), is_flag=True, default=False, help=hlp)
@@ -39,11 +155,15 @@ class FarmTerminate(commands.SimplifiedAction):
         return arguments, kw
 
 
-class FarmLaunch(commands.SimplifiedAction):
+class FarmLaunch(PolledFarmAction):
 
     epilog = "Example: scalr-ctl farms launch --farmId <ID>"
     post_template = {}
 
+    wait_status = 'running'
+
+    wait_for_min_instances = True
+
     def pre(self, *args, **kwargs):
         """
         before request is made
@@ -87,6 +207,10 @@ class FarmSuspend(FarmLaunch):
     epilog = "Example: scalr-ctl farms suspend --farmId <ID>"
     post_template = {}
 
+    wait_status = 'suspended'
+
+    wait_for_min_instances = False
+
 
 class FarmResume(FarmLaunch):
 
@@ -7,7 +7,8 @@ import copy
 from scalrctl import commands
 from scalrctl import click
 
-from scalrctl import request, settings
+from scalrctl import request
+from scalrctl.context import settings
 from scalrctl.commands import farm
 
 
@@ -0,0 +1,178 @@
+__doc__ = 'Object lookup across scopes'
+
+import functools
+import json
+import re
+
+from scalrctl import click, commands, plans, pool, request, utils, view
+from scalrctl.context import settings
+
+
+OBJECT_TYPES = (
+    ('image', 'images'),
+    ('role', 'roles'),
+    ('script', 'scripts'),
+    ('global-variable', 'global-variables'),
+)
+
+SCOPES = (
+    ('user', '/{envId}'),
+    ('account', '/{accountId}'),
+    ('global', ''),
+)
+
+
+class FindObject(commands.BaseAction):
+
+    epilog = "Example: scalr-ctl find --name ubuntu1604 --type image --first"
+
+    columns = ['type', 'id', 'name', 'scope', 'api_level']
+
+    def get_description(self):
+        return "Find images, roles, scripts and global variables by ID or name in all scopes"
+
+    def get_options(self):
+        object_id = click.Option(('--id', 'object_id'), required=False, help="Object ID")
+        name = click.Option(('--name', 'name'), required=False, help="Object name")
+        types = click.Option(('--type', 'types'), multiple=True,
+                             type=click.Choice([obj_type for obj_type, _ in OBJECT_TYPES]),
+                             help="Search only objects of this type, may be repeated.")
+        scopes = click.Option(('--scope', 'scopes'), multiple=True,
+                              type=click.Choice([api_level for api_level, _ in SCOPES]),
+                              help="Search only in this scope, may be repeated. Global scope is "
+                                   "searched by default if its API key is configured.")
+        first = click.Option(('--first', 'first'), is_flag=True, default=False,
+                             help="Stop at the first match.")
+        parallel = click.Option(('--parallel', 'parallel'), type=int, default=pool.DEFAULT_PARALLEL,
+                                show_default=True, help="Number of concurrent requests.")
+        json_ = click.Option(('--json', 'transformation'), is_flag=True, flag_value='json',
+                             default=False, help="Print matches as JSON")
+        jsonl = click.Option(('--jsonl', 'transformation'), is_flag=True, flag_value='jsonl',
+                             default=False, help="Print matches as JSON lines")
+        csv = click.Option(('--csv', 'transformation'), is_flag=True, flag_value='csv',
+                           default=False, help="Print matches as CSV")
+        debug = click.Option(('--debug', 'debug'), is_flag=True, default=False,
+                             help="Print debug messages")
+        return [object_id, name, types, scopes, first, parallel, json_, jsonl, csv, debug]
+
+    def _get_targets(self, types, scopes):
+        """
+        Returns (api level, object type, list route, item route, ID param)
+        for every object type available in the searched scopes.
+        """
+        targets = []
+        for api_level, prefix in SCOPES:
+            if scopes and api_level not in scopes:
+                continue
+            if not scopes and api_level == 'global' and not settings.GLOBAL_SCOPE_API_KEY_ID:
+                continue
+            paths = utils.read_spec(api_level, ext='json')['paths']
+            for obj_type, collection in OBJECT_TYPES:
+                if types and obj_type not in types:
+                    continue
+                list_route = '{}/{}/'.format(prefix, collection)
+                if 'get' not in paths.get(list_route, {}):
+                    continue
+                item_route = id_param = None
+                item_re = re.compile(r'^{}\{{(\w+)\}}/$'.format(re.escape(list_route)))
+                for route, route_data in paths.items():
+                    match = item_re.match(route)
+                    if match and 'get' in route_data:
+                        item_route, id_param = route, match.group(1)
+                targets.append((api_level, obj_type, list_route, item_route, id_param))
+        return targets
+
+    def _search(self, object_id, name, target):
+        """
+        Returns matches of a single object type in a single scope.
+        """
+        api_level, obj_type, list_route, item_route, id_param = target
+        spec = utils.read_spec(api_level, ext='json')
+        scope_kwargs = {'envId': settings.envId, 'accountId': settings.accountId}
+
+        # global variables are identified by name
+        value = object_id or (name if id_param and id_param.endswith('Name') else None)
+        if value:
+            if not item_route:
+                return []
+            plan = plans.get_plan(spec, item_route, 'get')
+            kwargs = dict((key, val) for key, val in scope_kwargs.items()
+                          if key in plan.path_params)
+            kwargs[id_param] = value
+            try:
+                plan.check_arguments(kwargs)
+            except click.ClickException:
+                # e.g. not numeric role ID
+                return []
+            uri, payload, _ = plan.build(kwargs)
+            response = request.request('get', api_level, uri, payload, json.dumps({}))
+            response_json = json.loads(response) if response else {}
+            found = [response_json['data']] \
+                if response_json.get('data') and not response_json.get('errors') else []
+        else:
+            lister = commands.Action(name='list', route=list_route, http_method='get',
+                                     api_level=api_level)
+            found = lister._list_objects(list_route, 'name=={}'.format(json.dumps(name)),
+                                         **scope_kwargs)
+
+        return [{
+            'type': obj_type,
+            'id': obj.get('id', obj.get('name')),
+            'name': obj.get('name'),
+            'scope': obj.get('scope') or obj.get('declaredIn') or api_level,
+            'api_level': api_level,
+        } for obj in found]
+
+    def run(self, *args, **kwargs):
+        object_id = kwargs.get('object_id')
+        name = kwargs.get('name')
+        if bool(object_id) == bool(name):
+            raise click.UsageError('Specify either "--id" or "--name".')
+        if kwargs.get('debug'):
+            settings.debug_mode = True
+        if kwargs.get('transformation'):
+            settings.view = kwargs['transformation']
+
+        targets = self._get_targets(kwargs.get('types'), kwargs.get('scopes'))
+        search = functools.partial(self._search, object_id, name)
+        results = pool.imap(search, targets,
+                            parallel=kwargs.get('parallel') or pool.DEFAULT_PARALLEL)
+
+        matches = []
+        failed = 0
+        try:
+            for target, found, error in results:
+                if error is not None:
+                    utils.debug("Search of {} in {} scope failed: {}".format(
+                        target[1], target[0], error))
+                    failed += 1
+                    continue
+                matches += found
+                if found and kwargs.get('first'):
+                    break
+        finally:
+            results.close()
+
+        if not matches:
+            if failed:
+                raise click.ClickException("Nothing found, {} of {} searches failed "
+                                           "(see --debug).".format(failed, len(targets)))
+            raise click.ClickException("Nothing found.")
+
+        # the same object is visible from several scopes
+        order = [target[:2] for target in targets]
+        matches.sort(key=lambda match: order.index((match['api_level'], match['type'])))
+        unique = []
+        for match in matches:
+            key = (match['type'], match['id'])
+            if not any(key == (item['type'], item['id']) for item in unique):
+                unique.append(match)
+
+        if settings.view in ('json', 'raw'):
+            click.echo(json.dumps({'data': unique}))
+        elif settings.view in view.RECORD_FORMATS:
+            view.RecordWriter(settings.view, columns=self.columns).write(unique)
+        else:
+            rows = [[match[column] for column in self.columns] for match in unique]
+            click.echo(view.build_vertical_table(self.columns, rows))
+        return json.dumps({'data': unique})
@@ -1,13 +1,15 @@
 """
 Import Scalr objects.
 """
+import copy
 import json
 import os
 import pydoc
 
 import yaml
 
-from scalrctl import click, commands, settings, utils
+from scalrctl import click, commands, utils
+from scalrctl.context import settings
 
 
 __author__ = 'Dmitriy Korsakov'
@@ -37,6 +39,8 @@ class Import(commands.Action):
 
     def _init(self):
         self.scheme = utils.read_scheme()
+        # imported IDs are saved here, keep them per import
+        self.relations = copy.deepcopy(self.relations)
         super(Import, self)._init()
 
     def get_description(self):
@@ -51,7 +55,11 @@ class Import(commands.Action):
                               default=False, help=upd_helpmsg, hidden=True)
         dry_run = click.Option(('--dryrun', 'dryrun'), is_flag=True,
                                default=False, help=upd_helpmsg, hidden=True)
-        return [debug, update, envid, dry_run]
+        validate_only = click.Option(('--validate-only', 'validate_only'),
+                                     is_flag=True, default=False,
+                                     help="Validate objects against API spec "
+                                          "without importing them.")
+        return [debug, update, envid, dry_run, validate_only]
 
     def _modify_object(self, obj):
         arguments = {}
@@ -87,10 +95,14 @@ class Import(commands.Action):
 
         dry_run = kwargs.pop('dryrun', False)
         update_mode = kwargs.pop('update', False)
+        validate_only = kwargs.pop('validate_only', False)
 
         raw_objects = kwargs.pop('raw', None) or click.get_text_stream('stdin')
         import_objects = self._validate_object(raw_objects)
 
+        if validate_only:
+            return self._validate_import(import_objects, update_mode)
+
         for obj in import_objects:
             action_name = obj['meta']['scalrctl']['ACTION']
             obj_name = obj['data'].get('name')
@@ -148,13 +160,11 @@ class Import(commands.Action):
             else:
                 raise Exception("Matches for {} more than one!".format(action_name))
 
-    def _import_object(self, obj_data, env_id, update_mode, dry_run=False):
-        args, kwargs = obj_data['meta']['scalrctl']['ARGUMENTS']
-        route = obj_data['meta']['scalrctl']['ROUTE']
-        http_method = 'patch' if update_mode else 'post'
-        obj_name = obj_data['data'].get('name')
-
-        action = None
+    def _get_import_action(self, route, http_method):
+        """
+        Returns action that creates or updates objects
+        exported from `route`.
+        """
         for action_name, section in self.scheme['export'].items():
             if 'http-method' in section and 'route' in section and \
                             section['http-method'] == 'get' and \
@@ -163,14 +173,58 @@ class Import(commands.Action):
                 cls = pydoc.locate(
                     scheme['class']
                 ) if 'class' in scheme else commands.Action
-                action = cls(name=action_name, route=scheme['route'],
-                             http_method=http_method, api_level=self.api_level)
-                break
+                return cls(name=action_name, route=scheme['route'],
+                           http_method=http_method, api_level=self.api_level)
+
+        msg = "Cannot import Scalr object: API method '{}: {}' not found" \
+            .format('GET', route)
+        raise click.ClickException(msg)
+
+    def _validate_import(self, import_objects, update_mode):
+        """
+        Checks all objects against API spec, reports every invalid one.
+        """
+        http_method = 'patch' if update_mode else 'post'
+        invalid = 0
 
-        if not action:
-            msg = "Cannot import Scalr object: API method '{}: {}' not found" \
-                .format('GET', route)
-            raise click.ClickException(msg)
+        for obj in import_objects:
+            route = obj['meta']['scalrctl']['ROUTE']
+            obj_name = obj['data'].get('name')
+            action = self._get_import_action(route, http_method)
+            obj_type = action._get_body_type_params()[0]['name']
+
+            if action.name in ('role-image',):
+                errors = []
+            else:
+                try:
+                    data = action._filter_json_object(
+                        obj['data'], filter_createonly=update_mode)
+                    # the import sends coerced objects, validate them the same way
+                    action._coerce_body(data)
+                    errors = action._get_body_errors(data, partial=update_mode)
+                except click.ClickException as e:
+                    errors = [{'code': 'InvalidStructure', 'message': e.message}]
+
+            title = "{} {}".format(self._get_object_alias(obj_type),
+                                   '\"%s\"' % obj_name if obj_name else '')
+            if errors:
+                invalid += 1
+                click.secho("{}: invalid".format(title.strip()), bold=True, fg='red')
+                click.echo(action._format_errmsg(errors) + '\n')
+            else:
+                click.secho("{}: valid".format(title.strip()), bold=True)
+
+        if invalid:
+            raise click.ClickException("{} of {} objects are invalid".format(
+                invalid, len(import_objects)))
+
+    def _import_object(self, obj_data, env_id, update_mode, dry_run=False):
+        args, kwargs = obj_data['meta']['scalrctl']['ARGUMENTS']
+        route = obj_data['meta']['scalrctl']['ROUTE']
+        http_method = 'patch' if update_mode else 'post'
+        obj_name = obj_data['data'].get('name')
+
+        action = self._get_import_action(route, http_method)
 
         obj_type = action._get_body_type_params()[0]['name']
         if action.name not in ('role-image',):
@@ -192,7 +246,11 @@ class Import(commands.Action):
         result_json = json.loads(result)
 
         alias = self._get_object_alias(obj_type)
-        click.secho("{} created.\n".format(alias), bold=True)
+        if action.unchanged_object is not None:
+            click.secho("{} unchanged.\n".format(alias), bold=True)
+        else:
+            click.secho("{} {}.\n".format(alias, "updated" if update_mode else "created"),
+                        bold=True)
 
         return result_json
 
@@ -50,7 +50,7 @@ CONFIGURATIONS = {
         'view': {
             'order': 9,
             'description': 'View mode',
-            'enum': ['tree', 'table', 'json']
+            'enum': ['tree', 'table', 'json', 'jsonl', 'csv', 'tsv']
         },
         'colored_output': {
             'order': 10,
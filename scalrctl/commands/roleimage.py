@@ -1,10 +1,13 @@
 __author__ = 'Dmitriy Korsakov'
 __doc__ = 'RoleImage management'
 
+import collections
 import copy
 import json
 from scalrctl import commands
 from scalrctl import click
+from scalrctl import plans, pool, request, utils, view
+from scalrctl.context import settings
 
 
 class ReplaceRoleImage(commands.SimplifiedAction):
@@ -81,3 +84,181 @@ class CreateRoleImage(commands.SimplifiedAction):
 
 class DeleteRoleImage(commands.Action):
     delete_target = 'imageId'
+
+
+class BulkReplaceRoleImage(commands.BaseAction):
+
+    epilog = "Example: scalr-ctl role-images replace-all --mapping images.txt --dryrun"
+
+    roles_route = '/{envId}/roles/'
+
+    role_images_route = '/{envId}/roles/{roleId}/images/'
+
+    farms_route = '/{envId}/farms/'
+
+    farm_roles_route = '/{envId}/farms/{farmId}/farm-roles/'
+
+    replace_route = '/{envId}/roles/{roleId}/images/{imageId}/actions/replace/'
+
+    columns = ['image', 'newImage', 'role', 'farmRoles']
+
+    def get_description(self):
+        return "Replace Images in all Roles using them, show affected Farm Roles first"
+
+    def get_options(self):
+        env_id = click.Option(('--envId', 'envId'), required=False, help="Environment ID")
+        image_id = click.Option(('--imageId', 'imageId'), required=False,
+                                help="The ID of the image to replace")
+        new_image_id = click.Option(('--newImageId', 'newimageid'), required=False,
+                                    help="The ID of a new image")
+        mapping = click.Option(('--mapping', 'mapping'), required=False,
+                               help="Replace images listed in the file, one "
+                                    "\"<ID> <newID>\" pair per line, '-' reads stdin.")
+        where = click.Option(('--where', 'where'), required=False,
+                             help="Replace images only in Roles matching the expression. "
+                                  "Example: --where \"os.id=='ubuntu-16-04'\"")
+        dry_run = click.Option(('--dryrun', 'dryrun'), is_flag=True, default=False,
+                               help="Print the impact plan without replacing images.")
+        parallel = click.Option(('--parallel', 'parallel'), type=int, default=pool.DEFAULT_PARALLEL,
+                                show_default=True, help="Number of concurrent requests.")
+        debug = click.Option(('--debug', 'debug'), is_flag=True, default=False,
+                             help="Print debug messages")
+        return [env_id, image_id, new_image_id, mapping, where, dry_run, parallel, debug]
+
+    def _get_replacements(self, image_id, new_image_id, mapping):
+        """
+        Returns {image ID: new image ID}.
+        """
+        if mapping and (image_id or new_image_id):
+            raise click.UsageError(
+                '"--mapping" cannot be combined with "--imageId" and "--newImageId".')
+        if not mapping:
+            if not (image_id and new_image_id):
+                raise click.UsageError('Specify "--imageId" and "--newImageId" or "--mapping".')
+            return collections.OrderedDict([(image_id, new_image_id)])
+
+        replacements = collections.OrderedDict()
+        with click.open_file(mapping) as fp:
+            for number, line in enumerate(fp, 1):
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                pair = line.split()
+                if len(pair) != 2:
+                    raise click.UsageError("Invalid mapping at line {}: {}".format(number, line))
+                replacements[pair[0]] = pair[1]
+        if not replacements:
+            raise click.UsageError("Mapping is empty.")
+        return replacements
+
+    def _list(self, route, where=None, **kwargs):
+        lister = commands.Action(name='list', route=route, http_method='get', api_level='user')
+        return lister._list_objects(route, where, **kwargs)
+
+    def _build_index(self, env_id, replacements, where, parallel):
+        """
+        Returns {image ID: [(role, [farm roles])]} for replaced images.
+        Images of every role and farm roles of every farm are listed
+        once, concurrently.
+        """
+        roles = self._list(self.roles_route, where, envId=env_id)
+        list_images = lambda role: self._list(self.role_images_route, envId=env_id,
+                                              roleId=role['id'])
+        usage = collections.defaultdict(list)
+        for role, role_images, error in pool.imap(list_images, roles, parallel):
+            if error is not None:
+                raise click.ClickException("Cannot list Images of Role {}: {}".format(
+                    role['id'], error))
+            for role_image in role_images:
+                image_id = (role_image.get('image') or {}).get('id')
+                if image_id in replacements:
+                    usage[image_id].append(role)
+
+        farm_roles = collections.defaultdict(list)
+        if usage:
+            farms = self._list(self.farms_route, envId=env_id)
+            list_farm_roles = lambda farm: self._list(self.farm_roles_route, envId=env_id,
+                                                      farmId=farm['id'])
+            for farm, items, error in pool.imap(list_farm_roles, farms, parallel):
+                if error is not None:
+                    raise click.ClickException("Cannot list Farm Roles of Farm {}: {}".format(
+                        farm['id'], error))
+                for farm_role in items:
+                    farm_role.setdefault('farm', {'id': farm['id']})
+                    farm_roles[(farm_role.get('role') or {}).get('id')].append(farm_role)
+
+        return collections.OrderedDict(
+            (image_id, [(role, farm_roles.get(role['id'], [])) for role in usage[image_id]])
+            for image_id in replacements if image_id in usage)
+
+    def _print_plan(self, index, replacements):
+        rows = []
+        for image_id, roles in index.items():
+            for role, farm_roles in roles:
+                rows.append([
+                    image_id,
+                    replacements[image_id],
+                    '{} ({})'.format(role.get('name'), role['id']),
+                    ', '.join('{} (farm {})'.format(farm_role.get('alias') or farm_role.get('id'),
+                                                    farm_role['farm'].get('id'))
+                              for farm_role in farm_roles),
+                ])
+        click.echo(view.build_vertical_table(self.columns, rows))
+        click.echo("{} Roles and {} Farm Roles use {} of {} Images.".format(
+            len(rows), sum(len(farm_roles) for roles in index.values() for _, farm_roles in roles),
+            len(index), len(replacements)))
+
+    def _replace(self, env_id, replacements, item):
+        """
+        Replaces the image of a single role.
+        """
+        image_id, role_id = item
+        plan = plans.get_plan(utils.read_spec('user', ext='json'), self.replace_route, 'post')
+        kwargs = {
+            'envId': env_id,
+            'roleId': role_id,
+            'imageId': image_id,
+            plan.body_param_name: {'image': {'id': replacements[image_id]},
+                                   'role': {'id': role_id}},
+        }
+        uri, payload, data = plan.build(kwargs)
+        response = request.request('post', 'user', uri, payload, json.dumps(data))
+        action = commands.Action(name='replace', route=self.replace_route, http_method='post',
+                                 api_level='user')
+        action._parse_response(response, hidden=True)
+
+    def run(self, *args, **kwargs):
+        if kwargs.get('debug'):
+            settings.debug_mode = True
+        replacements = self._get_replacements(kwargs.get('imageId'), kwargs.get('newimageid'),
+                                              kwargs.get('mapping'))
+        env_id = kwargs.get('envId') or settings.envId
+        parallel = kwargs.get('parallel') or pool.DEFAULT_PARALLEL
+
+        index = self._build_index(env_id, replacements, kwargs.get('where'), parallel)
+        if not index:
+            click.echo("No Roles use the Images.")
+            return
+        self._print_plan(index, replacements)
+        if kwargs.get('dryrun'):
+            return
+
+        items = [(image_id, role['id']) for image_id, roles in index.items() for role, _ in roles]
+        progress = pool.Progress(len(items), label='Replaced')
+        failures = []
+        replace = lambda item: self._replace(env_id, replacements, item)
+        for (image_id, role_id), _, error in pool.imap(replace, items, parallel=parallel):
+            progress.update(failed=error is not None)
+            if error is not None:
+                message = getattr(error, 'message', None) or str(error)
+                failures.append((image_id, role_id, message))
+        progress.close()
+
+        click.echo("Replaced Images in {} of {} Roles in {:.1f}s.".format(
+            len(items) - len(failures), len(items), progress.elapsed))
+        if failures:
+            for image_id, role_id, message in failures:
+                click.echo("Failed Role {} Image {}: {}".format(role_id, image_id, message),
+                           err=True)
+            raise click.ClickException("{} of {} replacements failed".format(
+                len(failures), len(items)))
@@ -5,7 +5,8 @@ import json
 import time
 
 from scalrctl import commands
-from scalrctl import click
+from scalrctl import click, plans, pool, request, webhooks
+from scalrctl.context import settings
 
 
 class ExecuteScript(commands.PolledAction):
@@ -14,21 +15,44 @@ class ExecuteScript(commands.PolledAction):
 
     post_template = {"scriptExecutionRequestObject": {"server": None, "blocking": False, "timeout": None}}
 
+    status_route = "/{envId}/script-executions/{scriptExecutionId}/"
+
+    servers_route = "/{envId}/servers/"
+
+    final_statuses = ('finished', 'failed', 'timed-out')
+
+    poll_interval = 1
+
     def get_options(self):
         blocking_hlp = "If it is set Scalr Agent will wait for your Script to finish \
         executing before firing and processing further events."
         blocking = click.Option(('--blocking', 'blocking'), is_flag=True, default=False, help=blocking_hlp)
 
         server_id_hlp = "Identifier of the Server"
-        server_id = click.Option(('--serverId', 'serverId'), required=True, help=server_id_hlp)
+        server_id = click.Option(('--serverId', 'serverId'), required=False, help=server_id_hlp)
+
+        farm_id_hlp = "Execute on all running Servers of the Farm"
+        farm_id = click.Option(('--farmId', 'farmId'), required=False, help=farm_id_hlp)
+
+        farm_role_id_hlp = "Execute on all running Servers of the Farm Role"
+        farm_role_id = click.Option(('--farmRoleId', 'farmRoleId'), required=False,
+                                    help=farm_role_id_hlp)
+
+        where_hlp = "Execute on all running Servers matching the expression. " \
+                    "Example: --where \"hostname=='web-1'\""
+        where = click.Option(('--where', 'where'), required=False, help=where_hlp)
+
+        parallel_hlp = "Number of concurrent requests when executing on several Servers."
+        parallel = click.Option(('--parallel', 'parallel'), type=int, default=pool.DEFAULT_PARALLEL,
+                                show_default=True, help=parallel_hlp)
 
         timeout_hlp = "How many secconds should Scalr Agent wait before aborting the execution of this Script."
-        timeout = click.Option(('--timeout', 'timeout'), required=False, help=timeout_hlp)
+        timeout = click.Option(('--timeout', 'timeout'), type=int, required=False, help=timeout_hlp)
 
         nowait_hlp = "Do not wait for script execution to finish"
         nowait = click.Option(('--nowait', 'nowait'), is_flag=True, required=False, help=nowait_hlp)
 
-        options = [blocking, server_id, timeout, nowait]
+        options = [blocking, server_id, farm_id, farm_role_id, where, parallel, timeout, nowait]
         options.extend(super(ExecuteScript, self).get_options())
         return options
 
@@ -50,6 +74,18 @@ class ExecuteScript(commands.PolledAction):
         return arguments, kw
 
     def run(self, *args, **kwargs):
+        targets = [(name, kwargs.pop(name, None)) for name in ('farmId', 'farmRoleId', 'where')]
+        targets = dict((name, value) for name, value in targets if value)
+        parallel = kwargs.pop('parallel', None) or pool.DEFAULT_PARALLEL
+        if kwargs.get('serverId') and targets:
+            raise click.UsageError('"--serverId" cannot be combined with "--farmId", '
+                                   '"--farmRoleId" or "--where".')
+        if not kwargs.get('serverId'):
+            if not targets:
+                raise click.UsageError('Missing option "--serverId", "--farmId", '
+                                       '"--farmRoleId" or "--where".')
+            return self._run_fanout(targets, parallel, *args, **kwargs)
+
         nowait = kwargs.pop("nowait", False)
         result = super(ExecuteScript, self).run(*args, **kwargs)
         if not nowait:
@@ -71,6 +107,115 @@ class ExecuteScript(commands.PolledAction):
             ))
         return result
 
+    def _get_target_servers(self, targets, env_id):
+        """
+        Returns running servers of the farm, farm role or filter.
+        """
+        conditions = ["status=='running'"]
+        if targets.get('farmId'):
+            conditions.append("farm.id=={}".format(json.dumps(targets['farmId'])))
+        if targets.get('farmRoleId'):
+            conditions.append("farmRole.id=={}".format(json.dumps(targets['farmRoleId'])))
+        if targets.get('where'):
+            conditions.append("({})".format(targets['where']))
+        return self._list_objects(self.servers_route, ' and '.join(conditions), envId=env_id)
+
+    def _run_fanout(self, targets, parallel, *args, **kwargs):
+        """
+        Launches the script on every selected server concurrently and
+        tracks all executions in one polling loop, results are printed
+        as executions finish.
+        """
+        nowait = kwargs.pop("nowait", False)
+        kwargs.pop("serverId", None)
+        kwargs = self._apply_arguments(**kwargs)
+        if not kwargs.get('envId'):
+            kwargs['envId'] = settings.envId
+
+        servers = [server['id'] for server in self._get_target_servers(targets, kwargs['envId'])]
+        if not servers:
+            click.echo("No running servers found.")
+            return json.dumps({'data': [], 'meta': {}})
+
+        # the request body is built and validated once, then sent with each server
+        args, kwargs = self.pre(*args, serverId=servers[0], **kwargs)
+        plan = self._plan
+        body = kwargs[plan.body_param_name]
+
+        def launch(server_id):
+            launch_kwargs = dict(kwargs)
+            launch_kwargs[plan.body_param_name] = dict(body, server=server_id)
+            uri, payload, data = plan.build(launch_kwargs)
+            if self.dry_run:
+                click.echo('{} {} {} {}'.format(self.http_method, uri, payload, data))
+                return {}
+            response = request.request(self.http_method, self.api_level,
+                                       uri, payload, json.dumps(data))
+            return self._parse_response(response, hidden=True)['data']
+
+        failures = []
+        executions = {}
+        for server_id, execution, error in pool.imap(launch, servers, parallel=parallel):
+            if error is not None:
+                failures.append(server_id)
+                message = getattr(error, 'message', None) or str(error)
+                click.echo("Failed {}: {}".format(server_id, message), err=True)
+            elif execution:
+                executions[execution['id']] = dict(execution, server={'id': server_id})
+                if nowait:
+                    click.echo("Server {} [scriptExecutionId {}]".format(
+                        server_id, execution['id']))
+
+        if not (nowait or self.dry_run):
+            click.echo("Checking status of {} script executions..".format(len(executions)))
+            failures += self._poll_executions(executions, kwargs['envId'], parallel)
+
+        if failures:
+            raise click.ClickException("Script failed on {} of {} servers".format(
+                len(failures), len(servers)))
+        return json.dumps({'data': list(executions.values()), 'meta': {}})
+
+    def _poll_executions(self, executions, env_id, parallel):
+        """
+        Polls pending executions until each of them reaches a final
+        status, returns IDs of servers where the script failed.
+        """
+        status_plan = plans.get_plan(self.raw_spec, self.status_route, 'get')
+
+        def get_status(execution_id):
+            uri, payload, _ = status_plan.build({'envId': env_id,
+                                                 'scriptExecutionId': execution_id})
+            response = request.request('get', self.api_level, uri, payload, json.dumps({}))
+            return self._parse_response(response, hidden=True)['data']
+
+        failures = []
+        pending = list(executions)
+        server_ids = [execution['server']['id'] for execution in executions.values()]
+        waiter = webhooks.Waiter(pending + server_ids, interval=self.poll_interval)
+        while pending:
+            waiter.wait()
+            finished = len(pending)
+            for execution_id, execution, error in pool.imap(get_status, pending, parallel=parallel):
+                server_id = executions[execution_id]['server']['id']
+                if error is not None:
+                    pending.remove(execution_id)
+                    failures.append(server_id)
+                    message = getattr(error, 'message', None) or str(error)
+                    click.echo("Failed {}: {}".format(server_id, message), err=True)
+                    continue
+                if execution.get('status') not in self.final_statuses:
+                    continue
+                pending.remove(execution_id)
+                executions[execution_id].update(execution)
+                exit_code = execution.get('exitCode')
+                if execution['status'] != 'finished' or exit_code not in (0, None):
+                    failures.append(server_id)
+                click.echo("Server {}: {}, exit code {} [scriptExecutionId {}].".format(
+                    server_id, execution['status'], exit_code, execution_id))
+            if len(pending) != finished:
+                waiter.reset()
+        return failures
+
 
 class ExecuteScriptVersion(ExecuteScript):
 
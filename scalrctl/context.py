@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Per-invocation execution context.
+
+A Context carries output (view, colors, debug), auth and scope
+(envId, accountId) settings of a single invocation. Contexts are
+activated per thread, so Actions may run concurrently in a thread
+pool with different settings. Without an active context everything
+goes to the `scalrctl.settings` module, as the CLI always did.
+
+Modules read the settings through `context.settings`::
+
+    from scalrctl.context import settings
+"""
+import functools
+import threading
+
+from scalrctl import settings as _settings
+
+
+_local = threading.local()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current():
+    """
+    Returns the context active in the current thread or None.
+    """
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def _snapshot():
+    source = current() or _settings
+    return dict((name, value) for name, value in vars(source).items()
+                if not name.startswith('_'))
+
+
+class Context(object):
+    """
+    Snapshot of the active settings with optional overrides,
+    e.g. Context(envId=2, view='json').
+    """
+
+    def __init__(self, **overrides):
+        self.__dict__.update(_snapshot())
+        self.__dict__.update(overrides)
+
+    def copy(self, **overrides):
+        context = Context.__new__(Context)
+        context.__dict__.update(self.__dict__)
+        context.__dict__.update(overrides)
+        return context
+
+    def __enter__(self):
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _stack().pop()
+
+
+def bind(func, context=None):
+    """
+    Wraps `func` to run in a copy of `context` (the current one
+    by default), e.g. for ThreadPool workers.
+    """
+    context = context or Context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with context.copy():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def scoped(func):
+    """
+    Wraps `func` to run in a new context of the settings active at
+    the moment of the call, settings changed by `func` stay in it.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Context():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class _SettingsProxy(object):
+    """
+    Reads and writes settings of the active context.
+    """
+
+    def __getattr__(self, name):
+        return getattr(current() or _settings, name)
+
+    def __setattr__(self, name, value):
+        setattr(current() or _settings, name, value)
+
+
+settings = _SettingsProxy()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+API client metrics.
+
+Every API call is counted per method, spec route and status: requests,
+request and response bytes, retries, throttled (429) responses, errors
+(connection failures and 5xx responses) and a latency histogram.
+
+`scalr-ctl --metrics FILE ...` or `METRICS_FILE` in the configuration
+file writes them in the Prometheus text format at exit, e.g. for the
+node_exporter textfile collector; "-" prints them on stderr. Code
+running Actions in-process reads them with `snapshot()` or `render()`.
+"""
+import atexit
+import bisect
+import collections
+import os
+import sys
+import threading
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PREFIX = 'scalr_ctl_api_'
+
+COUNTERS = (
+    ('requests', 'API requests.'),
+    ('request_bytes', 'Bytes of request bodies.'),
+    ('response_bytes', 'Bytes of response bodies.'),
+    ('retries', 'Retried API requests.'),
+    ('throttled', 'Requests rejected with 429 Too Many Requests.'),
+    ('errors', 'Connection failures and 5xx responses.'),
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+class Registry(object):
+    """
+    Thread-safe counters and latency histograms of API calls.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, seconds, request_bytes=0, response_bytes=0,
+                retries=0):
+        """
+        Counts a single API call, `status` is None if no response was received.
+        """
+        key = (method.upper(), route, str(status) if status else 'error')
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = dict((name, 0) for name, _ in COUNTERS)
+                series['buckets'] = [0] * (len(self.buckets) + 1)
+                series['seconds'] = 0.0
+            series['requests'] += 1
+            series['request_bytes'] += request_bytes
+            series['response_bytes'] += response_bytes
+            series['retries'] += retries
+            series['throttled'] += status == 429
+            series['errors'] += not status or status >= 500
+            series['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            series['seconds'] += seconds
+
+    def snapshot(self):
+        """
+        Returns a copy of all series as a list of dicts.
+        """
+        with self._lock:
+            result = []
+            for (method, route, status), series in self._series.items():
+                item = dict(series, method=method, route=route, status=status)
+                item['buckets'] = list(series['buckets'])
+                result.append(item)
+            return result
+
+    def render(self):
+        """
+        Returns all series in the Prometheus text format.
+        """
+        series = self.snapshot()
+        lines = []
+        for name, description in COUNTERS:
+            metric = '{}{}_total'.format(PREFIX, name)
+            lines.append('# HELP {} {}'.format(metric, description))
+            lines.append('# TYPE {} counter'.format(metric))
+            for item in series:
+                labels = _labels([('method', item['method']), ('route', item['route']),
+                                  ('status', item['status'])])
+                lines.append('{}{} {}'.format(metric, labels, item[name]))
+
+        metric = '{}request_duration_seconds'.format(PREFIX)
+        lines.append('# HELP {} API request latency.'.format(metric))
+        lines.append('# TYPE {} histogram'.format(metric))
+        for item in series:
+            pairs = [('method', item['method']), ('route', item['route']),
+                     ('status', item['status'])]
+            count = 0
+            for bound, observed in zip(self.buckets + ('+Inf',), item['buckets']):
+                count += observed
+                lines.append('{}_bucket{} {}'.format(metric, _labels(pairs + [('le', bound)]),
+                                                     count))
+            lines.append('{}_sum{} {}'.format(metric, _labels(pairs), item['seconds']))
+            lines.append('{}_count{} {}'.format(metric, _labels(pairs), item['requests']))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Writes the Prometheus text to `path` atomically, "-" is stderr.
+        """
+        text = self.render()
+        if path == '-':
+            sys.stderr.write(text)
+            return
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            fp.write(text)
+        os.rename(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+_started = False
+
+
+def observe(*args, **kwargs):
+    REGISTRY.observe(*args, **kwargs)
+
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+
+def render():
+    return REGISTRY.render()
+
+
+def start(path):
+    """
+    Writes metrics of the process to `path` at exit.
+    """
+    global _started
+    if not _started:
+        _started = True
+        atexit.register(REGISTRY.write, path)
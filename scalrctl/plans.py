@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled per-route request plans.
+
+Everything an Action needs to turn command line arguments into
+a request (parameter classification, validators, URI template)
+is derived from the spec once per route and shared by all
+Action instances that use the same spec document.
+"""
+import re
+import string
+
+import six
+
+from scalrctl import click, utils
+from scalrctl.context import settings
+
+
+_plans = {}
+
+_schema_plans = {}
+
+_route_matchers = {}
+
+_formatter = string.Formatter()
+
+_TARGET_RE = re.compile(r'^(.*/)\{(\w+)\}/$')
+
+
+def lookup(spec, reference):
+    """
+    Returns document section
+    Example: #/definitions/Image returns Image defenition section.
+    """
+    if reference.startswith('#'):
+        result = spec
+        for path in reference.split('/')[1:]:
+            if path not in result:
+                return
+            result = result[path]
+        return result
+
+
+class _PatternValidator(object):
+    """
+    Checks that the whole value matches spec `pattern`.
+    """
+
+    def __init__(self, name, pattern):
+        self.name = name
+        self._match = re.compile(pattern).match
+        self._search = re.compile(pattern, re.MULTILINE).search
+
+    def __call__(self, value):
+        value = str(value).strip()
+        matches = self._match(value) or self._search(value)
+        if not matches or len(matches.group()) != len(value):
+            raise click.ClickException("Invalid value for {}"
+                                       .format(self.name))
+
+
+class RoutePlan(object):
+    """
+    Compiled request plan for a single route and http method.
+    """
+
+    def __init__(self, spec, route, http_method):
+        self.spec = spec
+        self.route = route
+        self.http_method = http_method
+        self.sends_query = http_method.upper() in ('GET', 'DELETE')
+
+        route_data = spec['paths'][route]
+        method_data = route_data[http_method]
+
+        self.template = '{}{}'.format(spec['basePath'], route)
+        self.path_params = frozenset(
+            field for _, field, _, _ in _formatter.parse(self.template) if field)
+
+        self.route_params = list(route_data.get('parameters', ()))
+        self.method_params = list(method_data.get('parameters', ()))
+        self.body_param_name = self.method_params[0]['name'] \
+            if self.method_params else None
+
+        self.validators = [
+            _PatternValidator(param['name'], param['pattern'])
+            for param in self.route_params
+            if param.get('pattern') and param.get('name')
+        ]
+
+        # e.g. `serverId` and `/{envId}/servers/` for `/{envId}/servers/{serverId}/`
+        match = _TARGET_RE.match(route)
+        self.target_param = match.group(2) if match else None
+        self.list_route = match.group(1) if match else None
+
+        self.returns_iterable = self._returns_iterable(method_data)
+        self.body_schema = None
+        for param in self.method_params:
+            if 'schema' in param:
+                self.body_schema = param['schema']
+                break
+
+    def _returns_iterable(self, method_data):
+        schema = method_data.get('responses', {}).get('200', {}).get('schema', {})
+        if '$ref' in schema:
+            object_key = schema['$ref'].split('/')[-1]
+            object_descr = self.spec['definitions'][object_key]
+            data_structure = object_descr['properties']['data']
+            return 'array' == data_structure.get('type')
+        return False
+
+    @property
+    def raw_params(self):
+        if self.sends_query:
+            return self.route_params + self.method_params
+        return list(self.route_params)
+
+    @property
+    def body_filter(self):
+        """
+        Filter plan for the request body or None.
+        """
+        schema = self.body_schema
+        if schema is None:
+            return None
+        if '$ref' in schema:
+            return get_schema_plan(self.spec, schema['$ref'])
+        return get_schema_plan(self.spec, schema=schema)
+
+    def check_arguments(self, kwargs):
+        for validator in self.validators:
+            if validator.name in kwargs:
+                validator(kwargs.get(validator.name, ''))
+
+    def build(self, kwargs):
+        """
+        Returns (uri, payload, body) for the given arguments.
+        """
+        uri = self.template.format(**kwargs) if kwargs else self.template
+        payload = {}
+        data = {}
+        for key, value in six.iteritems(kwargs):
+            if value and key not in self.path_params:
+                if self.sends_query:
+                    payload[key] = value
+                elif key == self.body_param_name:
+                    data.update(value)
+        return uri, payload, data
+
+
+def get_plan(spec, route, http_method):
+    """
+    Returns cached plan for the route, compiles it on first use.
+    """
+    key = (id(spec), route, http_method)
+    plan = _plans.get(key)
+    if plan is None or plan.spec is not spec:
+        plan = _plans[key] = RoutePlan(spec, route, http_method)
+    return plan
+
+
+# route of URIs that match no spec path, keeps metric labels bounded
+UNMATCHED_ROUTE = 'unmatched'
+
+
+def match_route(spec, uri):
+    """
+    Returns the spec path of request `uri`, e.g. "/{envId}/farms/" for
+    "/api/v1beta0/user/1/farms/", or UNMATCHED_ROUTE if no path matches.
+    """
+    matcher = _route_matchers.get(id(spec))
+    if matcher is None or matcher[0] is not spec:
+        # literal paths win over parametrized ones
+        paths = sorted(spec['paths'], key=lambda path: (path.count('{'), path))
+        matcher = _route_matchers[id(spec)] = (spec, [
+            (path, re.compile('^{}$'.format(re.sub(r'\\\{\w+\\\}', '[^/]+', re.escape(path)))))
+            for path in paths])
+    base_path = spec.get('basePath', '')
+    path = uri[len(base_path):] if base_path and uri.startswith(base_path) else uri
+    for route, route_re in matcher[1]:
+        if route_re.match(path):
+            return route
+    return UNMATCHED_ROUTE
+
+
+def get_route(api_level, uri):
+    """
+    Returns the spec path of request `uri` at `api_level`, session
+    requests (credentials instead of the level) have a fixed `uri`.
+    """
+    if not isinstance(api_level, six.string_types):
+        return uri
+    try:
+        spec = utils.read_spec(api_level, ext='json')
+    except click.ClickException:
+        return UNMATCHED_ROUTE
+    return match_route(spec, uri)
+
+
+class SchemaPlan(object):
+    """
+    Compiled filter for objects of a single definition, removes
+    unknown, read-only and (optionally) create-only keys before
+    the object is sent in POST or PATCH.
+    """
+
+    def __init__(self, spec, schema, reference=None):
+        self.spec = spec
+        self.reference = reference
+        schema = schema or {}
+
+        self.discriminator = schema.get('discriminator')
+        self.concrete_types = self._list_concrete_types(schema) \
+            if self.discriminator else []
+
+        name = reference.split('/')[-1] if reference else None
+        self.create_only = frozenset(schema.get('x-createOnly', ()))
+        self.read_only = frozenset(
+            key for key, value in schema.get('properties', {}).items()
+            if value.get('readOnly'))
+
+        self.known_keys = frozenset(schema.get('properties', ()))
+
+        # (key, key path, create-only, sub-object reference, is list)
+        self.fields = []
+        for key, value in schema.get('properties', {}).items():
+            if key in self.read_only:
+                continue
+            ref, is_list = value.get('$ref'), False
+            if not ref and '$ref' in value.get('items', {}):
+                ref, is_list = value['items']['$ref'], True
+            self.fields.append((key, '{}.{}'.format(name, key) if name else key,
+                                key in self.create_only, ref, is_list))
+
+    def _list_concrete_types(self, schema):
+        types = []
+        for ref_dict in schema.get('x-concreteTypes', ()):
+            types += [link.split('/')[-1] for link in
+                      self._concrete_references(ref_dict['$ref'])]
+        return types
+
+    def _concrete_references(self, reference):
+        schema = lookup(self.spec, reference) or {}
+        if 'x-concreteTypes' not in schema:
+            return [reference]
+        references = []
+        for ref_dict in schema['x-concreteTypes']:
+            references += self._concrete_references(ref_dict['$ref'])
+        return references
+
+    def infer_type(self, data):
+        """
+        Returns the only concrete type whose properties
+        cover all keys of `data` or None if it is ambiguous.
+        """
+        keys = set(data)
+        keys.discard(self.discriminator)
+        candidates = [
+            disc_type for disc_type in self.concrete_types
+            if keys <= get_schema_plan(
+                self.spec, '#/definitions/{}'.format(disc_type)).known_keys
+        ]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def collect_discriminators(self, data, discriminators):
+        """
+        Fills `discriminators` map for `data` and its sub-objects
+        using the values in the body, returns False when some
+        of them cannot be resolved without the current object.
+        """
+        plan = self
+        if self.discriminator:
+            disc_path = '{}/{}'.format(self.reference, self.discriminator)
+            disc_value = data.get(self.discriminator)
+            if disc_value:
+                # invalid values are reported by `filter`
+                if disc_value not in self.concrete_types:
+                    return True
+            else:
+                disc_value = discriminators.get(disc_path) or self.infer_type(data)
+                if not disc_value:
+                    return False
+            discriminators[disc_path] = disc_value
+            plan = get_schema_plan(self.spec, '#/definitions/{}'.format(disc_value))
+
+        for key, _, _, ref, is_list in plan.fields:
+            if not ref or key not in data:
+                continue
+            value = data[key]
+            items = value if is_list and isinstance(value, list) else [value]
+            sub_plan = get_schema_plan(self.spec, ref)
+            for item in items:
+                if isinstance(item, dict) and \
+                        not sub_plan.collect_discriminators(item, discriminators):
+                    return False
+        return True
+
+    def resolve(self, data, discriminators):
+        """
+        Returns plan of the concrete type for `data`,
+        `discriminators` map keeps values found for every reference.
+        """
+        if not self.discriminator:
+            return self
+
+        disc_key = self.discriminator
+        disc_path = '{}/{}'.format(self.reference, disc_key)
+        disc_value = data.get(disc_key) or discriminators.get(disc_path)
+
+        if not disc_value:
+            raise click.ClickException((
+                "Provided JSON object is incorrect: missing required param '{}'."
+            ).format(disc_key))
+        elif disc_value not in self.concrete_types:
+            raise click.ClickException((
+                "Provided JSON object is incorrect: required "
+                "param '{}' has invalid value '{}', must be one of: {}."
+            ).format(disc_key, disc_value, self.concrete_types))
+
+        # save discriminator for current reference/key
+        discriminators[disc_path] = disc_value
+        return get_schema_plan(self.spec, '#/definitions/{}'.format(disc_value))
+
+    def filter(self, data, filter_createonly=False, discriminators=None):
+        if discriminators is None:
+            discriminators = {}
+        plan = self.resolve(data, discriminators)
+
+        if settings.debug_mode:
+            plan._debug_ignored(data, filter_createonly)
+
+        filtered = {}
+        for key, key_path, create_only, ref, is_list in plan.fields:
+            if key not in data or (filter_createonly and create_only):
+                continue
+            value = data[key]
+            if ref and not is_list and isinstance(value, dict):
+                utils.debug("Filter sub-object: {}.".format(ref))
+                value = get_schema_plan(self.spec, ref).filter(
+                    value, filter_createonly, discriminators)
+            elif ref and is_list and isinstance(value, list):
+                utils.debug("Filter list of sub-objects: {}.".format(ref))
+                sub_plan = get_schema_plan(self.spec, ref)
+                value = [sub_plan.filter(item, filter_createonly, discriminators)
+                         for item in value]
+            filtered[key] = value
+        return filtered
+
+    def _debug_ignored(self, data, filter_createonly):
+        name = self.reference.split('/')[-1] if self.reference else None
+        for key in sorted(self.read_only):
+            if key in data:
+                utils.debug("Ignore {}, read-only key.".format(
+                    '{}.{}'.format(name, key) if name else key))
+        for key, key_path, create_only, _, _ in self.fields:
+            if key not in data:
+                utils.debug("Ignore {}, unknown key.".format(key_path))
+            elif filter_createonly and create_only:
+                utils.debug("Ignore {}, create-only key.".format(key_path))
+
+
+def get_schema_plan(spec, reference=None, schema=None):
+    """
+    Returns cached filter plan for the definition `reference`
+    or for an inline `schema`.
+    """
+    key = (id(spec), reference or id(schema))
+    plan = _schema_plans.get(key)
+    if plan is None or plan.spec is not spec:
+        if schema is None:
+            schema = lookup(spec, reference)
+        plan = _schema_plans[key] = SchemaPlan(spec, schema, reference)
+    return plan
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for running API calls concurrently.
+"""
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+from scalrctl import click, context
+
+
+DEFAULT_PARALLEL = 8
+
+
+def imap(func, items, parallel=DEFAULT_PARALLEL):
+    """
+    Calls `func` for every item in a pool of `parallel` threads,
+    yields (item, result, error) tuples in order of completion.
+    Workers run in a copy of the current execution context.
+    """
+    items = list(items)
+    if not items:
+        return
+
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    pool = ThreadPool(max(1, min(parallel, len(items))))
+    try:
+        for result in pool.imap_unordered(context.bind(call), items):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class Progress(object):
+    """
+    Single-line progress and throughput readout on stderr,
+    printed only when stderr is a terminal.
+    """
+
+    def __init__(self, total, label='Done', stream=None):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.failed = 0
+        self.started = time.time()
+        self.stream = stream or sys.stderr
+        self.enabled = hasattr(self.stream, 'isatty') and self.stream.isatty()
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed else 0.0
+
+    def update(self, failed=False):
+        self.done += 1
+        if failed:
+            self.failed += 1
+        if self.enabled:
+            click.echo('\r{}: {}/{}, {} failed, {:.1f}/s'.format(
+                self.label, self.done, self.total, self.failed, self.rate),
+                file=self.stream, nl=False)
+
+    def close(self):
+        if self.enabled and self.done:
+            click.echo(file=self.stream)
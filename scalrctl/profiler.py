@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling of a single invocation.
+
+`scalr-ctl --profile FILE ...` runs the command under cProfile and
+writes pstats to FILE (`python -m pstats FILE`). If FILE ends with
+".collapsed" the process is sampled instead and FILE gets stacks in
+the collapsed format of flamegraph.pl / speedscope. Sampling covers
+all threads, cProfile only the main one.
+
+Work is tagged with phases (config load, spec load, options, request,
+decode, render): sampled stacks start with the phase of their thread
+and time spent in every phase is printed on stderr at exit.
+"""
+import atexit
+import collections
+import contextlib
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+
+from scalrctl import click
+
+
+SAMPLE_INTERVAL = 0.005
+
+_started = time.time()
+
+_lock = threading.Lock()
+
+# phase: [calls, seconds]
+_totals = collections.OrderedDict()
+
+# thread ident: stack of active phases
+_active = {}
+
+_profiler = None
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Tags the work of the block with phase `name`.
+    """
+    stack = _active.setdefault(threading.current_thread().ident, [])
+    stack.append(name)
+    started = time.time()
+    try:
+        yield
+    finally:
+        elapsed = time.time() - started
+        stack.pop()
+        with _lock:
+            total = _totals.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += elapsed
+
+
+def phased(name):
+    """
+    Decorator tagging every call of the function with phase `name`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return '{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename),
+                               code.co_firstlineno)
+
+
+class Sampler(object):
+    """
+    Samples stacks of all threads every `interval` seconds.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        own = threading.current_thread().ident
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            phases = _active.get(ident)
+            if phases:
+                stack.append('[{}]'.format(phases[-1]))
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def enable(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def disable(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump_stats(self, path):
+        with open(path, 'w') as fp:
+            for stack, count in sorted(self.stacks.items()):
+                fp.write('{} {}\n'.format(stack, count))
+
+
+def start(path):
+    """
+    Starts profiling the process, results are written to `path` at exit.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Sampler() if path.endswith('.collapsed') else cProfile.Profile()
+        _profiler.enable()
+        atexit.register(_finish, _profiler, path, time.time())
+    return _profiler
+
+
+def get_phases():
+    """
+    Returns [(phase, calls, seconds)] in order of first use.
+    """
+    with _lock:
+        return [(name, calls, seconds) for name, (calls, seconds) in _totals.items()]
+
+
+def _finish(profiler, path, profiling_started):
+    profiler.disable()
+    profiler.dump_stats(path)
+
+    from scalrctl import view
+    rows = [['startup', 1, '{:.3f}'.format(profiling_started - _started)]]
+    rows += [[name, calls, '{:.3f}'.format(seconds)] for name, calls, seconds in get_phases()]
+    rows.append(['total', 1, '{:.3f}'.format(time.time() - _started)])
+    click.echo("Profile written to {}:".format(path), err=True)
+    click.echo(view.build_vertical_table(['phase', 'calls', 'seconds'], rows), err=True)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side query and projection engine for list output.
+
+Query expressions use a small, safe subset of Python syntax, e.g.::
+
+    status=='running' and farm.id==42
+    cloudPlatform in ('ec2', 'gce') and not name=='test'
+
+Equality conditions on filterable fields are pushed down into API query
+params, the whole expression is then evaluated locally over the rows.
+"""
+import ast
+import json
+import operator
+
+import six
+
+from scalrctl import click
+
+
+_LITERAL_NAMES = {
+    'true': True,
+    'false': False,
+    'null': None,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+
+
+def _contains(container, item):
+    try:
+        return item in container
+    except TypeError:
+        return False
+
+
+def _in(left, right):
+    return _contains(right, left)
+
+
+def _not_in(left, right):
+    return not _contains(right, left)
+
+
+_COMPARATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: _in,
+    ast.NotIn: _not_in,
+}
+
+_ORDERING = (operator.lt, operator.le, operator.gt, operator.ge)
+
+
+def get_path(row, path):
+    """
+    Returns value of the dotted `path` in `row` or None if it is missing.
+    """
+    value = row
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _coerce(left, right):
+    # API returns some IDs as numbers and some as strings,
+    # `farm.id==42` must match both of them
+    if isinstance(left, bool) or isinstance(right, bool):
+        return left, right
+    if isinstance(left, six.string_types) and isinstance(right, (int, float)):
+        return left, six.text_type(right)
+    if isinstance(right, six.string_types) and isinstance(left, (int, float)):
+        return six.text_type(left), right
+    return left, right
+
+
+def _compare(op, left, right):
+    if op in (_in, _not_in):
+        if isinstance(right, (list, tuple)):
+            right = [_coerce(left, item)[1] for item in right]
+        return op(left, right)
+    left, right = _coerce(left, right)
+    if op in _ORDERING and (left is None or right is None):
+        return False
+    try:
+        return op(left, right)
+    except TypeError:
+        return False
+
+
+class Query(object):
+    """
+    Compiled query expression.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError:
+            raise click.ClickException(
+                "Invalid query expression: {}".format(expression))
+        self._conjuncts = []
+        self._match = self._compile(tree.body, top_level=True)
+
+    def _operand(self, node):
+        path = self._field_path(node)
+        if path is not None:
+            return path, lambda row: get_path(row, path)
+        value = self._literal(node)
+        return None, lambda row: value
+
+    @staticmethod
+    def _field_path(node):
+        path = []
+        while isinstance(node, ast.Attribute):
+            path.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name) or \
+                (not path and node.id in _LITERAL_NAMES):
+            return None
+        path.append(node.id)
+        return tuple(reversed(path))
+
+    def _literal(self, node):
+        if isinstance(node, ast.Name) and node.id in _LITERAL_NAMES:
+            return _LITERAL_NAMES[node.id]
+        try:
+            return ast.literal_eval(node)
+        except ValueError:
+            raise click.ClickException(
+                "Invalid query expression: {}".format(self.expression))
+
+    def _compile(self, node, top_level=False):
+        if isinstance(node, ast.BoolOp):
+            is_and = isinstance(node.op, ast.And)
+            parts = [self._compile(value, top_level=top_level and is_and)
+                     for value in node.values]
+            if is_and:
+                return lambda row: all(part(row) for part in parts)
+            return lambda row: any(part(row) for part in parts)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            part = self._compile(node.operand)
+            return lambda row: not part(row)
+
+        if isinstance(node, ast.Compare):
+            return self._compile_compare(node, top_level)
+
+        # bare field name, e.g. `isScalarized`
+        path = self._field_path(node)
+        if path is not None:
+            return lambda row: bool(get_path(row, path))
+
+        raise click.ClickException(
+            "Unsupported query expression: {}".format(self.expression))
+
+    def _compile_compare(self, node, top_level):
+        operands = [node.left] + list(node.comparators)
+        compiled = []
+        for op_node, left, right in zip(node.ops, operands, operands[1:]):
+            op = _COMPARATORS.get(type(op_node))
+            if op is None:
+                raise click.ClickException(
+                    "Unsupported operator in query: {}".format(self.expression))
+
+            if top_level and len(node.ops) == 1 and isinstance(op_node, ast.Eq):
+                l_path = self._field_path(left)
+                r_path = self._field_path(right)
+                if l_path and not r_path:
+                    self._conjuncts.append((l_path, self._literal(right)))
+                elif r_path and not l_path:
+                    self._conjuncts.append((r_path, self._literal(left)))
+
+            compiled.append((op, self._operand(left)[1], self._operand(right)[1]))
+
+        def match(row):
+            for op, get_left, get_right in compiled:
+                if not _compare(op, get_left(row), get_right(row)):
+                    return False
+            return True
+
+        return match
+
+    def match(self, row):
+        return self._match(row)
+
+    def filter(self, rows):
+        return [row for row in rows if self._match(row)]
+
+    def pushdown(self, filterable):
+        """
+        Returns API query params for equality conditions on `filterable`
+        fields of the top-level conjunction, e.g. {'farm': '42'}
+        for `farm.id==42`.
+        """
+        filterable = set(filterable or ())
+        params = {}
+        for path, value in self._conjuncts:
+            if len(path) == 1:
+                name = path[0]
+            elif len(path) == 2 and path[1] == 'id':
+                name = path[0]
+            else:
+                continue
+            if name in filterable and name not in params:
+                if not isinstance(value, six.string_types):
+                    value = json.dumps(value)
+                params[name] = value
+        return params
+
+
+def compile_query(expression):
+    return Query(expression)
+
+
+def parse_fields(fields):
+    """
+    Converts 'id,farm.id' to [('id',), ('farm', 'id')].
+    """
+    return [tuple(field.strip().split('.'))
+            for field in fields.split(',') if field.strip()]
+
+
+def project(row, fields):
+    """
+    Returns a copy of `row` that contains only `fields`,
+    nested fields keep their structure.
+    """
+    result = {}
+    for path in fields:
+        value = get_path(row, path)
+        target = result
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return result
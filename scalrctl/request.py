@@ -3,13 +3,18 @@ import binascii
 import hashlib
 import hmac
 import json
+import random
+import threading
 import time
+from email.utils import mktime_tz, parsedate_tz
 
 import requests
 import yaml
+from requests.packages.urllib3.exceptions import NewConnectionError
 from six.moves.urllib.parse import quote, urlunsplit
 
-from scalrctl import click, settings
+from scalrctl import click, metrics, plans, profiler, trace
+from scalrctl.context import settings
 from scalrctl.compat import urlencode
 
 __author__ = 'Dmitriy Korsakov, Sergey Babak'
@@ -41,6 +46,22 @@ except:
     pass
 
 
+_local = threading.local()
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def get_session():
+    """
+    Returns HTTP session of the current thread, sessions keep
+    connections to Scalr API alive between requests.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
 def _key_pair(api_level='user'):
     """
     Returns key pair(key id and secret key) for specified API scope.
@@ -71,13 +92,125 @@ def _key_pair(api_level='user'):
     return api_key_id, secret_key
 
 
-def request(method, api_level, request_uri, payload=None, data=None):
+def _observe(method, api_level, url, request_uri, payload, body, response=None,
+             started=None, retries=0, error=None):
     """
-    Makes request to Scalr API.
+    Counts the call in metrics and records it to the trace, if any.
     """
+    route = plans.get_route(api_level, request_uri)
+    metrics.observe(method, route, response.status_code if response is not None else None,
+                    time.time() - started,
+                    request_bytes=len(body.encode('utf-8')) if body else 0,
+                    response_bytes=len(response.content) if response is not None else 0,
+                    retries=retries)
+    tracer = trace.get_tracer()
+    if tracer:
+        tracer.record(method, api_level, route, url, payload, body, response,
+                      started=started, retries=retries, error=error)
 
+
+def _sign(method, request_uri, query_string, body, api_key_id, secret_key):
+    """
+    Returns request headers signed with the current time.
+    """
     time_iso8601 = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
 
+    string_to_sign = '\n'.join((
+        method.upper(),
+        time_iso8601,
+        request_uri,
+        query_string,
+        body
+    ))
+
+    digest = hmac.new(
+        secret_key.encode('UTF-8'),
+        string_to_sign.encode('UTF-8'),
+        hashlib.sha256
+    ).digest()
+
+    signature = '{} {}'.format(
+        settings.SIGNATURE_VERSION,
+        binascii.b2a_base64(digest).strip().decode('UTF-8')
+    )
+
+    headers = dict()
+    headers['Content-Type'] = 'application/json; charset=utf-8'
+    headers['X-Scalr-Key-Id'] = api_key_id
+    headers['X-Scalr-Date'] = time_iso8601
+    headers['X-Scalr-Signature'] = signature
+    # if hasattr(settings, "API_DEBUG") and settings.API_DEBUG:
+    #    headers['X-Scalr-Debug'] = 1
+
+    if settings.debug_mode:
+        click.echo('API HOST: {}\n'
+                   'stringToSign: {}\n'
+                   'Headers: {}\n'.format(
+                       settings.API_HOST,
+                       string_to_sign,
+                       json.dumps(headers, indent=2))
+                   )
+    return headers
+
+
+def _is_connect_error(error):
+    """
+    True if the connection failed before the request was sent.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _retry_after(response):
+    """
+    Returns delay in seconds from the Retry-After header or None.
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        date = parsedate_tz(value)
+        return max(mktime_tz(date) - time.time(), 0) if date else None
+
+
+def _should_retry(method, response=None, error=None):
+    """
+    GET is retried on any failure, other methods only if the request
+    did not reach the server. 429 means the request was rejected
+    before processing, so it is retried for all methods.
+    """
+    if response is not None:
+        if response.status_code == 429:
+            return True
+        return method.upper() == 'GET' and response.status_code in RETRY_STATUSES
+    if method.upper() == 'GET':
+        return isinstance(error, (requests.exceptions.ConnectionError,
+                                  requests.exceptions.Timeout))
+    return _is_connect_error(error)
+
+
+def _get_delay(attempt, response=None):
+    """
+    Returns pause before retry `attempt` (1-based): Retry-After of the
+    response if present, else exponential backoff with full jitter.
+    """
+    delay = _retry_after(response)
+    if delay is None:
+        delay = random.uniform(0, settings.RETRY_BACKOFF * 2 ** (attempt - 1))
+    return min(delay, settings.RETRY_MAX_DELAY)
+
+
+def request(method, api_level, request_uri, payload=None, data=None):
+    """
+    Makes request to Scalr API.
+    """
+
     try:
         api_key_id, secret_key = _key_pair(api_level=api_level)
 
@@ -88,33 +221,6 @@ def request(method, api_level, request_uri, payload=None, data=None):
 
         body = json.dumps(yaml.safe_load(data)) if data else ''  # XXX
 
-        string_to_sign = '\n'.join((
-            method.upper(),
-            time_iso8601,
-            request_uri,
-            query_string,
-            body
-        ))
-
-        digest = hmac.new(
-            secret_key.encode('UTF-8'),
-            string_to_sign.encode('UTF-8'),
-            hashlib.sha256
-        ).digest()
-
-        signature = '{} {}'.format(
-            settings.SIGNATURE_VERSION,
-            binascii.b2a_base64(digest).strip().decode('UTF-8')
-        )
-
-        headers = dict()
-        headers['Content-Type'] = 'application/json; charset=utf-8'
-        headers['X-Scalr-Key-Id'] = api_key_id
-        headers['X-Scalr-Date'] = time_iso8601
-        headers['X-Scalr-Signature'] = signature
-        # if hasattr(settings, "API_DEBUG") and settings.API_DEBUG:
-        #    headers['X-Scalr-Debug'] = 1
-
         url = urlunsplit((
             settings.API_SCHEME,
             settings.API_HOST,
@@ -123,23 +229,39 @@ def request(method, api_level, request_uri, payload=None, data=None):
             ''
         ))
 
-        if settings.debug_mode:
-            click.echo('API HOST: {}\n'
-                       'stringToSign: {}\n'
-                       'Headers: {}\n'.format(
-                           settings.API_HOST,
-                           string_to_sign,
-                           json.dumps(headers, indent=2))
-                       )
-
-        resp = requests.request(
-            method.lower(),
-            url,
-            data=body,
-            params=payload,
-            headers=headers,
-            verify=settings.SSL_VERIFY_PEER
-        )
+        attempt = 0
+        while True:
+            # signature covers the date, sign every attempt anew
+            headers = _sign(method, request_uri, query_string, body, api_key_id, secret_key)
+            started = time.time()
+            resp = error = None
+            try:
+                with profiler.phase('request'):
+                    resp = get_session().request(
+                        method.lower(),
+                        url,
+                        data=body,
+                        params=payload,
+                        headers=headers,
+                        verify=settings.SSL_VERIFY_PEER
+                    )
+            except Exception as e:
+                error = e
+            _observe(method, api_level, url, request_uri, payload, body, resp,
+                     started=started, retries=int(attempt > 0), error=error)
+
+            if attempt >= settings.MAX_RETRIES or not _should_retry(method, resp, error):
+                break
+            attempt += 1
+            delay = _get_delay(attempt, resp)
+            if settings.debug_mode:
+                click.echo("Retry {} of {} in {:.1f}s: {}".format(
+                    attempt, settings.MAX_RETRIES, delay,
+                    error if error is not None else 'HTTP {}'.format(resp.status_code)))
+            time.sleep(delay)
+
+        if error is not None:
+            raise error
         result = resp.text
 
         if settings.debug_mode:
@@ -27,3 +27,15 @@ SSL_VERIFY_PEER = True
 GLOBAL_SCOPE_API_KEY_ID = None
 
 GLOBAL_SCOPE_API_SECRET_KEY = None
+
+WEBHOOK_LISTEN = None
+
+WEBHOOK_URL = None
+
+METRICS_FILE = None
+
+MAX_RETRIES = 4
+
+RETRY_BACKOFF = 0.5
+
+RETRY_MAX_DELAY = 60
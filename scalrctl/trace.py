@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Request tracing.
+
+`scalr-ctl --trace FILE ...` records every API call as a JSON line:
+command, route, status, sizes, retries and timings. The slowest routes
+are summarized on stderr when the process exits. If FILE ends with
+".har" the lines go to "FILE.jsonl" and are converted to HAR at exit,
+so a killed run keeps its calls. Traces are converted manually with::
+
+    python -m scalrctl.trace trace.jsonl > trace.har
+
+`requests` does not expose DNS, connect and TLS phases, so `ttfb` is
+the time from sending the request until the response headers were
+parsed and `total` also includes reading the body.
+"""
+import atexit
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+import six
+from six.moves.urllib.parse import urlencode
+
+from scalrctl import click
+
+
+SUMMARY_ROUTES = 10
+
+_tracer = None
+
+
+class Tracer(object):
+    """
+    Writes trace entries of API calls to `path`, one per line,
+    and keeps running totals of every route for the summary.
+    """
+
+    def __init__(self, path, har=None):
+        self.path = path
+        self.har = path.endswith('.har') if har is None else har
+        self.lines_path = path + '.jsonl' if self.har else path
+        self.command = None
+        # (method, route): [calls, seconds, max seconds, response bytes, errors]
+        self.totals = collections.OrderedDict()
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._fp = open(self.lines_path, 'w')
+
+    def record(self, method, api_level, route, url, payload=None, body='', response=None,
+               started=None, retries=0, error=None):
+        total = time.time() - started
+        entry = collections.OrderedDict([
+            ('started', started),
+            ('command', self.command),
+            ('api_level', api_level if isinstance(api_level, six.string_types) else 'session'),
+            ('method', method.upper()),
+            ('route', route),
+            ('url', url),
+            ('query', payload or {}),
+            ('status', response.status_code if response is not None else None),
+            ('request_bytes', len(body.encode('utf-8')) if body else 0),
+            ('response_bytes', len(response.content) if response is not None else 0),
+            ('retries', retries),
+            ('ttfb', response.elapsed.total_seconds() if response is not None else None),
+            ('total', total),
+            ('error', str(error) if error is not None else None),
+        ])
+        with self._lock:
+            add_entry(self.totals, entry)
+            self.calls += 1
+            if self._fp:
+                self._fp.write(json.dumps(entry) + '\n')
+                self._fp.flush()
+        return entry
+
+    def close(self):
+        with self._lock:
+            if not self._fp:
+                return
+            self._fp.close()
+            self._fp = None
+            if self.har:
+                with open(self.lines_path) as lines, open(self.path, 'w') as fp:
+                    write_har(_read_entries(lines), fp)
+                os.remove(self.lines_path)
+
+
+def add_entry(totals, entry):
+    """
+    Adds trace `entry` to the running `totals` of its route.
+    """
+    route = totals.setdefault((entry['method'], entry['route']), [0, 0.0, 0.0, 0, 0])
+    route[0] += 1
+    route[1] += entry['total']
+    route[2] = max(route[2], entry['total'])
+    route[3] += entry['response_bytes']
+    route[4] += bool(entry['error'] or (entry['status'] or 0) >= 400)
+
+
+def summarize(totals, limit=SUMMARY_ROUTES):
+    """
+    Returns table rows of the `limit` routes with the largest total time.
+    """
+    rows = []
+    for (method, route), (calls, total, longest, size, errors) in totals.items():
+        rows.append([
+            '{} {}'.format(method, route),
+            calls,
+            '{:.2f}'.format(total),
+            '{:.0f}'.format(total / calls * 1000),
+            '{:.0f}'.format(longest * 1000),
+            size,
+            errors,
+        ])
+    rows.sort(key=lambda row: -float(row[2]))
+    return rows[:limit]
+
+
+def _read_entries(lines):
+    return (json.loads(line) for line in lines if line.strip())
+
+
+def _har_entry(entry):
+    ttfb = entry['ttfb'] if entry['ttfb'] is not None else entry['total']
+    query = sorted((entry.get('query') or {}).items())
+    url = entry['url'] + ('?' + urlencode(query) if query else '')
+    return {
+        'startedDateTime': time.strftime(
+            '%Y-%m-%dT%H:%M:%S', time.gmtime(entry['started'])) + '.{:03d}Z'.format(
+                int(entry['started'] % 1 * 1000)),
+        'time': entry['total'] * 1000,
+        'request': {
+            'method': entry['method'],
+            'url': url,
+            'httpVersion': 'HTTP/1.1',
+            'cookies': [],
+            'headers': [],
+            'queryString': [{'name': name, 'value': str(value)} for name, value in query],
+            'headersSize': -1,
+            'bodySize': entry['request_bytes'],
+        },
+        'response': {
+            'status': entry['status'] or 0,
+            'statusText': entry['error'] or '',
+            'httpVersion': 'HTTP/1.1',
+            'cookies': [],
+            'headers': [],
+            'content': {'size': entry['response_bytes'], 'mimeType': 'application/json'},
+            'redirectURL': '',
+            'headersSize': -1,
+            'bodySize': entry['response_bytes'],
+        },
+        'cache': {},
+        'timings': {
+            'blocked': -1,
+            'dns': -1,
+            'connect': -1,
+            'ssl': -1,
+            'send': 0,
+            'wait': ttfb * 1000,
+            'receive': max(entry['total'] - ttfb, 0) * 1000,
+        },
+        'comment': '{} {}'.format(entry['command'] or '', entry['route']).strip(),
+    }
+
+
+_HAR_CREATOR = {'name': 'scalr-ctl', 'version': ''}
+
+
+def to_har(entries):
+    """
+    Converts trace entries to HAR 1.2.
+    """
+    return {'log': {
+        'version': '1.2',
+        'creator': _HAR_CREATOR,
+        'entries': [_har_entry(entry) for entry in entries],
+    }}
+
+
+def write_har(entries, fp):
+    """
+    Writes trace entries to `fp` as HAR 1.2 one by one.
+    """
+    fp.write('{{"log": {{"version": "1.2", "creator": {}, "entries": [\n'.format(
+        json.dumps(_HAR_CREATOR)))
+    separator = ''
+    for entry in entries:
+        fp.write(separator + json.dumps(_har_entry(entry)))
+        separator = ',\n'
+    fp.write('\n]}}\n')
+
+
+def get_tracer():
+    return _tracer
+
+
+def start(path):
+    """
+    Starts tracing API calls of the process to `path`.
+    """
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path)
+        atexit.register(_finish, _tracer)
+    return _tracer
+
+
+def _finish(tracer):
+    tracer.close()
+    rows = summarize(tracer.totals)
+    if not rows:
+        return
+    from scalrctl import view
+    columns = ['route', 'calls', 'total s', 'avg ms', 'max ms', 'bytes', 'errors']
+    click.echo("Slowest routes ({} calls, trace in {}):".format(tracer.calls, tracer.path),
+               err=True)
+    click.echo(view.build_vertical_table(columns, rows), err=True)
+
+
+def wrap(command, callback):
+    """
+    Wraps Action `callback` to mark traced calls with the command.
+    """
+    def wrapper(*args, **kwargs):
+        if _tracer is not None:
+            _tracer.command = command
+        return callback(*args, **kwargs)
+    return wrapper
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.exit("Usage: python -m scalrctl.trace TRACE.jsonl > TRACE.har")
+    with open(argv[0]) as fp:
+        write_har(_read_entries(fp), sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,25 +8,42 @@ import itertools
 import threading
 import traceback
 
-from scalrctl import click, defaults, settings
+from scalrctl import click, defaults, profiler
+from scalrctl.context import settings
+
+
+_spec_cache = {}
 
 
 def read_spec(api_level, ext='json'):
     """
     Reads Scalr specification file, json or yaml.
+    Parsed specs are cached until the file changes on disk,
+    callers must not modify the returned document.
     """
 
     spec_path = os.path.join(defaults.CONFIG_DIRECTORY,
                              '{}.{}'.format(api_level, ext))
 
     if os.path.exists(spec_path):
-        with open(spec_path, 'r') as fp:
-            spec_data = fp.read()
-
-        if ext == 'json':
-            return json.loads(spec_data)
-        elif ext == 'yaml':
-            return yaml.safe_load(spec_data)
+        stat = os.stat(spec_path)
+        stamp = (stat.st_mtime, stat.st_size)
+        cached = _spec_cache.get(spec_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        with profiler.phase('spec load'):
+            with open(spec_path, 'r') as fp:
+                spec_data = fp.read()
+
+            if ext == 'json':
+                spec = json.loads(spec_data)
+            elif ext == 'yaml':
+                spec = yaml.safe_load(spec_data)
+            else:
+                return
+        _spec_cache[spec_path] = (stamp, spec)
+        return spec
     else:
         msg = "Scalr specification file '{}' does  not exist, " \
               "try to run 'scalr-ctl update'.".format(spec_path)
@@ -99,8 +116,8 @@ def reraise(message):
 class _spinner(object):
 
     @staticmethod
-    def draw(event):
-        if settings.colored_output:
+    def draw(event, colored_output=True):
+        if colored_output:
             cursor = itertools.cycle('|/-\\')
             while not event.isSet():
                 sys.stdout.write(next(cursor))
@@ -113,7 +130,7 @@ class _spinner(object):
     def __init__(self):
         self.event = threading.Event()
         self.thread = threading.Thread(target=_spinner.draw,
-                                       args=(self.event,))
+                                       args=(self.event, settings.colored_output))
         self.thread.daemon = True
 
     def __enter__(self):
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side validation of request bodies against spec definitions.
+
+Validators are compiled once per definition and cached with the
+spec document, they check types, enums, patterns, required
+properties and discriminators (`x-concreteTypes`). Null values
+are accepted as the API treats them as "not set".
+"""
+import re
+
+import six
+
+from scalrctl import plans
+
+
+_validators = {}
+
+_TYPE_CHECKS = {
+    'string': lambda value: isinstance(value, six.string_types),
+    'integer': lambda value: isinstance(value, six.integer_types) and
+    not isinstance(value, bool),
+    'number': lambda value: isinstance(value, six.integer_types + (float,)) and
+    not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'array': lambda value: isinstance(value, list),
+    'object': lambda value: isinstance(value, dict),
+}
+
+
+def _error(path, message, code='InvalidValue'):
+    return {
+        'code': code,
+        'message': "{}: {}".format(path, message) if path else message,
+    }
+
+
+def _join(path, key):
+    return '{}.{}'.format(path, key) if path else key
+
+
+class Validator(object):
+    """
+    Compiled validator for a single schema node.
+    """
+
+    def __init__(self, spec, schema, reference=None):
+        self.spec = spec
+        self.reference = reference
+        schema = schema or {}
+        if '$ref' in schema and reference is None:
+            self.reference = schema['$ref']
+            schema = plans.lookup(spec, schema['$ref']) or {}
+
+        self.type = schema.get('type')
+        if self.type is None and 'properties' in schema:
+            self.type = 'object'
+        self._type_check = _TYPE_CHECKS.get(self.type)
+        self.enum = schema.get('enum')
+        self.pattern = re.compile(schema['pattern']) \
+            if 'pattern' in schema else None
+
+        self.properties = {}
+        for key, value in schema.get('properties', {}).items():
+            if not value.get('readOnly'):
+                self.properties[key] = value
+        self.required = [key for key in schema.get('required', ())
+                         if key in self.properties]
+
+        self.is_foreign_key = self.type == 'object' and \
+            'id' in schema.get('properties', {})
+
+        self.items = schema.get('items')
+        self.discriminator = schema.get('discriminator')
+        self.concrete_types = plans.get_schema_plan(
+            spec, self.reference, schema=schema).concrete_types \
+            if self.discriminator else []
+
+    def _child(self, schema):
+        if '$ref' in schema:
+            return get_validator(self.spec, schema['$ref'])
+        return get_validator(self.spec, schema=schema)
+
+    def coerce(self, value):
+        """
+        Converts numeric strings to integers and numbers where the
+        schema expects them, e.g. IDs taken from command line options.
+        Objects and arrays are updated in place, returns the value.
+        """
+        if isinstance(value, six.string_types) and self.type in ('integer', 'number'):
+            try:
+                return int(value) if self.type == 'integer' else float(value)
+            except ValueError:
+                return value
+        if isinstance(value, list) and self.items:
+            child = self._child(self.items)
+            value[:] = [child.coerce(item) for item in value]
+        elif isinstance(value, dict):
+            validator = self
+            disc_value = value.get(self.discriminator) if self.discriminator else None
+            if disc_value in self.concrete_types:
+                validator = get_validator(self.spec, '#/definitions/{}'.format(disc_value))
+            for key, item in list(value.items()):
+                schema = validator.properties.get(key)
+                if schema is not None:
+                    value[key] = validator._child(schema).coerce(item)
+        return value
+
+    def validate(self, value, path='', partial=False):
+        """
+        Returns list of errors, `partial` skips required
+        properties check (PATCH bodies).
+        """
+        if value is None:
+            return []
+        if self.is_foreign_key and not isinstance(value, bool) and \
+                isinstance(value, six.string_types + six.integer_types):
+            # the API accepts an ID instead of {"id": ...} object
+            return []
+        if self._type_check and not self._type_check(value):
+            return [_error(path, "must be {}, got {}".format(
+                self.type, type(value).__name__))]
+        if self.enum and value not in self.enum:
+            return [_error(path, "'{}' is not one of: {}".format(
+                value, ', '.join(str(item) for item in self.enum)))]
+        if self.pattern and isinstance(value, six.string_types) and \
+                not self.pattern.search(value):
+            return [_error(path, "'{}' does not match pattern '{}'".format(
+                value, self.pattern.pattern))]
+
+        if isinstance(value, list) and self.items:
+            child = self._child(self.items)
+            errors = []
+            for num, item in enumerate(value):
+                errors += child.validate(item, '{}[{}]'.format(path, num), partial)
+            return errors
+
+        if isinstance(value, dict):
+            return self._validate_object(value, path, partial)
+        return []
+
+    def _validate_object(self, value, path, partial):
+        if self.discriminator:
+            disc_value = value.get(self.discriminator)
+            if disc_value is None:
+                if partial:
+                    return self._validate_properties(value, path, partial)
+                return [_error(_join(path, self.discriminator),
+                               "missing required property",
+                               code='InvalidStructure')]
+            if disc_value not in self.concrete_types:
+                return [_error(_join(path, self.discriminator),
+                               "'{}' is not one of: {}".format(
+                                   disc_value, ', '.join(self.concrete_types)))]
+            concrete = get_validator(self.spec, '#/definitions/{}'.format(disc_value))
+            return concrete._validate_properties(value, path, partial)
+        return self._validate_properties(value, path, partial)
+
+    def _validate_properties(self, value, path, partial):
+        errors = []
+        if not partial:
+            for key in self.required:
+                if value.get(key) is None:
+                    errors.append(_error(_join(path, key),
+                                         "missing required property",
+                                         code='InvalidStructure'))
+        for key, item in six.iteritems(value):
+            schema = self.properties.get(key)
+            if schema is not None:
+                errors += self._child(schema).validate(item, _join(path, key), partial)
+        return errors
+
+
+def get_validator(spec, reference=None, schema=None):
+    """
+    Returns cached validator for the definition `reference`
+    or for an inline `schema`.
+    """
+    key = (id(spec), reference or id(schema))
+    validator = _validators.get(key)
+    if validator is None or validator.spec is not spec:
+        if schema is None:
+            schema = plans.lookup(spec, reference)
+        validator = _validators[key] = Validator(spec, schema, reference)
+    return validator
@@ -1,48 +1,288 @@
 __author__ = 'Dmitriy Korsakov'
 
+import csv
 import json
 import yaml
 import six
 import prettytable
 import re
-from scalrctl import settings
+from scalrctl import click
+from scalrctl.context import settings
 
 
-def calc_vertical_table(response_json, columns):
-    rows = []
-    for block in response_json.get('data', ''):
-        row = []
-        for name in columns:
-            for item in block:
-                if name.lower() == item.lower():
-                    row.append(block[item])
-                    break
-                elif name.lower() == '%s.id' % item.lower():
-                    if 'id' in block[item]:
-                        row.append(block[item]['id'])
-                    else:
-                        row.append('')
-                    break
-            else:
-                row.append('')
-        if row:
-            rows.append(row)
+_PAGE_NUM_RE = re.compile(r"pageNum=(\d*)")
+
+
+def _missing(block):
+    return ''
+
+
+def _compile_extractor(key, nested_id):
+    if not nested_id:
+        return lambda block: block[key]
+
+    def extract_id(block):
+        value = block[key]
+        if isinstance(value, dict):
+            return value.get('id', '')
+        return ''
+    return extract_id
+
+
+def compile_columns(columns, keys):
+    """
+    Builds a column extractor plan for records with given `keys`.
+    Column names are case-insensitive, `farm.id` columns resolve
+    the ID of nested objects.
+    """
+    index = {}
+    for key in keys:
+        index.setdefault(key.lower(), key)
+
+    plan = []
+    for name in columns:
+        name = name.lower()
+        if name in index:
+            plan.append(_compile_extractor(index[name], nested_id=False))
+        elif name.endswith('.id') and name[:-3] in index:
+            plan.append(_compile_extractor(index[name[:-3]], nested_id=True))
+        else:
+            plan.append(None)
+    return plan
+
+
+class ColumnExtractor(object):
+    """
+    Extracts table rows from records. Plans are compiled once
+    per record shape (the tuple of record keys) and reused.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._plans = {}
+
+    def plan(self, block):
+        shape = tuple(block)
+        plan = self._plans.get(shape)
+        if plan is None:
+            plan = [extractor or _missing
+                    for extractor in compile_columns(self.columns, shape)]
+            self._plans[shape] = plan
+        return plan
+
+    def rows(self, blocks):
+        if not self.columns:
+            return []
+        return [[extract(block) for extract in self.plan(block)]
+                for block in blocks]
+
+
+def calc_vertical_table(response_json, columns, extractor=None):
+    extractor = extractor or ColumnExtractor(columns)
+    rows = extractor.rows(response_json.get('data') or ())
 
     pagination = response_json.get("pagination", None)
     pagenum_last, current_pagenum = 1, 1
     if pagination:
         url_last = pagination.get('last', None)
         if url_last:
-            number = re.search("pageNum=(\d*)", url_last)
+            number = _PAGE_NUM_RE.search(url_last)
             pagenum_last = number.group(1) if number else 1
 
         url_next = pagination.get('next', None)
         if url_next:
-            num = re.search("pageNum=(\d*)", url_next)
+            num = _PAGE_NUM_RE.search(url_next)
             pagenum_next = num.group(1) if num else 1
             current_pagenum = int(pagenum_next) - 1
     return rows, current_pagenum, pagenum_last
 
+
+RECORD_FORMATS = ('jsonl', 'csv', 'tsv')
+
+
+def _format_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, six.string_types):
+        return value
+    return json.dumps(value)
+
+
+class RecordWriter(object):
+    """
+    Writes records one per line as JSON lines, CSV or TSV.
+    CSV and TSV header is written once, before the first record,
+    without `columns` it lists the keys of the first records.
+    """
+
+    def __init__(self, fmt, columns=None, stream=None):
+        self.fmt = fmt
+        self.columns = columns
+        self.stream = stream
+        self.extractor = ColumnExtractor(columns) if columns else None
+        self._header_written = False
+
+    def _csv_lines(self, rows):
+        buf = six.StringIO()
+        delimiter = '\t' if self.fmt == 'tsv' else ','
+        writer = csv.writer(buf, delimiter=delimiter, lineterminator='\n')
+        if not self._header_written:
+            writer.writerow(self.columns)
+            self._header_written = True
+        for row in rows:
+            writer.writerow([_format_cell(value) for value in row])
+        return buf.getvalue()
+
+    def write(self, records):
+        if self.fmt == 'jsonl':
+            if self.extractor:
+                records = [dict(zip(self.columns, row))
+                           for row in self.extractor.rows(records)]
+            text = ''.join(json.dumps(record) + '\n' for record in records)
+        else:
+            if not self.extractor:
+                if not records:
+                    return
+                columns = []
+                for record in records:
+                    columns += [key for key in record if key not in columns]
+                self.columns = columns
+                self.extractor = ColumnExtractor(columns)
+            text = self._csv_lines(self.extractor.rows(records))
+        if text:
+            click.echo(text, file=self.stream, nl=False)
+
+
+_XML_NAME_RE = re.compile(r'^[^\W\d][\w.-]*$', re.UNICODE)
+_XML_ESCAPES = (('&', '&amp;'), ('"', '&quot;'), ("'", '&apos;'),
+                ('<', '&lt;'), ('>', '&gt;'))
+
+
+def _escape_xml(text):
+    for char, entity in _XML_ESCAPES:
+        text = text.replace(char, entity)
+    return text
+
+
+def _xml_tag(key):
+    """
+    Returns element name and attributes for a dict key,
+    invalid XML names are fixed the same way dicttoxml does it.
+    """
+    key = _escape_xml(six.text_type(key))
+    if _XML_NAME_RE.match(key):
+        return key, ''
+    if key.isdigit():
+        return 'n%s' % key, ''
+    try:
+        return 'n%s' % float(key), ''
+    except ValueError:
+        pass
+    if _XML_NAME_RE.match(key.replace(' ', '_')):
+        return key.replace(' ', '_'), ''
+    return 'key', ' name="%s"' % key
+
+
+def _xml_type(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, six.string_types):
+        return 'str'
+    if isinstance(value, six.integer_types):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, dict):
+        return 'dict'
+    if isinstance(value, (list, tuple)):
+        return 'list'
+    return 'number'
+
+
+class XMLWriter(object):
+    """
+    Streaming XML writer with the element layout of dicttoxml:
+    typed elements, list items are named `item`. List records are
+    written one by one so pages can be emitted as they arrive.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._tags = {}
+
+    def _echo(self, text):
+        click.echo(text, file=self.stream, nl=False)
+
+    def _tag(self, key):
+        tag = self._tags.get(key)
+        if tag is None:
+            tag = self._tags[key] = _xml_tag(key)
+        return tag
+
+    def _element(self, name, attrs, value, parts):
+        value_type = _xml_type(value)
+        parts.append('<%s%s type="%s">' % (name, attrs, value_type))
+        if value_type == 'dict':
+            for key, item in value.items():
+                tag, tag_attrs = self._tag(key)
+                self._element(tag, tag_attrs, item, parts)
+        elif value_type == 'list':
+            for item in value:
+                self._element('item', '', item, parts)
+        elif value_type == 'bool':
+            parts.append('true' if value else 'false')
+        elif value_type == 'str':
+            parts.append(_escape_xml(value))
+        elif value is not None:
+            parts.append(six.text_type(value))
+        parts.append('</%s>' % name)
+
+    def start(self):
+        self._echo('<?xml version="1.0" encoding="UTF-8" ?><root>')
+
+    def end(self):
+        self._echo('</root>\n')
+
+    def start_list(self, key):
+        tag, attrs = self._tag(key)
+        self._echo('<%s%s type="list">' % (tag, attrs))
+
+    def end_list(self, key):
+        self._echo('</%s>' % self._tag(key)[0])
+
+    def write_items(self, items):
+        for item in items:
+            parts = []
+            self._element('item', '', item, parts)
+            self._echo(''.join(parts))
+
+    def write_element(self, key, value):
+        parts = []
+        tag, attrs = self._tag(key)
+        self._element(tag, attrs, value, parts)
+        self._echo(''.join(parts))
+
+    def write_document(self, document):
+        """
+        Writes the whole response, records of the `data` list
+        are written one at a time.
+        """
+        self.start()
+        if isinstance(document, list):
+            self.write_items(document)
+        else:
+            for key, value in document.items():
+                if isinstance(value, list):
+                    self.start_list(key)
+                    self.write_items(value)
+                    self.end_list(key)
+                else:
+                    self.write_element(key, value)
+        self.end()
+
+
 def prepare_table():
     table = prettytable.PrettyTable()
     table.align = "l"
@@ -51,36 +291,73 @@ def prepare_table():
     table.set_style(prettytable.PLAIN_COLUMNS)
     return table
 
-def build_vertical_table(field_names, rows, pre=None, post=None):
-    table = prepare_table()
 
-    template = '\x1b[1m%s\x1b[0m' if settings.colored_output else "%s"
-    table.field_names = [template % field.upper().replace("_", " ") for field in field_names]
+class StreamingTable(object):
+    """
+    Fixed-width table writer. Columns are sized from the first rows
+    (e.g. the first page of a list), later rows are printed as they come
+    and never buffered. Values wider than the column are not truncated.
+    """
 
-    for row in rows:
-        table.add_row(row)
+    padding = 8
+
+    def __init__(self, field_names, stream=None, pre=None, sample_size=100):
+        self.field_names = [field.upper().replace("_", " ") for field in field_names]
+        self.stream = stream
+        self.pre = pre
+        self.sample_size = sample_size
+        self.widths = None
+
+    def _echo(self, line):
+        click.echo(line, file=self.stream)
+
+    def _format_row(self, cells, template="%s"):
+        parts = []
+        for cell, width in zip(cells, self.widths):
+            parts.append(template % cell + " " * (width - len(cell) + self.padding))
+        return "".join(parts)
+
+    def write(self, rows):
+        rows = [[six.text_type(value) for value in row] for row in rows]
+        if not rows:
+            return
+
+        if self.widths is None:
+            self.widths = [len(name) for name in self.field_names]
+            for row in rows[:self.sample_size]:
+                self.widths = [max(width, len(cell)) for width, cell in zip(self.widths, row)]
 
-    body = table.get_string()
+            self._echo("")
+            if self.pre:
+                self._echo("%s\n" % self.pre)
+            template = '\x1b[1m%s\x1b[0m' if settings.colored_output else "%s"
+            self._echo(self._format_row(self.field_names, template))
 
-    if body and pre:
-        body = "%s\n\n%s" % (pre, body)
-    if body and post:
-        body = "%s\n\n%s" % (body, post)
+        for row in rows:
+            self._echo(self._format_row(row))
 
-    return "\n%s\n" % body
+    def close(self):
+        if self.widths is not None:
+            self._echo("")
+
+
+def build_vertical_table(field_names, rows, pre=None, post=None):
+    stream = six.StringIO()
+    table = StreamingTable(field_names, stream=stream, pre=pre,
+                           sample_size=len(rows))
+    table.write(rows)
+    if table.widths is not None and post:
+        stream.write("\n%s\n" % post)
+    return "\n%s\n" % stream.getvalue().strip("\n")
 
 
 def calc_horizontal_table(response_json, columns):
     rows = []
     data = response_json.get("data", {})
-    for column_name in columns:
-        if column_name.lower() in [d.lower() for d in data.keys()]:
-            rows.append([column_name, data[column_name]])
-        elif column_name.lower() in ['%s.id' % d.lower() for d in data.keys()]:
-            if 'id' in data[column_name[:-3]]:
-                rows.append([column_name, data[column_name[:-3]]['id']])
-            else:
-                rows.append([column_name, ''])
+    plan = compile_columns(columns, data.keys())
+    for column_name, extract in zip(columns, plan):
+        if extract is not None:
+            rows.append([column_name, extract(data)])
     return rows
 
 
@@ -93,40 +370,163 @@ def build_horizontal_table(rows):
     return table.get_string()
 
 
-def build_tree(data):
-    if isinstance(data, str):
-        data = json.loads(data)
+_PLAIN_RE = re.compile(r"^[\w./(][\w ./()'+=,:;~^$<>-]*\Z", re.UNICODE)
+# YAML line breaks other than \n must be escaped, quoted scalars fold them
+_LINE_BREAKS = (u'\x85', u'\u2028', u'\u2029')
+_PRINTABLE_RE = re.compile(u'^[\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd]*\\Z')
+_IMPLICIT_RESOLVERS = yaml.resolver.Resolver.yaml_implicit_resolvers
+
+KEY_TEMPLATE = "\x1b[31m%s\x1b[39m"
+
 
-    yaml_text = yaml.safe_dump(data, allow_unicode=True, default_flow_style=False)
-    if six.PY2:
-        yaml_text = yaml_text.decode("utf-8")
+def _is_plain(value):
+    if not value or value.endswith(' ') or value.endswith(':') \
+            or ': ' in value or not _PLAIN_RE.match(value):
+        return False
+    # strings that look like numbers, booleans, dates, etc. must be quoted
+    for tag, regexp in _IMPLICIT_RESOLVERS.get(value[0], ()):
+        if regexp.match(value):
+            return False
+    return True
 
-    if not settings.colored_output:
-        return yaml_text
 
-    pairs = []
-    in_key = False
+def _represent_scalar(value):
+    """
+    Returns YAML representation of a scalar and whether it is plain.
+    """
+    if value is None:
+        return 'null', True
+    if isinstance(value, bool):
+        return 'true' if value else 'false', True
+    if isinstance(value, six.integer_types):
+        return str(value), True
+    if isinstance(value, float):
+        if value != value:
+            return '.nan', True
+        if value in (float('inf'), float('-inf')):
+            return '.inf' if value > 0 else '-.inf', True
+        text = repr(value).lower()
+        if '.' not in text and 'e' in text:
+            text = text.replace('e', '.0e', 1)
+        return text, True
+    if not isinstance(value, six.string_types):
+        value = six.text_type(value)
+    if _is_plain(value):
+        return value, True
+    if _PRINTABLE_RE.match(value):
+        return "'%s'" % value.replace("'", "''"), False
+    text = json.dumps(value, ensure_ascii=False)
+    for char in _LINE_BREAKS:
+        text = text.replace(char, json.dumps(char)[1:-1])
+    return text, False
 
-    for token in yaml.scan(yaml_text):
 
-        if token.__class__ == yaml.tokens.KeyToken:
-            in_key = True
-            continue
-        if in_key and yaml.tokens.ScalarToken == token.__class__:
-            pairs.append((token.start_mark.index, token.end_mark.index))
-            in_key = False
+class _TreeWriter(object):
 
-    if not pairs:
-        return yaml_text
+    def __init__(self, colored):
+        self.key_template = KEY_TEMPLATE if colored else "%s"
+        self._keys = {}
 
-    last_pos = pairs[0][0]
-    result = yaml_text[:last_pos]
+    def key(self, key):
+        text = self._keys.get(key)
+        if text is None:
+            text = self._keys[key] = self.key_template % _represent_scalar(key)[0] + ':'
+        return text
 
-    for start, end in pairs:
+    def value(self, value, indent, parts):
+        """
+        Writes `value` after a "key:" or "-" marker.
+        """
+        if isinstance(value, dict) and value:
+            parts.append('\n')
+            self.mapping(value, indent, parts, ' ' * indent)
+        elif isinstance(value, list) and value:
+            parts.append('\n')
+            self.sequence(value, indent, parts, ' ' * indent)
+        else:
+            parts.append(' ')
+            parts.append(self.scalar(value))
+            parts.append('\n')
 
-        result += yaml_text[last_pos:start] + "\x1b[31m" + yaml_text[start:end] + "\x1b[39m"
-        last_pos = end
+    def item(self, value, indent, parts):
+        """
+        Writes sequence item after the "-" marker, nested collections
+        start on the same line.
+        """
+        if isinstance(value, dict) and value:
+            parts.append(' ')
+            self.mapping(value, indent, parts, '')
+        elif isinstance(value, list) and value:
+            parts.append(' ')
+            self.sequence(value, indent, parts, '')
+        else:
+            self.value(value, indent, parts)
+
+    def mapping(self, mapping, indent, parts, first_prefix):
+        prefix = first_prefix
+        for key in sorted(mapping):
+            parts.append(prefix)
+            parts.append(self.key(key))
+            value = mapping[key]
+            # sequences in mappings are not indented
+            if isinstance(value, list):
+                self.value(value, indent, parts)
+            else:
+                self.value(value, indent + 2, parts)
+            prefix = ' ' * indent
 
-    result += yaml_text[last_pos:]
+    def sequence(self, sequence, indent, parts, first_prefix):
+        prefix = first_prefix
+        for item in sequence:
+            parts.append(prefix)
+            parts.append('-')
+            self.item(item, indent + 2, parts)
+            prefix = ' ' * indent
 
-    return result
+    @staticmethod
+    def scalar(value):
+        if isinstance(value, dict):
+            return '{}'
+        if isinstance(value, list):
+            return '[]'
+        return _represent_scalar(value)[0]
+
+
+def iter_tree(data, colored=None):
+    """
+    Walks parsed JSON `data` once and yields YAML-style text,
+    one chunk per top-level item.
+    """
+    if colored is None:
+        colored = settings.colored_output
+    writer = _TreeWriter(colored)
+
+    if isinstance(data, dict) and data:
+        for key in sorted(data):
+            parts = []
+            writer.mapping({key: data[key]}, 0, parts, '')
+            yield ''.join(parts)
+    elif isinstance(data, list) and data:
+        for item in data:
+            parts = []
+            writer.sequence([item], 0, parts, '')
+            yield ''.join(parts)
+    elif isinstance(data, (dict, list)):
+        yield writer.scalar(data) + '\n'
+    else:
+        text, plain = _represent_scalar(data)
+        yield text + ('\n...\n' if plain else '\n')
+
+
+def write_tree(data, stream=None):
+    """
+    Writes `data` as a colored tree incrementally.
+    """
+    for chunk in iter_tree(data):
+        click.echo(chunk, file=stream, nl=False)
+
+
+def build_tree(data):
+    if isinstance(data, six.string_types):
+        data = json.loads(data)
+    return ''.join(iter_tree(data))
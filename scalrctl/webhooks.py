@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Webhook-driven waits for polled actions.
+
+When `WEBHOOK_LISTEN` (e.g. "0.0.0.0:8780", the host defaults to
+localhost) is set in the configuration file, the first wait starts
+a local HTTP listener and registers a temporary webhook endpoint and
+config in the current environment. `WEBHOOK_URL` is the address Scalr
+should call if it differs from the listen address (NAT, tunnels). Both
+are removed when the process exits. Only events signed with the key of
+the endpoint are accepted.
+
+Waits check the status as soon as an event mentioning the polled
+object arrives, otherwise they fall back to polling with a growing
+interval. Without a listener waits just poll.
+"""
+import atexit
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import socket
+import threading
+import time
+
+import six
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib import parse
+
+from scalrctl import request, utils
+from scalrctl.context import settings
+
+
+LIFECYCLE_EVENTS = (
+    'BeforeInstanceLaunch',
+    'HostInit',
+    'BeforeHostUp',
+    'HostUp',
+    'HostInitFailed',
+    'InstanceLaunchFailed',
+    'RebootComplete',
+    'ResumeComplete',
+    'BeforeHostTerminate',
+    'HostDown',
+)
+
+MAX_POLL_INTERVAL = 15
+
+_listener = None
+
+_lock = threading.Lock()
+
+
+def _values(obj):
+    """
+    Returns all scalar values of the decoded event as strings.
+    """
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, list):
+        values = set()
+        for item in obj:
+            values |= _values(item)
+        return values
+    return set([six.text_type(obj)]) if obj is not None else set()
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, body=b''):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # endpoint validation request
+        token = self.headers.get('X-Validation-Token') or ''
+        self._reply(200, token.encode('utf-8'))
+
+    def do_POST(self):
+        token = self.headers.get('X-Validation-Token')
+        if token:
+            return self._reply(200, token.encode('utf-8'))
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.server.listener.verify(body, self.headers.get('Date'),
+                                           self.headers.get('X-Signature')):
+            return self._reply(403)
+        self.server.listener.receive(body)
+        self._reply(200)
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class Listener(object):
+    """
+    Local HTTP server receiving Scalr webhook events.
+    """
+
+    def __init__(self, address, url=None):
+        host, _, port = address.rpartition(':')
+        self.server = _Server((host or 'localhost', int(port)), _Handler)
+        self.server.listener = self
+        self.url = url or 'http://{}:{}/'.format(
+            host or 'localhost', self.server.server_address[1])
+        self.signing_key = None
+        self._events = []
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @property
+    def position(self):
+        """
+        Number of events received so far.
+        """
+        with self._condition:
+            return len(self._events)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def verify(self, body, date, signature):
+        """
+        Checks X-Signature of the event, nothing is accepted
+        until the signing key of the endpoint is known.
+        """
+        if not (self.signing_key and date and signature):
+            return False
+        expected = binascii.hexlify(hmac.new(
+            self.signing_key.encode('utf-8'), body + date.encode('utf-8'),
+            hashlib.sha1).digest()).decode('ascii')
+        return hmac.compare_digest(expected, signature)
+
+    def receive(self, body):
+        body = body.decode('utf-8', 'replace')
+        try:
+            event = json.loads(body)
+        except ValueError:
+            event = parse.parse_qs(body)
+        with self._condition:
+            self._events.append(_values(event))
+            self._condition.notify_all()
+
+    def wait(self, ids, timeout, since=0):
+        """
+        Waits up to `timeout` seconds for an event mentioning any of
+        `ids` received after the first `since` events, returns True
+        if one arrived.
+        """
+        ids = set(six.text_type(value) for value in ids)
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                if any(ids & values for values in self._events[since:]):
+                    return True
+                since = len(self._events)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+
+
+class Registration(object):
+    """
+    Temporary webhook endpoint and config of the environment.
+    """
+
+    endpoints_route = '/{envId}/webhook-endpoints/'
+
+    configs_route = '/{envId}/webhook-configs/'
+
+    def __init__(self, env_id, url, events=LIFECYCLE_EVENTS):
+        self.env_id = env_id
+        self.url = url
+        self.events = events
+        self.endpoint = None
+        self.config = None
+
+    def _request(self, method, route, data=None):
+        uri = '{}{}'.format(utils.read_spec('user', ext='json')['basePath'], route)
+        response = request.request(method, 'user', uri, {},
+                                   json.dumps(data or {}))
+        response_json = json.loads(response) if response else {}
+        if response_json.get('errors'):
+            raise ValueError(', '.join(error.get('message', '')
+                                       for error in response_json['errors']))
+        return response_json.get('data') or {}
+
+    def create(self):
+        uri = self.endpoints_route.format(envId=self.env_id)
+        self.endpoint = self._request('post', uri, {'url': self.url})
+        uri = self.configs_route.format(envId=self.env_id)
+        self.config = self._request('post', uri, {
+            'name': 'scalr-ctl-{}'.format(os.getpid()),
+            'endpoints': [{'id': self.endpoint['id']}],
+            'events': [{'id': event} for event in self.events],
+        })
+        return self.endpoint.get('securityKey')
+
+    def delete(self):
+        if self.config:
+            uri = self.configs_route.format(envId=self.env_id)
+            self._request('delete', '{}{}/'.format(uri, self.config['id']))
+        if self.endpoint:
+            uri = self.endpoints_route.format(envId=self.env_id)
+            self._request('delete', '{}{}/'.format(uri, self.endpoint['id']))
+
+
+def get_listener():
+    """
+    Returns the process-wide listener, starts and registers it on
+    first use. Returns None if webhooks are not configured or could
+    not be registered, waits then poll the API.
+    """
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = False
+            if settings.WEBHOOK_LISTEN:
+                _listener = _start(settings.WEBHOOK_LISTEN, settings.WEBHOOK_URL)
+        return _listener or None
+
+
+def _start(address, url):
+    try:
+        listener = Listener(address, url)
+    except (ValueError, socket.error) as e:
+        utils.warning({'message': "Cannot start webhook listener on {}: {}".format(address, e)})
+        return None
+    listener.start()
+
+    registration = Registration(settings.envId, listener.url)
+    try:
+        listener.signing_key = registration.create()
+        if not listener.signing_key:
+            raise ValueError("the endpoint has no signing key")
+    except Exception as e:
+        utils.warning({'message': "Cannot register webhook, polling instead: {}".format(e)})
+        _cleanup(listener, registration)
+        return None
+    utils.debug("Webhook listener registered at {}".format(listener.url))
+    atexit.register(_cleanup, listener, registration)
+    return listener
+
+
+def _cleanup(listener, registration):
+    try:
+        registration.delete()
+    except Exception as e:
+        utils.debug("Cannot remove webhook: {}".format(e))
+    listener.stop()
+
+
+class Waiter(object):
+    """
+    Pauses between status checks of the objects `ids`: returns as
+    soon as a webhook event about them arrives, otherwise after an
+    interval growing from `interval` to `max_interval` seconds while
+    nothing changes.
+    """
+
+    def __init__(self, ids, interval=1, max_interval=MAX_POLL_INTERVAL):
+        self.ids = [value for value in ids if value is not None]
+        self.base_interval = self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.listener = get_listener()
+        self.since = self.listener.position if self.listener else 0
+
+    def reset(self):
+        """
+        Restores the initial interval, e.g. after the status has changed.
+        """
+        self.interval = self.base_interval
+
+    def wait(self):
+        """
+        Returns True if woken up by an event.
+        """
+        if self.listener:
+            arrived = self.listener.wait(self.ids, self.interval, self.since)
+            self.since = self.listener.position
+        else:
+            time.sleep(self.interval)
+            arrived = False
+
+        if arrived:
+            self.reset()
+        else:
+            self.interval = min(self.interval * 1.5, self.max_interval)
+        return arrived
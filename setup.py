@@ -61,7 +61,6 @@ if __name__ == '__main__':
             'requests>=2.10.0',
             'six>=1.10.0',
             'colorama>=0.3.7',
-            'dicttoxml>=1.7.4',
         ],
         entry_points='''
             [console_scripts]
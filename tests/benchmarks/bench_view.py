@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks for the view module.
+
+Usage: python tests/benchmarks/bench_view.py [rows]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from scalrctl import settings, view  # noqa
+
+settings.colored_output = False
+
+COLUMNS = ['id', 'hostname', 'status', 'cloudPlatform', 'farm.id',
+           'farmRole.id', 'instanceType.id', 'launched', 'index', 'missing']
+
+
+def make_response(rows):
+    return {
+        'data': [{
+            'id': 'b039d8d9-26c2-439d-9b2b-%012d' % i,
+            'hostname': 'host-%d' % i,
+            'status': 'running',
+            'cloudPlatform': 'ec2',
+            'cloudLocation': 'us-east-1',
+            'farm': {'id': i % 50},
+            'farmRole': {'id': i % 300},
+            'instanceType': {'id': 'm4.large'},
+            'launched': '2016-11-21T09:35:18Z',
+            'launchReason': 'Scaling up',
+            'index': i,
+            'operations': [],
+            'privateIp': ['10.0.0.1'],
+            'publicIp': [],
+        } for i in range(rows)],
+        'pagination': {'next': None, 'last': '/servers/?pageNum=1'},
+    }
+
+
+def bench(name, func, number=5):
+    best = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print('{:<28} {:>10.2f} ms'.format(name, best * 1000))
+
+
+def main(rows=10000):
+    response = make_response(rows)
+    print('{} rows, {} columns'.format(rows, len(COLUMNS)))
+
+    bench('calc_vertical_table', lambda: view.calc_vertical_table(response, COLUMNS))
+
+    table_rows = view.calc_vertical_table(response, COLUMNS)[0]
+    bench('build_vertical_table', lambda: view.build_vertical_table(COLUMNS, table_rows))
+
+    data = response['data']
+    bench('build_tree', lambda: view.build_tree(data), number=1)
+    settings.colored_output = True
+    bench('build_tree (colored)', lambda: view.build_tree(data), number=1)
+    settings.colored_output = False
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
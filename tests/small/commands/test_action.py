@@ -10,7 +10,7 @@ import tempfile
 
 import pytest
 
-from scalrctl import click, defaults, settings, utils
+from scalrctl import click, commands, defaults, settings, utils
 
 settings.debug_mode = True
 settings.API_KEY_ID = '1'
@@ -132,3 +132,46 @@ def test_validate(actions):
             assert not is_valid
         else:
             assert is_valid
+
+
+DIFF_SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {
+        '/{envId}/variables/{name}/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}, {'name': 'name', 'in': 'path'}],
+            'patch': {'parameters': [{'name': 'variableObject', 'in': 'body',
+                                      'schema': {'$ref': '#/definitions/Variable'}}]},
+        },
+    },
+    'definitions': {
+        'Variable': {
+            'discriminator': 'type',
+            'x-concreteTypes': [{'$ref': '#/definitions/Text'}],
+            'properties': {'type': {'type': 'string'}},
+        },
+        'Text': {
+            'properties': {'type': {'type': 'string'}, 'name': {'type': 'string'},
+                           'value': {'type': 'string'}, 'farm': {'type': 'object'}},
+        },
+    },
+}
+
+
+def test_diff_object(monkeypatch):
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': DIFF_SPEC)
+    action = commands.Action(name='update', route='/{envId}/variables/{name}/',
+                             http_method='patch', api_level='user')
+    current = {'type': 'Text', 'name': 'a', 'value': '1', 'farm': {'id': 1}}
+
+    patch = action._diff_object(current, dict(current, value='2', farm={'id': 2}))
+    assert patch == {'type': 'Text', 'value': '2', 'farm': {'id': 2}}
+    assert action.unchanged_object is None
+
+    assert action._diff_object(current, dict(current)) == {}
+    assert action.unchanged_object == current
+
+    # the next invocation of the same action starts over
+    action.pre(envId='1', name='a', stdin=True, dryrun=True, **{'import-data': {
+        'variableObject': dict(current, value='3')}})
+    assert action.unchanged_object is None
+    assert action.dry_run
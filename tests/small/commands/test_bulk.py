@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from scalrctl import click, commands, context, request, utils
+from scalrctl.commands import roleimage, server
+
+
+LIST = {'responses': {'200': {'schema': {'$ref': '#/definitions/ListResponse'}}}}
+
+SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {
+        '/{envId}/roles/{roleId}/images/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}, {'name': 'roleId', 'in': 'path'}],
+            'get': LIST,
+        },
+        '/{envId}/roles/{roleId}/images/{imageId}/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}, {'name': 'roleId', 'in': 'path'},
+                           {'name': 'imageId', 'in': 'path'}],
+            'delete': {},
+        },
+        '/{envId}/servers/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}],
+            'get': LIST,
+        },
+        '/{envId}/servers/{serverId}/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}, {'name': 'serverId', 'in': 'path'}],
+            'patch': {'parameters': [{'name': 'serverObject', 'in': 'body'}]},
+        },
+    },
+    'definitions': {
+        'ListResponse': {'properties': {'data': {'type': 'array',
+                                                 'items': {'$ref': '#/definitions/Item'}}}},
+        'Item': {'properties': {}},
+    },
+}
+
+
+def _delete_images(monkeypatch, rows):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append((method, uri))
+        if method == 'get':
+            return json.dumps({'data': rows, 'pagination': {}})
+        return ''
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(request, 'request', fake_request)
+    # the actions fixture of test_action.py switches scheme classes to dry run
+    monkeypatch.setattr(roleimage.DeleteRoleImage, 'dry_run', False)
+    action = roleimage.DeleteRoleImage(name='delete',
+                                       route='/{envId}/roles/{roleId}/images/{imageId}/',
+                                       http_method='delete', api_level='user')
+    with context.Context(envId='1', debug_mode=False):
+        action.run(roleId='10', where="image.id != 'keep'", parallel=1)
+    return calls
+
+
+def test_bulk_nested_ids(monkeypatch):
+    rows = [{'role': {'id': 10}, 'image': {'id': 'a'}},
+            {'role': {'id': 10}, 'image': {'id': 'keep'}},
+            {'role': {'id': 10}, 'image': {'id': 'b'}}]
+    calls = _delete_images(monkeypatch, rows)
+    assert sorted(calls[1:]) == [('delete', '/api/v1beta0/user/1/roles/10/images/a/'),
+                                 ('delete', '/api/v1beta0/user/1/roles/10/images/b/')]
+
+
+def test_bulk_missing_id(monkeypatch):
+    with pytest.raises(click.UsageError):
+        _delete_images(monkeypatch, [{'role': {'id': 10}}])
+
+
+def test_bulk_custom_pre(monkeypatch):
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    kwargs = dict(name='update', route='/{envId}/servers/{serverId}/', http_method='patch',
+                  api_level='user')
+    assert commands.Action(**kwargs)._get_bulk_target() == ('serverId', '/{envId}/servers/')
+    assert server.ServerChangeInstanceType(**kwargs)._get_bulk_target() is None
+
+
+def test_bulk_target_prompt(monkeypatch):
+    class PromptedDelete(roleimage.DeleteRoleImage):
+        dry_run = False
+        prompt_for = ['imageId']
+
+    calls = []
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(request, 'request', lambda method, api_level, uri, *args: calls.append(uri))
+    monkeypatch.setattr(click, 'prompt', lambda text: 'i-1')
+    kwargs = dict(name='delete', route='/{envId}/roles/{roleId}/images/{imageId}/',
+                  http_method='delete', api_level='user')
+    with context.Context(envId='1', debug_mode=False):
+        PromptedDelete(**kwargs).run(roleId='10')
+        assert calls == ['/api/v1beta0/user/1/roles/10/images/i-1/']
+        with pytest.raises(click.UsageError):
+            roleimage.DeleteRoleImage(**kwargs).run(roleId='10')
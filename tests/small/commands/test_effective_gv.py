@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+
+from scalrctl import context, request, utils
+from scalrctl.commands import effective_gv
+
+
+def _spec(level, routes):
+    paths = {}
+    for route in routes:
+        params = [{'name': name, 'in': 'path'}
+                  for name in ('envId', 'accountId', 'roleId', 'farmId', 'farmRoleId', 'serverId')
+                  if '{%s}' % name in route]
+        paths[route] = {'parameters': params, 'get': {}}
+    return {'basePath': '/api/v1beta0/' + level, 'paths': paths, 'definitions': {}}
+
+
+SPECS = {
+    'user': _spec('user', [route for _, level, route, _ in effective_gv.LAYERS if level == 'user'] +
+                  ['/{envId}/farm-roles/{farmRoleId}/', '/{envId}/servers/{serverId}/',
+                   '/{envId}/servers/']),
+    'account': _spec('account', ['/{accountId}/global-variables/']),
+    'global': _spec('global', ['/global-variables/']),
+}
+
+LAYERS = {
+    '/api/v1beta0/account/2/global-variables/': [
+        {'name': 'A', 'value': 'account'}, {'name': 'B', 'value': 'account', 'category': 'app'}],
+    '/api/v1beta0/user/1/global-variables/': [{'name': 'A', 'value': 'env'}, {'name': 'B'}],
+    '/api/v1beta0/user/1/roles/5/global-variables/': [{'name': 'C', 'value': ''}],
+    '/api/v1beta0/user/1/farms/3/global-variables/': [{'name': 'C', 'value': 'farm'}],
+    '/api/v1beta0/user/1/farm-roles/4/global-variables/': [{'name': 'A', 'value': 'farm-role'}],
+    '/api/v1beta0/user/1/servers/s-1/global-variables/': [{'name': 'C', 'value': 's-1'}],
+    '/api/v1beta0/user/1/servers/s-2/global-variables/': [],
+}
+
+
+def test_resolve():
+    variables = effective_gv.resolve([
+        ('environment', [{'name': 'A', 'value': 'env', 'category': 'app'}]),
+        ('farm', [{'name': 'A', 'value': ''}, {'name': 'B', 'hidden': True},
+                  {'name': 'C', 'value': 'farm', 'locked': True}]),
+        ('server', [{'name': 'C', 'value': 'server'}]),
+    ])
+    assert [(var['name'], var['value'], var['origin'], var['category'], var['hidden'])
+            for var in variables] == [('A', 'env', 'environment', 'app', False),
+                                      ('B', None, None, None, True),
+                                      ('C', 'farm', 'farm', None, False)]
+    assert variables[2]['locked']
+
+
+def _run(monkeypatch, account_id='2', failing=()):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append(uri)
+        if uri in failing:
+            return json.dumps({'errors': [{'code': 'Forbidden', 'message': 'No access'}]})
+        if uri == '/api/v1beta0/user/1/servers/':
+            data = [{'id': 's-1', 'farmRole': {'id': 4}, 'status': 'running'},
+                    {'id': 's-2', 'farmRole': {'id': 4}, 'status': 'running'},
+                    {'id': 's-3', 'farmRole': {'id': 4}, 'status': 'terminated'}]
+        elif uri == '/api/v1beta0/user/1/farm-roles/4/':
+            data = {'id': 4, 'farm': {'id': 3}, 'role': {'id': 5}}
+        else:
+            data = LAYERS[uri]
+        return json.dumps({'data': data, 'pagination': {}})
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPECS[api_level])
+    monkeypatch.setattr(request, 'request', fake_request)
+
+    action = effective_gv.EffectiveGlobalVariables()
+    with context.Context(envId='1', accountId=account_id, GLOBAL_SCOPE_API_KEY_ID=None,
+                         view='json', debug_mode=False, colored_output=False):
+        action.run(farmRoleId='4', serverIds=(), all_servers=True)
+    return calls
+
+
+def test_effective_for_servers(monkeypatch, capsys):
+    calls = _run(monkeypatch)
+
+    # shared layers are fetched once for both servers
+    assert sorted(uri for uri in calls if uri in LAYERS) == sorted(LAYERS)
+    assert len(calls) == len(LAYERS) + 2
+
+    rows = json.loads(capsys.readouterr().out)['data']
+    assert [(row['server'], row['name'], row['value'], row['origin']) for row in rows] == [
+        ('s-1', 'A', 'farm-role', 'farm-role'),
+        ('s-1', 'B', 'account', 'account'),
+        ('s-1', 'C', 's-1', 'server'),
+        ('s-2', 'A', 'farm-role', 'farm-role'),
+        ('s-2', 'B', 'account', 'account'),
+        ('s-2', 'C', 'farm', 'farm'),
+    ]
+    assert rows[1]['category'] == 'app'
+
+
+def test_account_layer_optional(monkeypatch, capsys):
+    account_uri = '/api/v1beta0/account/2/global-variables/'
+    calls = _run(monkeypatch, account_id=None)
+    assert account_uri not in calls
+    rows = json.loads(capsys.readouterr().out)['data']
+    assert rows[1]['name'] == 'B' and rows[1]['origin'] is None
+
+    _run(monkeypatch, failing=[account_uri])
+    out, err = capsys.readouterr()
+    assert 'No access' in err
+    assert json.loads(out)['data'][1]['origin'] is None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from scalrctl import click, context, utils, webhooks
+from scalrctl.commands import farm
+
+
+SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {
+        '/{envId}/farms/{farmId}/actions/launch/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}, {'name': 'farmId', 'in': 'path'}],
+            'post': {},
+        },
+    },
+    'definitions': {},
+}
+
+def _wait(monkeypatch, polls):
+    """
+    Waits for servers of a launched farm, `polls` are server lists of the ticks.
+    """
+    polls = iter(polls)
+
+    def list_objects(route, **kwargs):
+        if route == farm.FarmLaunch.farm_roles_route:
+            return [{'id': 7, 'alias': 'web', 'scaling': {'minInstances': 2}}]
+        return [{'id': server_id, 'status': status, 'farmRole': {'id': 7}}
+                for server_id, status in next(polls)]
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(webhooks.Waiter, 'wait', lambda self: False)
+    action = farm.FarmLaunch(name='launch', route='/{envId}/farms/{farmId}/actions/launch/',
+                             http_method='post', api_level='user')
+    monkeypatch.setattr(action, '_list_objects', list_objects)
+    with context.Context(envId='1', debug_mode=False, colored_output=False):
+        action._wait_for_farm('1', 3)
+
+
+def test_wait_running(monkeypatch, capsys):
+    _wait(monkeypatch, [
+        [('old', 'terminated'), ('a', 'pending')],
+        [('old', 'terminated'), ('a', 'running'), ('b', 'running')],
+    ])
+    out = capsys.readouterr().out
+    assert 'Farm role web [7]: 0/2 running (1 pending)' in out
+    assert 'All servers of farm 3 are running' in out
+
+
+def test_wait_failed(monkeypatch, capsys):
+    with pytest.raises(click.ClickException) as error:
+        _wait(monkeypatch, [
+            [('a', 'pending'), ('b', 'pending')],
+            [('a', 'running'), ('b', 'failed')],
+        ])
+    assert '1 servers of farm 3 failed to be running' in error.value.message
+    assert 'Farm role web [7]: 1/2 running (1 failed)' in capsys.readouterr().out
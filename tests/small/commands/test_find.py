@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import json
+
+from scalrctl import context, request, utils
+from scalrctl.commands import find
+
+
+def _spec(prefix, level):
+    params = [{'name': name, 'in': 'path'} for name in ('envId', 'accountId')
+              if '{%s}' % name in prefix]
+    return {
+        'basePath': '/api/v1beta0/' + level,
+        'paths': {
+            prefix + '/images/': {'parameters': params, 'get': {}},
+            prefix + '/images/{imageId}/': {
+                'parameters': params + [{'name': 'imageId', 'in': 'path'}], 'get': {}},
+        },
+        'definitions': {},
+    }
+
+
+SPECS = {
+    'user': _spec('/{envId}', 'user'),
+    'account': _spec('/{accountId}', 'account'),
+    'global': _spec('', 'global'),
+}
+
+
+def test_find_by_id(monkeypatch, capsys):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append(uri)
+        if api_level == 'global':
+            return json.dumps({'errors': [{'code': 'ObjectNotFound'}]})
+        return json.dumps({'data': {'id': 'i-1', 'name': 'ubuntu', 'scope': 'account'}})
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPECS[api_level])
+    monkeypatch.setattr(request, 'request', fake_request)
+
+    action = find.FindObject()
+    with context.Context(envId='1', accountId='2', GLOBAL_SCOPE_API_KEY_ID='g', view='json'):
+        action.run(object_id='i-1', types=(), scopes=())
+
+    assert sorted(calls) == ['/api/v1beta0/account/2/images/i-1/',
+                             '/api/v1beta0/global/images/i-1/',
+                             '/api/v1beta0/user/1/images/i-1/']
+    # found from user and account scopes, reported once
+    assert json.loads(capsys.readouterr().out) == {'data': [{
+        'type': 'image', 'id': 'i-1', 'name': 'ubuntu', 'scope': 'account', 'api_level': 'user'}]}
+
+
+def test_targets_skip_global_without_key(monkeypatch):
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPECS[api_level])
+    with context.Context(GLOBAL_SCOPE_API_KEY_ID=None):
+        targets = find.FindObject()._get_targets((), ())
+    assert [target[:2] for target in targets] == [('user', 'image'), ('account', 'image')]
+    assert targets[0][3:] == ('/{envId}/images/{imageId}/', 'imageId')
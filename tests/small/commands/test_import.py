@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+
+import yaml
+
+from scalrctl import commands, context, request, utils
+
+import_ = importlib.import_module('scalrctl.commands.import')
+
+
+ROUTE = '/{envId}/roles/{roleId}/'
+
+SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {
+        ROUTE: {
+            'parameters': [{'name': 'envId', 'in': 'path'}, {'name': 'roleId', 'in': 'path'}],
+            'get': {'responses': {'200': {'schema': {'$ref': '#/definitions/RoleResponse'}}}},
+            'patch': {'parameters': [{'name': 'roleObject', 'in': 'body',
+                                      'schema': {'$ref': '#/definitions/Role'}}]},
+        },
+    },
+    'definitions': {
+        'RoleResponse': {'properties': {'data': {'$ref': '#/definitions/Role'}}},
+        'Role': {'properties': {'id': {'type': 'integer', 'readOnly': True},
+                                'name': {'type': 'string'},
+                                'description': {'type': 'string'},
+                                'priority': {'type': 'integer'}}},
+    },
+}
+
+SCHEME = {
+    'export': {
+        'role': {
+            'route': ROUTE, 'http-method': 'get', 'api_level': 'user',
+            'patch-params': {'route': ROUTE, 'http-method': 'patch', 'api_level': 'user'},
+        },
+    },
+}
+
+ROLE = {'id': 5, 'name': 'base', 'description': 'Base role'}
+
+
+def _import(monkeypatch, data, **options):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append(method)
+        return json.dumps({'data': ROLE if method == 'get' else dict(ROLE, **json.loads(data))})
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(utils, 'read_scheme', lambda: SCHEME)
+    # the actions fixture of test_action.py switches scheme classes to dry run
+    monkeypatch.setattr(commands.Action, 'dry_run', False)
+    monkeypatch.setattr(request, 'request', fake_request)
+    exported = [{'data': data, 'meta': {'scalrctl': {
+        'ACTION': 'role', 'ROUTE': ROUTE, 'METHOD': 'get', 'envId': '1', 'API_LEVEL': 'user',
+        'ARGUMENTS': [[], {'roleId': '5'}]}}}]
+    action = import_.Import(name='import', route='', http_method='', api_level='user')
+    with context.Context(envId='1', debug_mode=False, colored_output=False):
+        action.run(raw=yaml.safe_dump(exported), update=True, **options)
+    return calls, action
+
+
+def test_update_unchanged(monkeypatch, capsys):
+    calls, action = _import(monkeypatch, dict(ROLE))
+    assert calls == ['get']
+    out = capsys.readouterr().out
+    assert 'No changes, update skipped.' in out
+    assert 'role unchanged.' in out
+    # IDs of re-applied objects are saved for related objects
+    assert action.relations['role']['role-images.roleId'] == 5
+
+
+def test_update_changed(monkeypatch, capsys):
+    calls, _ = _import(monkeypatch, dict(ROLE, description='New'))
+    assert calls == ['get', 'patch']
+    assert 'role updated.' in capsys.readouterr().out
+
+
+def test_validate_only_coerces(monkeypatch, capsys):
+    calls, _ = _import(monkeypatch, dict(ROLE, priority='10'), validate_only=True)
+    assert calls == []
+    assert 'role "base": valid' in capsys.readouterr().out
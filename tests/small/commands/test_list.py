@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from scalrctl import click, commands, context, request, utils
+
+
+SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {'/{envId}/farms/': {'parameters': [{'name': 'envId', 'in': 'path'}],
+                                  'get': {}}},
+    'definitions': {},
+}
+
+PAGES = [
+    [{'id': 1}, {'id': 2}],
+    [{'id': 3}],
+    [{'id': 4}, {'id': 5}],
+]
+
+
+def _paginate(monkeypatch, strip_metadata=False, hidden=False):
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        page = payload['pageNum']
+        return json.dumps({
+            'data': PAGES[page - 1],
+            'meta': {'page': page},
+            'pagination': {'next': 'next' if page < len(PAGES) else None},
+        })
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(request, 'request', fake_request)
+    action = commands.Action(name='list', route='/{envId}/farms/', http_method='get',
+                             api_level='user')
+    action.strip_metadata = strip_metadata
+    with context.Context(view='json', debug_mode=False):
+        return action._run_paginated('/api/v1beta0/user/1/farms/', {}, '{}', hidden=hidden)
+
+
+def test_all_json(monkeypatch, capsys):
+    _paginate(monkeypatch)
+    document = json.loads(capsys.readouterr().out)
+    assert document['data'] == [{'id': i} for i in range(1, 6)]
+    assert document['meta'] == {'page': 3}
+
+
+def test_all_json_strip_metadata(monkeypatch, capsys):
+    _paginate(monkeypatch, strip_metadata=True)
+    assert json.loads(capsys.readouterr().out) == [{'id': i} for i in range(1, 6)]
+
+
+def test_all_hidden(monkeypatch, capsys):
+    result = _paginate(monkeypatch, hidden=True)
+    assert capsys.readouterr().out == ''
+    assert json.loads(result)['data'] == [{'id': i} for i in range(1, 6)]
+
+
+PROFILES = {
+    'a': {'envId': '1', 'view': 'tree', 'debug_mode': False},
+    'b': {'envId': '2', 'view': 'tree', 'debug_mode': False},
+    'noenv': {'envId': None},
+}
+
+
+def _run_profiles(monkeypatch, profiles):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append((uri, context.settings.debug_mode, context.settings.view))
+        return json.dumps({'data': [{'id': uri.split('/')[4]}], 'pagination': {}})
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(utils, 'read_config', lambda profile=None: PROFILES.get(profile))
+    monkeypatch.setattr(request, 'request', fake_request)
+    action = commands.Action(name='list', route='/{envId}/farms/', http_method='get',
+                             api_level='user')
+    with context.Context(view='tree', debug_mode=False):
+        action.run(profiles=profiles, transformation='json', debug=True, parallel=1)
+    return calls
+
+
+def test_profiles(monkeypatch, capsys):
+    calls = _run_profiles(monkeypatch, 'a,b')
+    assert sorted(calls) == [('/api/v1beta0/user/1/farms/', True, 'json'),
+                             ('/api/v1beta0/user/2/farms/', True, 'json')]
+    assert json.loads(capsys.readouterr().out)['data'] == [
+        {'source': 'a', 'id': '1'}, {'source': 'b', 'id': '2'}]
+
+
+def test_profiles_without_env(monkeypatch):
+    with pytest.raises(click.UsageError):
+        _run_profiles(monkeypatch, 'a,noenv')
+
+
+def test_options_reset(monkeypatch):
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    # the actions fixture of test_action.py switches scheme classes to dry run
+    monkeypatch.setattr(commands.Action, 'dry_run', False)
+    action = commands.Action(name='list', route='/{envId}/farms/', http_method='get',
+                             api_level='user')
+    with context.Context(debug_mode=False):
+        action.pre(envId='1', query="name == 'a'", select='id,name', columns='id',
+                   fetch_all=True, dryrun=True, strip_metadata=True)
+        assert action.query and action.projection and action.fetch_all and action.dry_run
+        assert action._table_columns == ['id']
+
+        # the next invocation of the same action starts from defaults
+        action.pre(envId='1')
+    assert (action.query, action.projection, action.fetch_all, action.dry_run,
+            action.strip_metadata, action._table_columns) == (None, None, False, False, False, [])
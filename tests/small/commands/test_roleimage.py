@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+
+from scalrctl import context, request, utils
+from scalrctl.commands import roleimage
+
+
+def _spec(routes):
+    paths = {}
+    for route, method in routes:
+        params = [{'name': name, 'in': 'path'} for name in ('envId', 'roleId', 'farmId', 'imageId')
+                  if '{%s}' % name in route]
+        if method == 'post':
+            params.append({'name': 'roleImageObject', 'in': 'body'})
+        paths[route] = {'parameters': params, method: {}}
+    return {'basePath': '/api/v1beta0/user', 'paths': paths, 'definitions': {}}
+
+
+SPEC = _spec([
+    ('/{envId}/roles/', 'get'),
+    ('/{envId}/roles/{roleId}/images/', 'get'),
+    ('/{envId}/farms/', 'get'),
+    ('/{envId}/farms/{farmId}/farm-roles/', 'get'),
+    ('/{envId}/roles/{roleId}/images/{imageId}/actions/replace/', 'post'),
+])
+
+RESPONSES = {
+    '/api/v1beta0/user/1/roles/': [{'id': 10, 'name': 'base'}, {'id': 11, 'name': 'app'},
+                                   {'id': 12, 'name': 'db'}],
+    '/api/v1beta0/user/1/roles/10/images/': [{'role': {'id': 10}, 'image': {'id': 'old-1'}}],
+    '/api/v1beta0/user/1/roles/11/images/': [{'role': {'id': 11}, 'image': {'id': 'old-1'}},
+                                             {'role': {'id': 11}, 'image': {'id': 'other'}}],
+    '/api/v1beta0/user/1/roles/12/images/': [{'role': {'id': 12}, 'image': {'id': 'other'}}],
+    '/api/v1beta0/user/1/farms/': [{'id': 3}],
+    '/api/v1beta0/user/1/farms/3/farm-roles/': [{'id': 7, 'alias': 'web', 'role': {'id': 11}}],
+}
+
+
+def _run(monkeypatch, **kwargs):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append((method, uri, json.loads(data)))
+        if method == 'post':
+            return json.dumps({'data': {}})
+        return json.dumps({'data': RESPONSES[uri], 'pagination': {}})
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(request, 'request', fake_request)
+    with context.Context(envId='1', debug_mode=False):
+        roleimage.BulkReplaceRoleImage().run(imageId='old-1', newimageid='new-1', **kwargs)
+    return calls
+
+
+def test_replace_all_dryrun(monkeypatch, capsys):
+    calls = _run(monkeypatch, dryrun=True)
+    assert all(method == 'get' for method, _, _ in calls)
+
+    out = capsys.readouterr().out
+    assert 'base (10)' in out and 'app (11)' in out and 'db (12)' not in out
+    assert 'web (farm 3)' in out
+    assert '2 Roles and 1 Farm Roles use 1 of 1 Images.' in out
+
+
+def test_replace_all(monkeypatch, capsys):
+    calls = _run(monkeypatch)
+    replaced = sorted((uri, data['image']['id'])
+                      for method, uri, data in calls if method == 'post')
+    assert replaced == [
+        ('/api/v1beta0/user/1/roles/10/images/old-1/actions/replace/', 'new-1'),
+        ('/api/v1beta0/user/1/roles/11/images/old-1/actions/replace/', 'new-1'),
+    ]
+    assert 'Replaced Images in 2 of 2 Roles' in capsys.readouterr().out
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from scalrctl import client, request, utils
+
+SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {
+        '/{envId}/servers/': {
+            'parameters': [{'name': 'envId', 'in': 'path'}],
+            'get': {'responses': {'200': {'schema': {'$ref': '#/definitions/ServerListResponse'}}}},
+        },
+        '/{envId}/servers/{serverId}/': {
+            'parameters': [{'name': 'envId', 'in': 'path'},
+                           {'name': 'serverId', 'in': 'path'}],
+            'patch': {'parameters': [{'name': 'serverObject', 'in': 'body'}],
+                      'responses': {'200': {'schema': {'$ref': '#/definitions/ServerResponse'}}}},
+        },
+    },
+    'definitions': {
+        'ServerListResponse': {'properties': {'data': {'type': 'array'}}},
+        'ServerResponse': {'properties': {'data': {'$ref': '#/definitions/Server'}}},
+    },
+}
+
+SCHEME = {
+    'servers': {
+        'list': {'route': '/{envId}/servers/', 'http-method': 'get', 'api_level': 'user'},
+        'update': {'route': '/{envId}/servers/{serverId}/', 'http-method': 'patch',
+                   'api_level': 'user'},
+    },
+    'configure': {'route': '', 'http-method': '', 'api_level': ''},
+}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append((method, uri, dict(payload or {}), json.loads(data)))
+        if method == 'patch':
+            return json.dumps({'data': dict(json.loads(data), id='s-1')})
+        page = int((payload or {}).get('pageNum', 1))
+        return json.dumps({
+            'data': [{'id': 's-%d' % page}],
+            'pagination': {'next': '/servers/?pageNum=2' if page < 3 else None},
+        })
+
+    monkeypatch.setattr(utils, 'read_spec', lambda api_level, ext='json': SPEC)
+    monkeypatch.setattr(utils, 'read_scheme', lambda: SCHEME)
+    monkeypatch.setattr(request, 'request', fake_request)
+    return calls
+
+
+def test_client(calls):
+    api = client.Client(key_id='k', secret_key='s', env_id='5')
+    assert dir(api) == ['servers']
+    with pytest.raises(AttributeError):
+        api.configure
+
+    servers = api.servers.list(all=True, status='running')
+    assert calls == []
+    assert [s['id'] for s in servers] == ['s-1', 's-2', 's-3']
+    assert calls[0] == ('get', '/api/v1beta0/user/5/servers/',
+                        {'status': 'running', 'pageNum': 1}, {})
+    assert len(calls) == 3
+
+    assert len(list(api.servers.list(envId='6'))) == 1
+    assert calls[-1][1] == '/api/v1beta0/user/6/servers/'
+
+    result = api.servers.update(serverId='s-1', body={'name': 'a'})
+    assert result == {'name': 'a', 'id': 's-1'}
+    assert calls[-1] == ('patch', '/api/v1beta0/user/5/servers/s-1/', {}, {'name': 'a'})
+
+    with pytest.raises(TypeError):
+        api.servers.update(body={})
+
+
+def test_api_error(monkeypatch, calls):
+    monkeypatch.setattr(request, 'request', lambda *args: json.dumps(
+        {'errors': [{'code': 'NotFound', 'message': 'No server'}]}))
+    api = client.Client(env_id='5')
+    with pytest.raises(client.APIError) as info:
+        list(api.servers.list())
+    assert info.value.errors[0]['code'] == 'NotFound'
+    assert info.value.message == 'NotFound: No server'
+
+
+def test_from_config(monkeypatch, calls):
+    monkeypatch.setattr(utils, 'read_config', lambda profile=None: {
+        'API_KEY_ID': 'file-key', 'API_SECRET_KEY': 'file-secret', 'envId': '5',
+        'debug_mode': True, 'colored_output': True})
+    api = client.Client.from_config(key_id='k', env_id='6')
+    assert api.context.API_KEY_ID == 'k'
+    assert api.context.API_SECRET_KEY == 'file-secret'
+    assert api.context.envId == '6'
+    assert api.context.debug_mode is False
+    assert api.context.colored_output is False
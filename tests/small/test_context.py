@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from scalrctl import context, settings
+
+
+def test_context():
+    proxy = context.settings
+    assert context.current() is None
+    assert proxy.view == settings.view
+
+    old_env_id = settings.envId
+    with context.Context(envId='2', view='json') as ctx:
+        assert context.current() is ctx
+        assert (proxy.envId, proxy.view) == ('2', 'json')
+        assert proxy.API_HOST == settings.API_HOST
+
+        proxy.debug_mode = 'ctx'
+        assert ctx.debug_mode == 'ctx'
+        assert settings.debug_mode != 'ctx'
+
+        # nested contexts start from the active one
+        with context.Context(view='csv'):
+            assert (proxy.envId, proxy.view) == ('2', 'csv')
+        assert proxy.view == 'json'
+
+    assert context.current() is None
+    assert settings.envId == old_env_id
+
+
+def test_bind():
+    results = {}
+
+    def worker(name):
+        context.settings.envId = name
+        results[name] = context.settings.envId
+
+    with context.Context(envId='main'):
+        func = context.bind(worker)
+        threads = [threading.Thread(target=func, args=(str(i),)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert context.settings.envId == 'main'
+
+    assert results == dict((str(i), str(i)) for i in range(5))
+
+
+def test_scoped():
+    def run(**kwargs):
+        context.settings.view = 'json'
+        context.settings.debug_mode = True
+        return context.settings.envId
+
+    old = (settings.view, settings.debug_mode)
+    func = context.scoped(run)
+    with context.Context(envId='3'):
+        # settings are taken at the call, not when wrapped
+        assert func() == '3'
+        assert context.settings.view == old[0]
+    assert (settings.view, settings.debug_mode) == old
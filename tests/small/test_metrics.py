@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from scalrctl import metrics
+
+
+def test_registry():
+    registry = metrics.Registry(buckets=(0.1, 1))
+    registry.observe('get', '/{envId}/farms/', 200, 0.05, response_bytes=100)
+    registry.observe('get', '/{envId}/farms/', 200, 0.5, response_bytes=50, retries=1)
+    registry.observe('get', '/{envId}/farms/', 429, 0.01)
+    registry.observe('post', '/{envId}/farms/', None, 2)
+
+    series = dict(((item['method'], item['status']), item) for item in registry.snapshot())
+    assert series[('GET', '200')]['requests'] == 2
+    assert series[('GET', '200')]['response_bytes'] == 150
+    assert series[('GET', '200')]['retries'] == 1
+    assert series[('GET', '200')]['buckets'] == [1, 1, 0]
+    assert series[('GET', '429')]['throttled'] == 1
+    assert series[('POST', 'error')]['errors'] == 1
+    assert series[('POST', 'error')]['buckets'] == [0, 0, 1]
+
+    text = registry.render()
+    labels = 'method="GET",route="/{envId}/farms/",status="200"'
+    assert 'scalr_ctl_api_requests_total{%s} 2' % labels in text
+    assert 'scalr_ctl_api_request_duration_seconds_bucket{%s,le="0.1"} 1' % labels in text
+    assert 'scalr_ctl_api_request_duration_seconds_bucket{%s,le="+Inf"} 2' % labels in text
+    assert 'scalr_ctl_api_request_duration_seconds_count{%s} 2' % labels in text
+    assert '# TYPE scalr_ctl_api_throttled_total counter' in text
+
+
+def test_write(tmpdir):
+    registry = metrics.Registry()
+    registry.observe('get', '/{envId}/farms/', 200, 0.05)
+    path = str(tmpdir.join('scalr.prom'))
+    registry.write(path)
+    with open(path) as fp:
+        assert fp.read() == registry.render()
+    assert tmpdir.listdir() == [tmpdir.join('scalr.prom')]
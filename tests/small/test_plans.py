@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from scalrctl import click, plans
+
+SPEC = {
+    'basePath': '/api/v1beta0/user',
+    'paths': {
+        '/{envId}/servers/{serverId}/': {
+            'parameters': [
+                {'name': 'envId', 'in': 'path', 'pattern': '[0-9]+'},
+                {'name': 'serverId', 'in': 'path', 'pattern': '[a-z0-9-]+'},
+            ],
+            'get': {
+                'parameters': [{'name': 'verbose', 'in': 'query'}],
+                'responses': {'200': {'schema': {'$ref': '#/definitions/ServerResponse'}}},
+            },
+            'patch': {
+                'parameters': [{'name': 'serverObject', 'in': 'body'}],
+                'responses': {},
+            },
+        },
+    },
+    'definitions': {
+        'ServerResponse': {'properties': {'data': {'$ref': '#/definitions/Server'}}},
+    },
+}
+
+ROUTE = '/{envId}/servers/{serverId}/'
+
+
+def test_build():
+    plan = plans.get_plan(SPEC, ROUTE, 'get')
+    assert plans.get_plan(SPEC, ROUTE, 'get') is plan
+    assert plan.path_params == frozenset(['envId', 'serverId'])
+    assert (plan.target_param, plan.list_route) == ('serverId', '/{envId}/servers/')
+    assert not plan.returns_iterable
+    assert [p['name'] for p in plan.raw_params] == ['envId', 'serverId', 'verbose']
+
+    uri, payload, data = plan.build({'envId': 1, 'serverId': 's-1', 'verbose': 1, 'empty': None})
+    assert uri == '/api/v1beta0/user/1/servers/s-1/'
+    assert payload == {'verbose': 1}
+    assert data == {}
+
+    plan = plans.get_plan(SPEC, ROUTE, 'patch')
+    assert plan.body_param_name == 'serverObject'
+    uri, payload, data = plan.build({'envId': 1, 'serverId': 's-1',
+                                     'serverObject': {'name': 'a'}, 'other': 1})
+    assert payload == {}
+    assert data == {'name': 'a'}
+
+
+def test_check_arguments():
+    plan = plans.get_plan(SPEC, ROUTE, 'get')
+    plan.check_arguments({'envId': ' 12 ', 'serverId': 's-0001'})
+    for kwargs in ({'envId': '12a'}, {'serverId': 'S_1'}):
+        with pytest.raises(click.ClickException):
+            plan.check_arguments(kwargs)
+
+
+DEFINITIONS = {
+    'Rule': {'properties': {
+        'id': {'type': 'integer', 'readOnly': True},
+        'name': {'type': 'string'},
+        'action': {'$ref': '#/definitions/Action'},
+        'tags': {'type': 'array', 'items': {'$ref': '#/definitions/Tag'}},
+    }, 'x-createOnly': ['name']},
+    'Action': {'properties': {'actionType': {'type': 'string'}},
+               'discriminator': 'actionType',
+               'x-concreteTypes': [{'$ref': '#/definitions/ScriptAction'},
+                                   {'$ref': '#/definitions/ChefActions'}]},
+    'ChefActions': {'x-concreteTypes': [{'$ref': '#/definitions/ChefAction'}]},
+    'ScriptAction': {'properties': {'actionType': {'type': 'string'},
+                                    'script': {'type': 'string'}}},
+    'ChefAction': {'properties': {'actionType': {'type': 'string'}}},
+    'Tag': {'properties': {'name': {'type': 'string'}}},
+}
+
+
+def test_schema_plan():
+    spec = {'definitions': DEFINITIONS}
+    plan = plans.get_schema_plan(spec, '#/definitions/Rule')
+    assert plans.get_schema_plan(spec, '#/definitions/Rule') is plan
+    assert plans.get_schema_plan(spec, '#/definitions/Action').concrete_types == [
+        'ScriptAction', 'ChefAction']
+
+    data = {'id': 1, 'name': 'a', 'unknown': 1,
+            'action': {'actionType': 'ScriptAction', 'script': 's', 'x': 1},
+            'tags': [{'name': 't', 'x': 1}]}
+    discriminators = {}
+    assert plan.filter(data, discriminators=discriminators) == {
+        'name': 'a', 'action': {'actionType': 'ScriptAction', 'script': 's'},
+        'tags': [{'name': 't'}]}
+    assert discriminators == {'#/definitions/Action/actionType': 'ScriptAction'}
+
+    # discriminator value is taken from the map when the body has none
+    assert plan.filter({'name': 'a', 'action': {'script': 's'}}, filter_createonly=True,
+                       discriminators=discriminators) == {'action': {'script': 's'}}
+
+    for action in ({}, {'actionType': 'Bad'}):
+        with pytest.raises(click.ClickException):
+            plan.filter({'action': action})
+
+
+def test_collect_discriminators():
+    spec = {'definitions': DEFINITIONS}
+    plan = plans.get_schema_plan(spec, '#/definitions/Rule')
+    path = '#/definitions/Action/actionType'
+
+    discriminators = {}
+    assert plan.collect_discriminators({'name': 'a'}, discriminators)
+    assert discriminators == {}
+
+    assert plan.collect_discriminators({'action': {'script': 's'}}, discriminators)
+    assert discriminators == {path: 'ScriptAction'}
+
+    # both concrete types are possible, current object is required
+    assert not plan.collect_discriminators({'action': {}}, {})
+    assert plan.collect_discriminators({'action': {'actionType': 'ChefAction'}}, discriminators)
+    assert discriminators == {path: 'ChefAction'}
+
+
+def test_match_route():
+    spec = {
+        'basePath': '/api/v1beta0/user',
+        'paths': {
+            '/{envId}/farms/': {},
+            '/{envId}/farms/{farmId}/': {},
+            '/{envId}/farms/{farmId}/actions/launch/': {},
+            '/{envId}/farm-roles/{farmRoleId}/': {},
+        },
+    }
+    assert plans.match_route(spec, '/api/v1beta0/user/1/farms/') == '/{envId}/farms/'
+    assert plans.match_route(spec, '/api/v1beta0/user/1/farms/5/') == '/{envId}/farms/{farmId}/'
+    assert plans.match_route(spec, '/api/v1beta0/user/1/farms/5/actions/launch/') == \
+        '/{envId}/farms/{farmId}/actions/launch/'
+    assert plans.match_route(spec, '/api/v1beta0/user/1/images/i-1/') == 'unmatched'
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import six
+
+from scalrctl import context, pool
+
+
+def test_imap():
+    def func(item):
+        if item == 3:
+            raise ValueError('bad item')
+        return item * 2, context.settings.envId
+
+    with context.Context(envId='7'):
+        results = sorted(pool.imap(func, range(5), parallel=3), key=lambda r: r[0])
+
+    assert [(item, result) for item, result, _ in results if result] == [
+        (0, (0, '7')), (1, (2, '7')), (2, (4, '7')), (4, (8, '7'))]
+    assert str(results[3][2]) == 'bad item'
+    assert list(pool.imap(func, [])) == []
+
+
+def test_progress():
+    stream = six.StringIO()
+    progress = pool.Progress(2, stream=stream)
+    progress.update()
+    progress.update(failed=True)
+    progress.close()
+    assert (progress.done, progress.failed) == (2, 1)
+    # not a terminal
+    assert stream.getvalue() == ''
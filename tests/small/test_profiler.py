@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from scalrctl import profiler
+
+
+def test_phases():
+    @profiler.phased('test render')
+    def render():
+        with profiler.phase('test decode'):
+            pass
+
+    render()
+    render()
+    phases = dict((name, calls) for name, calls, _ in profiler.get_phases())
+    assert phases['test render'] == 2
+    assert phases['test decode'] == 2
+
+
+def test_sampler(tmpdir):
+    entered = threading.Event()
+    release = threading.Event()
+
+    def work():
+        with profiler.phase('test request'):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    entered.wait(5)
+    sampler = profiler.Sampler()
+    try:
+        sampler.sample()
+    finally:
+        release.set()
+        thread.join()
+
+    path = str(tmpdir.join('profile.collapsed'))
+    sampler.dump_stats(path)
+    with open(path) as fp:
+        lines = fp.read().splitlines()
+    stacks = [line for line in lines if 'work (test_profiler.py' in line]
+    assert len(stacks) == 1
+    assert stacks[0].startswith('[test request];')
+    assert stacks[0].endswith(' 1')
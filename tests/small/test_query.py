@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from scalrctl import click, query
+
+
+ROWS = [
+    {'id': 's-1', 'status': 'running', 'farm': {'id': 42}, 'index': 1},
+    {'id': 's-2', 'status': 'pending', 'farm': {'id': 42}, 'index': 2},
+    {'id': 's-3', 'status': 'running', 'farm': {'id': '43'}, 'index': 3},
+    {'id': 's-4', 'status': 'running', 'farm': None, 'index': None},
+]
+
+
+def _ids(expression):
+    return [row['id'] for row in query.compile_query(expression).filter(ROWS)]
+
+
+def test_match():
+    assert _ids("status=='running' and farm.id==42") == ['s-1']
+    assert _ids("farm.id=='43'") == ['s-3']
+    assert _ids("farm.id==43 or status=='pending'") == ['s-2', 's-3']
+    assert _ids("not status=='running'") == ['s-2']
+    assert _ids("index > 1") == ['s-2', 's-3']
+    assert _ids("1 < index <= 2") == ['s-2']
+    assert _ids("id in ('s-1', 's-4')") == ['s-1', 's-4']
+    assert _ids("farm.id not in [42]") == ['s-3', 's-4']
+    assert _ids("farm == null") == ['s-4']
+
+
+def test_invalid_expression():
+    for expression in ("status=", "__import__('os')", "status is None"):
+        with pytest.raises(click.ClickException):
+            query.compile_query(expression)
+
+
+def test_pushdown():
+    q = query.compile_query("status=='running' and farm.id==42 and index > 1")
+    assert q.pushdown(['status', 'farm']) == {'status': 'running', 'farm': '42'}
+    assert q.pushdown(['id']) == {}
+
+    q = query.compile_query("status=='running' or farm.id==42")
+    assert q.pushdown(['status', 'farm']) == {}
+
+    q = query.compile_query("isActive==true")
+    assert q.pushdown(['isActive']) == {'isActive': 'true'}
+
+
+def test_project():
+    fields = query.parse_fields('id, farm.id,missing')
+    assert fields == [('id',), ('farm', 'id'), ('missing',)]
+    assert query.project(ROWS[0], fields) == {
+        'id': 's-1', 'farm': {'id': 42}, 'missing': None}
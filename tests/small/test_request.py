@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import pytest
+import requests
+from requests.packages.urllib3.exceptions import NewConnectionError
+
+from scalrctl import click, context, request
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, text='{}', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = headers or {}
+
+
+class FakeSession(object):
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.dates = []
+
+    def request(self, method, url, data=None, params=None, headers=None, verify=None):
+        self.dates.append(headers['X-Scalr-Date'])
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _connect_error():
+    return requests.exceptions.ConnectionError(
+        requests.packages.urllib3.exceptions.MaxRetryError(
+            None, '/', NewConnectionError(None, 'refused')))
+
+
+@pytest.fixture
+def session(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(request.time, 'sleep', sleeps.append)
+    dates = iter(['2026-10-18T10:00:0{}.000Z'.format(i) for i in range(10)])
+    monkeypatch.setattr(request.time, 'strftime', lambda fmt, value: next(dates))
+
+    def make(*results):
+        fake = FakeSession(results)
+        fake.sleeps = sleeps
+        monkeypatch.setattr(request, 'get_session', lambda: fake)
+        return fake
+    return make
+
+
+def _request(method):
+    with context.Context(API_KEY_ID='k', API_SECRET_KEY='s', debug_mode=False,
+                         MAX_RETRIES=3, RETRY_BACKOFF=0.5, RETRY_MAX_DELAY=60):
+        return request.request(method, 'user', '/api/v1beta0/user/1/farms/')
+
+
+def test_get_retries(session):
+    fake = session(FakeResponse(503), FakeResponse(429, headers={'Retry-After': '7'}),
+                   requests.exceptions.ReadTimeout('slow'), FakeResponse(200, '{"data": []}'))
+    assert _request('get') == '{"data": []}'
+    assert len(fake.dates) == 4
+    # every attempt is signed with a fresh date
+    assert len(set(fake.dates)) == 4
+    assert 0 <= fake.sleeps[0] <= 0.5
+    assert fake.sleeps[1] == 7
+    assert 0 <= fake.sleeps[2] <= 2
+
+
+def test_get_gives_up(session):
+    fake = session(*[FakeResponse(502, '{"errors": []}')] * 4)
+    assert _request('get') == '{"errors": []}'
+    assert len(fake.dates) == 4
+
+
+def test_post_retries_only_connect_errors(session):
+    fake = session(_connect_error(), FakeResponse(429), FakeResponse(503, '{"errors": []}'))
+    assert _request('post') == '{"errors": []}'
+    assert len(fake.dates) == 3
+
+    fake = session(requests.exceptions.ReadTimeout('slow'))
+    with pytest.raises(click.ClickException):
+        _request('post')
+    assert len(fake.dates) == 1
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+import time
+
+from scalrctl import trace
+
+
+class FakeResponse(object):
+    status_code = 200
+    content = b'{"data": []}'
+    elapsed = datetime.timedelta(milliseconds=20)
+
+
+def test_record(tmpdir):
+    path = str(tmpdir.join('trace.jsonl'))
+    tracer = trace.Tracer(path)
+    tracer.command = 'farms get'
+
+    url = 'http://scalr/api/v1beta0/user/1/farms/5/'
+    tracer.record('get', 'user', '/{envId}/farms/{farmId}/', url, {'a': 1}, '',
+                  FakeResponse(), started=time.time() - 0.05)
+    tracer.record('post', 'user', '/{envId}/farms/{farmId}/actions/launch/',
+                  url + 'actions/launch/', None, '{}',
+                  started=time.time(), error=ValueError('boom'))
+    tracer.close()
+
+    with open(path) as fp:
+        entries = [json.loads(line) for line in fp]
+    assert [(entry['method'], entry['route'], entry['status']) for entry in entries] == [
+        ('GET', '/{envId}/farms/{farmId}/', 200),
+        ('POST', '/{envId}/farms/{farmId}/actions/launch/', None)]
+    assert entries[0]['command'] == 'farms get'
+    assert entries[0]['response_bytes'] == 12 and entries[1]['request_bytes'] == 2
+    assert entries[0]['ttfb'] == 0.02 and entries[0]['total'] >= 0.05
+    assert entries[1]['error'] == 'boom'
+
+    assert tracer.calls == 2
+    rows = trace.summarize(tracer.totals)
+    assert [row[0] for row in rows] == ['GET /{envId}/farms/{farmId}/',
+                                        'POST /{envId}/farms/{farmId}/actions/launch/']
+    assert rows[1][-1] == 1
+
+    har = trace.to_har(entries)['log']['entries']
+    assert har[0]['request']['url'] == url + '?a=1'
+    assert har[0]['timings']['wait'] == 20
+    assert har[1]['response']['statusText'] == 'boom'
+
+
+def test_har(tmpdir):
+    path = str(tmpdir.join('trace.har'))
+    tracer = trace.Tracer(path)
+    url = 'http://scalr/api/v1beta0/user/1/farms/'
+    tracer.record('get', 'user', '/{envId}/farms/', url, None, '', FakeResponse(),
+                  started=time.time())
+    # calls are on disk before the process exits
+    with open(path + '.jsonl') as fp:
+        assert json.loads(fp.readline())['url'] == url
+    tracer.record('get', 'user', '/{envId}/farms/', url, {'pageNum': 2}, '', FakeResponse(),
+                  started=time.time())
+    tracer.close()
+
+    with open(path) as fp:
+        har = json.load(fp)
+    assert [entry['request']['url'] for entry in har['log']['entries']] == [url, url + '?pageNum=2']
+    assert not tmpdir.join('trace.har.jsonl').exists()
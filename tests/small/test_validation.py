@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from scalrctl import validation
+
+SPEC = {'definitions': {
+    'Rule': {
+        'properties': {
+            'id': {'type': 'integer', 'readOnly': True},
+            'name': {'type': 'string', 'pattern': '^[a-z]+$'},
+            'blocking': {'type': 'boolean'},
+            'timeout': {'type': 'integer'},
+            'scope': {'type': 'string', 'enum': ['farm', 'role']},
+            'action': {'$ref': '#/definitions/Action'},
+            'tags': {'type': 'array', 'items': {'type': 'string'}},
+            'server': {'$ref': '#/definitions/ServerForeignKey'},
+            'role': {'$ref': '#/definitions/RoleForeignKey'},
+        },
+        'required': ['id', 'name', 'action'],
+    },
+    'Action': {
+        'properties': {'actionType': {'type': 'string'}},
+        'discriminator': 'actionType',
+        'x-concreteTypes': [{'$ref': '#/definitions/ScriptAction'}],
+    },
+    'ServerForeignKey': {'properties': {'id': {'type': 'string'}}},
+    'RoleForeignKey': {'properties': {'id': {'type': 'integer'}}},
+    'ScriptAction': {
+        'properties': {'actionType': {'type': 'string'},
+                       'script': {'type': 'string'}},
+        'required': ['script'],
+    },
+}}
+
+
+def _messages(data, partial=False):
+    validator = validation.get_validator(SPEC, '#/definitions/Rule')
+    return [e['message'] for e in validator.validate(data, partial=partial)]
+
+
+def test_validate():
+    assert validation.get_validator(SPEC, '#/definitions/Rule') is \
+        validation.get_validator(SPEC, '#/definitions/Rule')
+
+    valid = {'name': 'abc', 'blocking': False, 'timeout': 10, 'scope': None,
+             'action': {'actionType': 'ScriptAction', 'script': 's'}, 'tags': ['a']}
+    assert _messages(valid) == []
+    assert _messages(dict(valid, server='s-1')) == []
+    assert _messages(dict(valid, server={'id': 's-1'})) == []
+    assert _messages(dict(valid, server=True)) == ["server: must be object, got bool"]
+
+    assert sorted(_messages({'name': 'Abc', 'blocking': 1, 'timeout': True,
+                             'scope': 'env', 'tags': ['a', 2]})) == [
+        "action: missing required property",
+        "blocking: must be boolean, got int",
+        "name: 'Abc' does not match pattern '^[a-z]+$'",
+        "scope: 'env' is not one of: farm, role",
+        "tags[1]: must be string, got int",
+        "timeout: must be integer, got bool",
+    ]
+
+
+def test_validate_discriminator():
+    assert _messages({'name': 'a', 'action': {}}) == [
+        "action.actionType: missing required property"]
+    assert _messages({'name': 'a', 'action': {'actionType': 'Chef'}}) == [
+        "action.actionType: 'Chef' is not one of: ScriptAction"]
+    assert _messages({'name': 'a', 'action': {'actionType': 'ScriptAction'}}) == [
+        "action.script: missing required property"]
+
+
+def test_validate_partial():
+    assert _messages({'timeout': 5, 'action': {'script': 1}}, partial=True) == []
+    assert _messages({'timeout': '5'}, partial=True) == [
+        "timeout: must be integer, got str"]
+
+
+def test_coerce():
+    validator = validation.get_validator(SPEC, '#/definitions/Rule')
+    data = {'name': 'abc', 'timeout': '10', 'role': {'id': '123'}, 'server': {'id': '5'},
+            'tags': ['1'], 'action': {'actionType': 'ScriptAction', 'script': 's'}}
+    assert validator.coerce(data) is data
+    assert data['timeout'] == 10 and data['role'] == {'id': 123}
+    assert data['server'] == {'id': '5'} and data['tags'] == ['1']
+    assert _messages(data) == []
+
+    data = {'timeout': 'soon'}
+    assert validator.coerce(data) == {'timeout': 'soon'}
+    assert _messages(data, partial=True) == ["timeout: must be integer, got str"]
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import collections
+import json
+
+import six
+import yaml
+
+from scalrctl import settings, view
+
+settings.colored_output = False
+
+
+def test_build_vertical_table():
+    text = view.build_vertical_table(['id', 'name'], [[1, 'abc'], [22, 'x']],
+                                     pre='Page: 1 of 1')
+    assert text == ('\nPage: 1 of 1\n\n'
+                    'ID        NAME        \n'
+                    '1         abc         \n'
+                    '22        x           \n')
+    assert view.build_vertical_table(['id'], []) == '\n\n'
+
+
+def test_streaming_table():
+    stream = six.StringIO()
+    table = view.StreamingTable(['id', 'host_name'], stream=stream, sample_size=1)
+
+    table.write([])
+    assert stream.getvalue() == ''
+
+    table.write([['s-1', 'a'], ['s-22', 'b']])
+    lines = stream.getvalue().splitlines()
+    assert lines[1] == 'ID         HOST NAME        '
+    assert lines[2] == 's-1        a                '
+    # sized from the sample, wider values are not truncated
+    assert lines[3] == 's-22       b                '
+
+    table.write([['s-3', 'c']])
+    table.close()
+    lines = stream.getvalue().splitlines()
+    assert lines[4] == 's-3        c                '
+    assert lines[5] == ''
+
+
+def test_calc_vertical_table():
+    response = {
+        'data': [
+            {'id': 1, 'Name': 'a', 'farm': {'id': 4}, 'role': None},
+            {'id': 2, 'farm': {}},
+            {'id': 3, 'Name': 'c', 'farm': {'id': 5}, 'role': None},
+        ],
+        'pagination': {'next': '/servers/?pageNum=3', 'last': '/servers/?pageNum=9'},
+    }
+    columns = ['ID', 'name', 'farm.id', 'role.id', 'missing']
+    rows, current_page, last_page = view.calc_vertical_table(response, columns)
+    assert rows == [[1, 'a', 4, '', ''], [2, '', '', '', ''], [3, 'c', 5, '', '']]
+    assert (current_page, last_page) == (2, '9')
+
+    extractor = view.ColumnExtractor(columns)
+    view.calc_vertical_table(response, columns, extractor=extractor)
+    assert len(extractor._plans) == 2
+
+
+def test_calc_horizontal_table():
+    response = {'data': {'id': 1, 'Name': 'a', 'farm': {'id': 4}}}
+    rows = view.calc_horizontal_table(response, ['id', 'name', 'farm.id', 'missing'])
+    assert rows == [['id', 1], ['name', 'a'], ['farm.id', 4]]
+
+
+def test_build_tree():
+    data = {
+        'data': [{'id': 1, 'farm': {'id': 4}, 'ips': ['10.0.0.1'], 'tags': []}],
+        'text': ['', 'a b', 'x: y', 'true', '12', '2016-11-21T09:35:18Z', 'a\nb', None, 1.5],
+    }
+    text = view.build_tree(data)
+    assert text.startswith('data:\n- farm:\n    id: 4\n  id: 1\n  ips:\n  - 10.0.0.1\n  tags: []\n')
+    assert yaml.safe_load(text) == data
+
+    assert view.build_tree('null') == 'null\n...\n'
+    assert view.build_tree('[]') == '[]\n'
+
+
+def test_build_tree_line_breaks():
+    values = [u'a\n', u'k5!\n', u'x\n\n', u"it's\n", u'a\u2028b', u'\x85', u'b\u2029']
+    data = dict((value, [value, {value: value}]) for value in values)
+    assert yaml.safe_load(view.build_tree(data)) == data
+
+
+def test_iter_tree_colored():
+    chunks = list(view.iter_tree([{'id': 1}, {'id': 2}], colored=True))
+    assert chunks == ['- \x1b[31mid\x1b[39m: 1\n', '- \x1b[31mid\x1b[39m: 2\n']
+
+
+def test_record_writer():
+    records = [{'id': 1, 'name': 'a,b', 'farm': {'id': 4}, 'tags': ['x']},
+               {'id': 2, 'name': None, 'farm': None}]
+
+    stream = six.StringIO()
+    writer = view.RecordWriter('csv', columns=['id', 'name', 'farm.id', 'tags'], stream=stream)
+    writer.write(records[:1])
+    writer.write(records[1:])
+    assert stream.getvalue() == 'id,name,farm.id,tags\n1,"a,b",4,"[""x""]"\n2,,,\n'
+
+    stream = six.StringIO()
+    view.RecordWriter('tsv', columns=['id', 'farm.id'], stream=stream).write(records)
+    assert stream.getvalue() == 'id\tfarm.id\n1\t4\n2\t\n'
+
+    stream = six.StringIO()
+    writer = view.RecordWriter('csv', columns=[], stream=stream)
+    writer.write([])
+    writer.write([collections.OrderedDict([('id', 1), ('name', 'a')]), {'id': 2, 'farm': None}])
+    writer.write([{'id': 3, 'other': 'x'}])
+    assert stream.getvalue() == 'id,name,farm\n1,a,\n2,,\n3,,\n'
+
+    stream = six.StringIO()
+    view.RecordWriter('jsonl', stream=stream).write(records)
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == records
+
+    stream = six.StringIO()
+    view.RecordWriter('jsonl', columns=['id', 'farm.id'], stream=stream).write(records)
+    assert stream.getvalue() == '{"id": 1, "farm.id": 4}\n{"id": 2, "farm.id": ""}\n'
+
+
+def test_xml_writer():
+    document = {
+        'data': [{'id': 1, 'name': 'a<b', 'farm': {'id': None}, 'ips': ['10.0.0.1'],
+                  'ok': True, 'bad key': 1, '1x': 2}],
+        'meta': {},
+    }
+    stream = six.StringIO()
+    view.XMLWriter(stream=stream).write_document(document)
+    assert stream.getvalue() == (
+        '<?xml version="1.0" encoding="UTF-8" ?><root><data type="list">'
+        '<item type="dict"><id type="int">1</id><name type="str">a&lt;b</name>'
+        '<farm type="dict"><id type="null"></id></farm>'
+        '<ips type="list"><item type="str">10.0.0.1</item></ips>'
+        '<ok type="bool">true</ok><bad_key type="int">1</bad_key>'
+        '<key name="1x" type="int">2</key></item></data>'
+        '<meta type="dict"></meta></root>\n')
+
+    stream = six.StringIO()
+    writer = view.XMLWriter(stream=stream)
+    writer.start()
+    writer.start_list('data')
+    writer.write_items([{'id': 1}])
+    writer.write_items([{'id': 2}])
+    writer.end_list('data')
+    writer.end()
+    assert stream.getvalue() == (
+        '<?xml version="1.0" encoding="UTF-8" ?><root><data type="list">'
+        '<item type="dict"><id type="int">1</id></item>'
+        '<item type="dict"><id type="int">2</id></item></data></root>\n')
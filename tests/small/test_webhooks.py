@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import binascii
+import hashlib
+import hmac
+import json
+import threading
+
+import requests
+
+from scalrctl import request, utils, webhooks
+
+
+DATE = 'Mon, 19 Oct 2026 10:00:00 GMT'
+
+
+def _sign(body, key='key'):
+    return binascii.hexlify(hmac.new(
+        key.encode('utf-8'), (body + DATE).encode('utf-8'), hashlib.sha1).digest()).decode('ascii')
+
+
+def _post(listener, event):
+    body = json.dumps(event)
+    return requests.post(listener.url, data=body,
+                         headers={'Date': DATE, 'X-Signature': _sign(body)})
+
+
+def test_listener():
+    listener = webhooks.Listener('127.0.0.1:0')
+    listener.signing_key = 'key'
+    listener.start()
+    try:
+        since = listener.position
+        assert not listener.wait(['s-1'], 0.05, since)
+
+        timer = threading.Timer(0.1, _post, (listener, {
+            'eventName': 'HostUp', 'data': {'SCALR_SERVER_ID': 's-1', 'SCALR_FARM_ID': 42}}))
+        timer.start()
+        assert listener.wait(['s-1'], 5, since)
+        assert listener.wait([42], 0, since)
+        # events received before `since` are ignored
+        assert not listener.wait(['s-1'], 0.05, listener.position)
+
+        assert requests.get(listener.url, headers={'X-Validation-Token': 'abc'}).text == 'abc'
+    finally:
+        listener.stop()
+
+
+def test_listener_signature():
+    listener = webhooks.Listener('127.0.0.1:0')
+    listener.signing_key = 'key'
+    listener.start()
+    try:
+        body = json.dumps({'data': {'SCALR_SERVER_ID': 's-2'}})
+        assert requests.post(listener.url, data=body,
+                             headers={'Date': DATE, 'X-Signature': 'bad'}).status_code == 403
+        assert requests.post(listener.url, data=body).status_code == 403
+        assert listener.position == 0
+        assert requests.post(listener.url, data=body,
+                             headers={'Date': DATE, 'X-Signature': _sign(body)}).status_code == 200
+        assert listener.wait(['s-2'], 0)
+    finally:
+        listener.stop()
+
+
+def test_listener_without_key():
+    listener = webhooks.Listener(':0')
+    listener.start()
+    try:
+        assert listener.server.server_address[0] == '127.0.0.1'
+        assert _post(listener, {'data': {'SCALR_SERVER_ID': 's-3'}}).status_code == 403
+        assert listener.position == 0
+    finally:
+        listener.stop()
+
+
+def test_registration(monkeypatch):
+    calls = []
+
+    def fake_request(method, api_level, uri, payload=None, data=None):
+        calls.append((method, uri, json.loads(data)))
+        if method == 'delete':
+            return ''
+        return json.dumps({'data': {'id': 'endpoint' in uri and 'e-1' or 'c-1',
+                                    'securityKey': 'key'}})
+
+    monkeypatch.setattr(request, 'request', fake_request)
+    monkeypatch.setattr(utils, 'read_spec',
+                        lambda api_level, ext='json': {'basePath': '/api/v1beta1/user'})
+    registration = webhooks.Registration('5', 'http://example.com/', events=('HostUp',))
+    assert registration.create() == 'key'
+    registration.delete()
+
+    assert [(method, uri) for method, uri, _ in calls] == [
+        ('post', '/api/v1beta1/user/5/webhook-endpoints/'),
+        ('post', '/api/v1beta1/user/5/webhook-configs/'),
+        ('delete', '/api/v1beta1/user/5/webhook-configs/c-1/'),
+        ('delete', '/api/v1beta1/user/5/webhook-endpoints/e-1/'),
+    ]
+    assert calls[1][2]['endpoints'] == [{'id': 'e-1'}]
+    assert calls[1][2]['events'] == [{'id': 'HostUp'}]
+
+
+def test_waiter_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(webhooks, 'get_listener', lambda: None)
+    monkeypatch.setattr(webhooks.time, 'sleep', sleeps.append)
+
+    waiter = webhooks.Waiter(['s-1'], interval=2, max_interval=5)
+    for _ in range(4):
+        assert not waiter.wait()
+    assert sleeps == [2, 3.0, 4.5, 5]